@@ -0,0 +1,57 @@
+"""Детерминированный корпус для бенчмарков: словарь и сообщения чата."""
+import random
+from pathlib import Path
+
+ALPHABET = "абвгдежзийклмнопрстуфхцчшщъыьэюя"
+COMMON = (
+    "привет как дела кто идет завтра на встречу сгущенка вкусная да нет "
+    "спасибо пожалуйста сегодня вечером магазин работает договорились "
+    "подскажите где купить молоко дети школа машина дорога погода дождь"
+).split()
+
+
+def roots(count: int, seed: int = 1) -> list[str]:
+    rng = random.Random(seed)
+    found = set()
+    while len(found) < count:
+        found.add("".join(rng.choices(ALPHABET, k=rng.randint(3, 5))))
+    return sorted(found)
+
+
+def messages(count: int, dictionary: list[str], dirty_share: float = 0.02, seed: int = 2) -> list[str]:
+    """Сообщения чата; примерно dirty_share из них содержит слово из словаря."""
+    rng = random.Random(seed)
+    result = []
+    for _ in range(count):
+        words = rng.choices(COMMON, k=rng.choice([2, 4, 8, 15, 40]))
+        if rng.random() < dirty_share:
+            words.insert(rng.randrange(len(words) + 1), rng.choice(dictionary) + "ать")
+        result.append(" ".join(words))
+    return result
+
+
+LABELED = Path(__file__).resolve().parent.parent / "tests" / "data" / "obscene_labeled.tsv"
+
+
+def labeled(path: Path = LABELED) -> tuple[dict[str, list[str]], list[tuple[bool, str]]]:
+    """Размеченный набор: словарь из заголовка и пары (мат ли, текст)."""
+    dictionary, cases = {}, []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if line.startswith("#"):
+                key, _, value = line[1:].partition(":")
+                if value:
+                    dictionary[key.strip()] = value.strip().split(",")
+            elif line:
+                label, text = line.split("\t", 1)
+                cases.append((label == "1", text))
+    return dictionary, cases
+
+
+def precision_recall(cases: list[tuple[bool, str]], predict) -> tuple[float, float]:
+    predicted = [(label, predict(text) is not None) for label, text in cases]
+    true_positives = sum(label and hit for label, hit in predicted)
+    hits = sum(hit for _, hit in predicted)
+    positives = sum(label for label, _ in predicted)
+    return (true_positives / hits if hits else 1.0), true_positives / positives
@@ -0,0 +1,69 @@
+"""Память и скорость антифлуда FloodGuard.
+
+Память на отслеживаемого пользователя - tracemalloc после --users
+разных пар (группа, пользователь), скорость hit() - на потоке, где
+часть пользователей флудит. Проверяет и то, что LRU держит не больше
+max_users записей.
+
+    python benchmarks/bench_flood.py [--users 100000] [--messages 500000]
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "bot"))
+
+from flood import FloodGuard  # noqa: E402
+
+LIMIT, WINDOW = 5, 10
+
+
+async def memory(users: int) -> float:
+    guard = FloodGuard(max_users=users)
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for user_id in range(users):
+        await guard.hit(-100 - user_id % 50, user_id, LIMIT, WINDOW)
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return used / len(guard._buckets)
+
+
+async def throughput(messages: int, users: int, max_users: int, seed: int = 4) -> tuple[float, int, int]:
+    rng = random.Random(seed)
+    # Каждый сотый пользователь - флудер и пишет в 20 раз чаще
+    population = list(range(users)) + [user_id for user_id in range(0, users, 100) for _ in range(20)]
+    stream = [rng.choice(population) for _ in range(messages)]
+    guard = FloodGuard(max_users=max_users)
+    flooded = 0
+    started = time.perf_counter()
+    for user_id in stream:
+        flooded += await guard.hit(-100, user_id, LIMIT, WINDOW)
+    return time.perf_counter() - started, flooded, len(guard._buckets)
+
+
+async def run(args):
+    print(f"память: {await memory(args.users):.0f} байт на пользователя ({args.users} пользователей)")
+    elapsed, flooded, tracked = await throughput(args.messages, args.users, args.max_users)
+    print(
+        f"hit(): {args.messages / elapsed:.0f} сообщений/с, {elapsed / args.messages * 1e6:.2f} мкс/сообщение, "
+        f"сработал лимит {flooded} раз"
+    )
+    print(f"в LRU {tracked} записей при max_users={args.max_users}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--messages", type=int, default=500_000)
+    parser.add_argument("--max-users", type=int, default=50_000, help="FLOOD_MAX_USERS для прогона скорости")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
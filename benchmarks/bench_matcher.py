@@ -0,0 +1,74 @@
+"""ObsceneMatcher против прежнего цикла по паттернам.
+
+    python benchmarks/bench_matcher.py [--roots 300] [--messages 20000]
+"""
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "bot"))
+
+from _corpus import messages, roots  # noqa: E402
+from obscene import ObsceneMatcher  # noqa: E402
+
+
+def legacy_patterns(root_list: list[str], full_words: list[str]) -> list[re.Pattern]:
+    # Как было в settings._PATTERNS до ObsceneMatcher
+    return [re.compile(rf"\b{root}\w*\b", re.IGNORECASE) for root in root_list] + [
+        re.compile(rf"\b{word}\b", re.IGNORECASE) for word in full_words
+    ]
+
+
+def legacy_search(patterns: list[re.Pattern], text: str) -> str | None:
+    normalized = text.lower().replace("ё", "е")
+    for rx in patterns:
+        if rx.search(normalized):
+            return rx.pattern
+    return None
+
+
+def measure(func, corpus: list[str]) -> tuple[float, int]:
+    started = time.perf_counter()
+    hits = sum(1 for text in corpus if func(text))
+    return time.perf_counter() - started, hits
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--roots", type=int, default=300)
+    parser.add_argument("--full-words", type=int, default=50)
+    parser.add_argument("--messages", type=int, default=20_000)
+    args = parser.parse_args()
+
+    dictionary = roots(args.roots + args.full_words)
+    root_list, full_words = dictionary[: args.roots], dictionary[args.roots:]
+    corpus = messages(args.messages, root_list)
+
+    started = time.perf_counter()
+    patterns = legacy_patterns(root_list, full_words)
+    legacy_compile = time.perf_counter() - started
+    matcher = ObsceneMatcher(root_list, full_words)
+    started = time.perf_counter()
+    matcher.compile()
+    matcher_compile = time.perf_counter() - started
+
+    legacy_time, legacy_hits = measure(lambda t: legacy_search(patterns, t), corpus)
+    matcher_time, matcher_hits = measure(lambda t: matcher.search(t.lower()), corpus)
+    assert legacy_hits == matcher_hits, (legacy_hits, matcher_hits)
+
+    print(f"паттернов: {len(patterns)}, сообщений: {len(corpus)}, срабатываний: {matcher_hits}")
+    for name, compile_time, total in (
+        ("цикл по паттернам", legacy_compile, legacy_time),
+        ("ObsceneMatcher", matcher_compile, matcher_time),
+    ):
+        print(
+            f"{name:>18}: компиляция {compile_time * 1000:8.1f} мс, "
+            f"{total / len(corpus) * 1e6:8.1f} мкс/сообщение, {len(corpus) / total:10.0f} сообщений/с"
+        )
+    print(f"ускорение: x{legacy_time / matcher_time:.1f}")
+
+
+if __name__ == "__main__":
+    main()
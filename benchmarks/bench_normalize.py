@@ -0,0 +1,56 @@
+"""Точность и цена нормализации текста перед поиском мата.
+
+Precision/recall - на размеченном наборе tests/data/obscene_labeled.tsv,
+скорость - на синтетическом корпусе сообщений.
+
+    python benchmarks/bench_normalize.py [--roots 300] [--messages 20000]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "bot"))
+
+from _corpus import labeled, messages, precision_recall, roots  # noqa: E402
+from obscene import ObsceneMatcher, normalize  # noqa: E402
+
+
+def modes(matcher: ObsceneMatcher) -> dict:
+    return {
+        "без нормализации": matcher.search,
+        "нормализация": lambda text: matcher.search_normalized(text, despace=False),
+        "нормализация + пробелы": matcher.search_normalized,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--roots", type=int, default=300)
+    parser.add_argument("--messages", type=int, default=20_000)
+    args = parser.parse_args()
+
+    dictionary, cases = labeled()
+    matcher = ObsceneMatcher(dictionary["roots"], dictionary["full_words"])
+    print(f"размеченный набор: {len(cases)} сообщений, из них с матом {sum(label for label, _ in cases)}")
+    for name, predict in modes(matcher).items():
+        precision, recall = precision_recall(cases, predict)
+        print(f"{name:>24}: precision {precision:.3f}, recall {recall:.3f}")
+
+    root_list = roots(args.roots)
+    matcher = ObsceneMatcher(root_list, [])
+    matcher.compile()
+    # Номер в каждом сообщении, чтобы кэш normalize() не срабатывал
+    corpus = [f"{text} {i}" for i, text in enumerate(messages(args.messages, root_list))]
+    print(f"корпус: {len(corpus)} сообщений, словарь {len(root_list)} корней")
+    for name, predict in modes(matcher).items():
+        normalize.cache_clear()
+        started = time.perf_counter()
+        for text in corpus:
+            predict(text)
+        elapsed = time.perf_counter() - started
+        print(f"{name:>24}: {elapsed / len(corpus) * 1e6:6.1f} мкс/сообщение")
+
+
+if __name__ == "__main__":
+    main()
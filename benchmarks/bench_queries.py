@@ -0,0 +1,224 @@
+"""Планы и задержки горячих запросов на большой базе.
+
+Засевает отдельную базу --database (по умолчанию 1 млн пользователей,
+10 млн страйков, 1 млн банов и счетчики по группам), затем для каждого
+горячего запроса cruds печатает EXPLAIN (ANALYZE, BUFFERS) и p50/p99 по
+--runs случайным пользователям. С --compare те же запросы еще раз
+прогоняются без индексов: они удаляются внутри транзакции, которая
+потом откатывается.
+
+Сервер и учетные данные - из POSTGRES_* бота, но база должна быть
+отдельной: при засеве таблицы очищаются. База создается, если ее нет,
+миграции применяются сами.
+
+    python benchmarks/bench_queries.py --database moderator_bench [--users 1000000] [--strikes 10000000]
+    python benchmarks/bench_queries.py --database moderator_bench --skip-seed --compare
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import asyncpg
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "bot"))
+
+import settings  # noqa: E402
+
+FIRST_TELEGRAM_ID = 10**9
+FIRST_CHAT_ID = -1_001_000_000_000
+
+SEED = [
+    "TRUNCATE telegram_users, strikes, bans, violation_counters RESTART IDENTITY CASCADE",
+    """
+    INSERT INTO telegram_users (telegram_id, first_name, confirmed)
+    SELECT {first_id} + g, 'user' || g, g % 3 <> 0 FROM generate_series(1, {users}) g
+    """,
+    """
+    INSERT INTO strikes (telegram_user_id, chat_id, message, created_at)
+    SELECT 1 + (random() * ({users} - 1))::int, {first_chat} - g % {chats}, 'seed',
+           now() - random() * interval '90 days'
+    FROM generate_series(1, {strikes}) g
+    """,
+    """
+    INSERT INTO bans (telegram_user_id, chat_id, reason, period, created_at)
+    SELECT 1 + (random() * ({users} - 1))::int, {first_chat} - g % {chats}, 'seed', 7,
+           now() - random() * interval '400 days'
+    FROM generate_series(1, {bans}) g
+    """,
+    """
+    INSERT INTO violation_counters (telegram_user_id, chat_id, strikes, bans, strikes_cutoff, bans_cutoff)
+    SELECT telegram_user_id, chat_id, count(*), 0,
+           now() - interval '{strikes_days} days', now() - interval '{bans_days} days'
+    FROM strikes WHERE created_at >= now() - interval '{strikes_days} days'
+    GROUP BY telegram_user_id, chat_id
+    """,
+    "ANALYZE",
+]
+
+# Те же запросы, что строит cruds; $1 - telegram_id, $2 - chat_id
+QUERIES = {
+    "пользователь по telegram_id (get_user_state)": (
+        "SELECT confirmed FROM telegram_users WHERE telegram_id = $1"
+    ),
+    "счетчики группы (register_violation)": """
+        SELECT u.id, coalesce(c.strikes, 0), coalesce(c.bans, 0)
+        FROM telegram_users u
+        LEFT JOIN violation_counters c ON c.telegram_user_id = u.id AND c.chat_id = $2
+        WHERE u.telegram_id = $1
+    """,
+    "страйки за окно в группе (count_strikes)": """
+        SELECT count(s.id) FROM strikes s JOIN telegram_users u ON u.id = s.telegram_user_id
+        WHERE u.telegram_id = $1 AND s.chat_id = $2 AND s.created_at >= now() - interval '{strikes_days} days'
+    """,
+    "страйки за окно во всех группах": """
+        SELECT count(s.id) FROM strikes s JOIN telegram_users u ON u.id = s.telegram_user_id
+        WHERE u.telegram_id = $1 AND s.created_at >= now() - interval '{strikes_days} days'
+    """,
+    "баны за окно (count_bans)": """
+        SELECT count(b.id) FROM bans b JOIN telegram_users u ON u.id = b.telegram_user_id
+        WHERE u.telegram_id = $1 AND b.created_at >= now() - interval '{bans_days} days'
+    """,
+    "upsert пользователя (create_telegram_user)": """
+        INSERT INTO telegram_users (telegram_id, first_name) VALUES ($1, 'upsert')
+        ON CONFLICT (telegram_id) DO UPDATE SET first_name = excluded.first_name
+        RETURNING id
+    """,
+}
+
+DROP_INDEXES = [
+    "ALTER TABLE telegram_users DROP CONSTRAINT telegram_users_telegram_id_key",
+    "ALTER TABLE violation_counters DROP CONSTRAINT violation_counters_telegram_user_id_chat_id_key",
+    "DROP INDEX ix_strikes_telegram_user_id_chat_id_created_at",
+    "DROP INDEX ix_bans_telegram_user_id_chat_id_created_at",
+]
+
+
+async def connect(database: str) -> asyncpg.Connection:
+    return await asyncpg.connect(
+        host=settings.POSTGRES_HOST,
+        port=settings.POSTGRES_PORT,
+        user=settings.POSTGRES_USER,
+        password=settings.POSTGRES_PASSWORD,
+        database=database,
+    )
+
+
+async def prepare(args):
+    conn = await connect("postgres")
+    try:
+        if not await conn.fetchval("SELECT 1 FROM pg_database WHERE datname = $1", args.database):
+            await conn.execute(f'CREATE DATABASE "{args.database}"')
+    finally:
+        await conn.close()
+
+    # До первого импорта database: движок создается при импорте
+    settings.POSTGRES_DB = args.database
+    from database import database
+
+    await database.check_migrations(upgrade=True)
+    await database.engine.dispose()
+
+
+async def seed(conn: asyncpg.Connection, args):
+    params = {
+        "users": args.users,
+        "strikes": args.strikes,
+        "bans": args.bans,
+        "chats": args.chats,
+        "first_id": FIRST_TELEGRAM_ID,
+        "first_chat": FIRST_CHAT_ID,
+        "strikes_days": settings.STRIKES_WINDOW_DAYS,
+        "bans_days": settings.BANS_WINDOW_DAYS,
+    }
+    for statement in SEED:
+        started = time.perf_counter()
+        await conn.execute(statement.format(**params))
+        print(f"  {' '.join(statement.split())[:60]}... {time.perf_counter() - started:.1f} с")
+
+
+async def measure(conn: asyncpg.Connection, args, runs: int, queries: dict[str, str]):
+    rng = random.Random(5)
+    windows = {"strikes_days": settings.STRIKES_WINDOW_DAYS, "bans_days": settings.BANS_WINDOW_DAYS}
+    for name, sql in queries.items():
+        sql = sql.format(**windows)
+        uses_chat = "$2" in sql
+
+        def params():
+            user = FIRST_TELEGRAM_ID + rng.randint(1, args.users)
+            return (user, FIRST_CHAT_ID - rng.randrange(args.chats)) if uses_chat else (user,)
+
+        print(f"\n{name}")
+        # upsert меняет данные, поэтому каждый запрос - в откатываемой транзакции
+        transaction = conn.transaction()
+        await transaction.start()
+        try:
+            for row in await conn.fetch(f"EXPLAIN (ANALYZE, BUFFERS) {sql}", *params()):
+                print(f"    {row[0]}")
+
+            statement = await conn.prepare(sql)
+            latencies = []
+            for _ in range(runs):
+                values = params()
+                started = time.perf_counter()
+                await statement.fetch(*values)
+                latencies.append(time.perf_counter() - started)
+        finally:
+            await transaction.rollback()
+        latencies.sort()
+        print(
+            f"  p50 {statistics.median(latencies) * 1000:.3f} мс, "
+            f"p99 {latencies[min(int(0.99 * runs), runs - 1)] * 1000:.3f} мс ({runs} запросов)"
+        )
+
+
+async def without_indexes(conn: asyncpg.Connection, args):
+    print("\n=== без индексов (в откатываемой транзакции) ===")
+    transaction = conn.transaction()
+    await transaction.start()
+    try:
+        for statement in DROP_INDEXES:
+            await conn.execute(statement)
+        # Без уникального индекса по telegram_id upsert через ON CONFLICT невозможен
+        queries = {name: sql for name, sql in QUERIES.items() if "ON CONFLICT" not in sql}
+        await measure(conn, args, min(args.runs, 5), queries)
+    finally:
+        await transaction.rollback()
+
+
+async def run(args):
+    await prepare(args)
+    conn = await connect(args.database)
+    try:
+        if not args.skip_seed:
+            print(f"засев: {args.users} пользователей, {args.strikes} страйков, {args.bans} банов")
+            await seed(conn, args)
+        print("\n=== с индексами ===")
+        await measure(conn, args, args.runs, QUERIES)
+        if args.compare:
+            await without_indexes(conn, args)
+    finally:
+        await conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--database", required=True, help="отдельная база, таблицы в ней очищаются")
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--strikes", type=int, default=10_000_000)
+    parser.add_argument("--bans", type=int, default=1_000_000)
+    parser.add_argument("--chats", type=int, default=100)
+    parser.add_argument("--runs", type=int, default=1000)
+    parser.add_argument("--skip-seed", action="store_true", help="база уже засеяна")
+    parser.add_argument("--compare", action="store_true", help="еще раз без индексов")
+    args = parser.parse_args()
+    if args.database == settings.POSTGRES_DB:
+        parser.error("--database совпадает с POSTGRES_DB бота, таблицы в ней будут очищены")
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
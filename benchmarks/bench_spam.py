@@ -0,0 +1,94 @@
+"""Пропускная способность и память SpamFingerprints.
+
+Поток сообщений чатов: обычная переписка плюс доля рассылок одной
+копипасты с мелкими правками от разных аккаунтов. Печатает сообщений в
+секунду, долю найденных копий спама, ложные срабатывания на обычных
+сообщениях и память на отпечаток (tracemalloc) при заполненном окне.
+
+    python benchmarks/bench_spam.py [--messages 100000] [--entries 50000] [--spam-share 0.05]
+"""
+import argparse
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "bot"))
+
+from _corpus import COMMON  # noqa: E402
+from obscene import normalize  # noqa: E402
+from spam import SpamFingerprints  # noqa: E402
+
+TEMPLATES = [
+    "Заработок от {n} рублей в день без вложений, пиши в личку{tail}",
+    "Продам аккаунт с подписчиками недорого, {n} штук, подробности в профиле{tail}",
+    "Набираем людей на удаленку, оплата {n} в неделю, опыт не нужен{tail}",
+]
+
+
+def stream(count: int, chats: int, spam_share: float, seed: int = 3) -> list[tuple]:
+    """(чат, пользователь, текст, спам ли) - обычные сообщения уникальны."""
+    rng = random.Random(seed)
+    result = []
+    for message_id in range(count):
+        chat_id = -rng.randrange(chats) - 1
+        if rng.random() < spam_share:
+            text = rng.choice(TEMPLATES).format(
+                n=rng.choice([3000, 5000, 7000]), tail=rng.choice(["", "!", "!!", " срочно"])
+            )
+            result.append((chat_id, rng.randrange(10**9, 2 * 10**9), text, True))
+        else:
+            words = rng.choices(COMMON, k=rng.randint(3, 20))
+            result.append((chat_id, rng.randrange(10**6), " ".join(words) + f" {message_id}", False))
+    return result
+
+
+def run(messages: list[tuple], entries: int) -> tuple[float, int, int]:
+    guard = SpamFingerprints(max_entries=entries)
+    found = false_positives = 0
+    started = time.perf_counter()
+    for message_id, (chat_id, user_id, text, spam) in enumerate(messages):
+        # При срабатывании возвращаются и все прежние копии
+        flagged = len(guard.check(chat_id, user_id, message_id, text))
+        if spam:
+            found += flagged
+        else:
+            false_positives += flagged
+    return time.perf_counter() - started, found, false_positives
+
+
+def memory(entries: int) -> float:
+    """Байт на отпечаток, когда окно заполнено уникальными текстами."""
+    messages = stream(entries, chats=10, spam_share=0)
+    guard = SpamFingerprints(max_entries=entries)
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for message_id, (chat_id, user_id, text, _) in enumerate(messages):
+        guard.check(chat_id, user_id, message_id, text)
+    # Кэш normalize() - не часть отпечатков
+    normalize.cache_clear()
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return used / len(guard._entries)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=100_000)
+    parser.add_argument("--entries", type=int, default=50_000, help="SPAM_MAX_FINGERPRINTS")
+    parser.add_argument("--chats", type=int, default=20)
+    parser.add_argument("--spam-share", type=float, default=0.05)
+    args = parser.parse_args()
+
+    messages = stream(args.messages, args.chats, args.spam_share)
+    spam = sum(message[3] for message in messages)
+    elapsed, found, false_positives = run(messages, args.entries)
+    print(f"сообщений: {len(messages)}, из них копий спама {spam}, окно {args.entries} отпечатков")
+    print(f"скорость: {len(messages) / elapsed:.0f} сообщений/с, {elapsed / len(messages) * 1e6:.1f} мкс/сообщение")
+    print(f"найдено копий спама: {found / spam:.1%}, ложных срабатываний: {false_positives}")
+    print(f"память: {memory(args.entries):.0f} байт на отпечаток")
+
+
+if __name__ == "__main__":
+    main()
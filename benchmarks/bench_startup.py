@@ -0,0 +1,114 @@
+"""Время запуска бота: прежний create_all против сверки ревизии alembic.
+
+Каждый прогон - холодный старт: свежий процесс Python и новый пул.
+После старта оба пути обслуживают пачку параллельных запросов, как при
+наплыве апдейтов после рестарта: без прогрева пул открывает соединения
+уже на них.
+База берется из POSTGRES_* (как у бота) и должна быть уже мигрирована:
+
+    alembic upgrade head
+    python benchmarks/bench_startup.py [--runs 10] [--roots 5000]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+from _corpus import roots
+
+BOT = Path(__file__).resolve().parent.parent / "bot"
+
+# Код одного холодного старта: печатает время стадий в секундах через пробел
+LEGACY = """
+import time
+started = time.perf_counter()
+import asyncio, settings
+from database import database
+from database.models import Base
+from dictionary import obscene_dictionary
+imported = time.perf_counter()
+obscene_dictionary.matcher.compile()
+compiled = time.perf_counter()
+
+async def main():
+    async with database.engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    await burst()
+    ready = time.perf_counter()
+    await database.engine.dispose()
+    return ready
+
+ready = asyncio.run(main())
+print(imported - started, compiled - imported, ready - compiled, ready - started)
+"""
+
+CURRENT = """
+import time
+started = time.perf_counter()
+import asyncio, settings
+from database import database
+from dictionary import obscene_dictionary
+imported = time.perf_counter()
+
+async def main():
+    compiling = asyncio.create_task(asyncio.to_thread(obscene_dictionary.matcher.compile))
+    await database.check_migrations()
+    await database.warm_up(settings.DB_WARMUP_CONNECTIONS)
+    await compiling
+    await burst()
+    ready = time.perf_counter()
+    await database.engine.dispose()
+    return ready
+
+ready = asyncio.run(main())
+print(imported - started, 0.0, ready - imported, ready - started)
+"""
+
+
+BURST = """
+from sqlalchemy import text
+
+async def burst():
+    async def query():
+        async with database.engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+    await asyncio.gather(*(query() for _ in range(settings.DB_WARMUP_CONNECTIONS)))
+"""
+
+
+def run(code: str, runs: int, env: dict) -> list[list[float]]:
+    samples = []
+    code = code.replace("\nasync def main", BURST + "\nasync def main", 1)
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-c", code], cwd=BOT, capture_output=True, text=True, env=env
+        )
+        if result.returncode:
+            sys.exit(result.stderr)
+        samples.append([float(value) for value in result.stdout.split()[-4:]])
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--roots", type=int, default=0, help="синтетический словарь вместо OBSCENE_ROOTS")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    if args.roots:
+        env["OBSCENE_ROOTS"] = ",".join(roots(args.roots))
+
+    print(f"прогонов: {args.runs}, медианы в мс")
+    print(f"{'':>18} {'импорт':>8} {'словарь':>8} {'БД':>8} {'всего':>8}")
+    for name, code in (("create_all", LEGACY), ("alembic + пул", CURRENT)):
+        samples = run(code, args.runs, env)
+        medians = [statistics.median(column) * 1000 for column in zip(*samples)]
+        print(f"{name:>18} " + " ".join(f"{value:8.1f}" for value in medians))
+    print("у нового пути словарь строится параллельно с БД и входит в колонку БД")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Цена подписанных токенов капчи и пачечной записи подтверждений.
+
+Микробенчмарк make_confirmation_token/verify_confirmation_token (в том
+числе на поддельных и просроченных токенах) против прежнего MD5 всего
+словаря пользователя. С --db еще и запись подтверждений в БД из
+POSTGRES_*: по запросу на каждое нажатие (confirm_telegram_user) против
+одного UPDATE на пачку (confirm_telegram_users, как ConfirmationWriter).
+Таблица telegram_users для --db очищается - нужна отдельная база:
+
+    python benchmarks/bench_tokens.py [--iterations 200000] [--db 2000]
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import sys
+import time
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "bot"))
+
+from utils import make_confirmation_token, verify_confirmation_token  # noqa: E402
+
+USER = {"id": 123456789, "is_bot": False, "first_name": "Иван", "username": "ivan", "language_code": "ru"}
+
+
+def legacy_user_hash(user: dict) -> str:
+    # Как было в confirm_user до подписанных токенов
+    return hashlib.md5(json.dumps(user, sort_keys=True).encode()).hexdigest()
+
+
+def micro(iterations: int):
+    token = make_confirmation_token(USER["id"])
+    forged = token[:-1] + ("0" if token[-1] != "0" else "1")
+    expired = make_confirmation_token(USER["id"], ttl=-1)
+    cases = {
+        "MD5 пользователя (было)": lambda: legacy_user_hash(USER),
+        "создание токена": lambda: make_confirmation_token(USER["id"]),
+        "проверка токена": lambda: verify_confirmation_token(token),
+        "поддельный токен": lambda: verify_confirmation_token(forged),
+        "просроченный токен": lambda: verify_confirmation_token(expired),
+    }
+    print(f"токен: {token} ({len(token.encode())} байт из 64)")
+    for name, func in cases.items():
+        elapsed = min(timeit.repeat(func, number=iterations, repeat=3))
+        print(f"{name:>24}: {elapsed / iterations * 1e6:6.2f} мкс")
+
+
+async def db_writes(count: int):
+    from sqlalchemy import text
+
+    from database import cruds, database
+
+    async def reset():
+        async with database.session() as session:
+            await session.execute(text("TRUNCATE telegram_users CASCADE"))
+        for user_id in range(count):
+            await cruds.create_telegram_user(id=user_id + 10**6)
+
+    await reset()
+    started = time.perf_counter()
+    for user_id in range(count):
+        await cruds.confirm_telegram_user(user_id + 10**6)
+    per_click = time.perf_counter() - started
+
+    await reset()
+    started = time.perf_counter()
+    await cruds.confirm_telegram_users([user_id + 10**6 for user_id in range(count)])
+    batched = time.perf_counter() - started
+    await database.engine.dispose()
+
+    print(f"подтверждения {count} пользователей:")
+    print(f"{'по одному (было)':>24}: {per_click * 1000:8.1f} мс, {2 * count} запросов")
+    print(f"{'одной пачкой':>24}: {batched * 1000:8.1f} мс, 1 запрос")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=200_000)
+    parser.add_argument("--db", type=int, default=0, help="сколько подтверждений записать в БД")
+    args = parser.parse_args()
+
+    micro(args.iterations)
+    if args.db:
+        asyncio.run(db_writes(args.db))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Пропускная способность обработки апдейтов в зависимости от параллельности.
+
+Синтетическая переписка со страйками (replay.py --synthetic chat) через
+настоящие хендлеры и KeyedUpdateProcessor, Bot API - фейковый с
+задержкой --api-latency, БД - локальный Postgres из POSTGRES_*. Перед
+каждым прогоном база --database пересоздается, поэтому она не должна
+совпадать с POSTGRES_DB бота:
+
+    python benchmarks/bench_updates.py [--count 3000] [--levels 1,8,32] [--api-latency 0.05]
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import asyncpg
+
+BOT = Path(__file__).resolve().parent.parent / "bot"
+
+
+async def recreate(name: str):
+    conn = await asyncpg.connect(
+        host=os.environ["POSTGRES_HOST"],
+        port=os.environ.get("POSTGRES_PORT", "5432"),
+        user=os.environ["POSTGRES_USER"],
+        password=os.environ["POSTGRES_PASSWORD"],
+        database="postgres",
+    )
+    try:
+        await conn.execute(f'DROP DATABASE IF EXISTS "{name}" WITH (FORCE)')
+        await conn.execute(f'CREATE DATABASE "{name}"')
+    finally:
+        await conn.close()
+
+
+def run(args, concurrency: int) -> dict:
+    asyncio.run(recreate(args.database))
+    with tempfile.NamedTemporaryFile(suffix=".json") as output:
+        result = subprocess.run(
+            [
+                sys.executable, "replay.py",
+                "--database", args.database,
+                "--synthetic", "chat",
+                "--count", str(args.count),
+                "--concurrency", str(concurrency),
+                "--api-latency", str(args.api_latency),
+                "--output", output.name,
+            ],
+            cwd=BOT, capture_output=True, text=True,
+        )
+        if result.returncode:
+            sys.exit(result.stderr)
+        return json.loads(Path(output.name).read_text(encoding="utf-8"))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=3000)
+    parser.add_argument("--levels", default="1,8,32", help="значения CONCURRENT_UPDATES через запятую")
+    parser.add_argument("--api-latency", type=float, default=0.05)
+    parser.add_argument("--database", default="is_moderator_bot_bench")
+    args = parser.parse_args()
+    if args.database == os.environ.get("POSTGRES_DB"):
+        parser.error("--database совпадает с POSTGRES_DB бота, база будет пересоздана")
+
+    print(f"апдейтов: ~{args.count}, задержка Bot API {args.api_latency * 1000:.0f} мс")
+    print(f"{'параллельно':>12} {'апдейтов/с':>11} {'p50, мс':>8} {'p99, мс':>8}")
+    for level in (int(value) for value in args.levels.split(",")):
+        result = run(args, level)
+        latency = result["updates_latency"]["message"]
+        print(
+            f"{level:>12} {result['updates_per_second']:>11.0f} "
+            f"{latency['p50'] * 1000:>8.1f} {latency['p99'] * 1000:>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
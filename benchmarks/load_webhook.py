@@ -0,0 +1,149 @@
+"""Нагрузочный тест вебхука: поток апдейтов с заданной параллельностью.
+
+Против запущенного бота (адрес - WEBHOOK_URL/WEBHOOK_PATH снаружи или
+порт, опубликованный в docker-compose):
+
+    python benchmarks/load_webhook.py http://localhost:8080/telegram --secret $WEBHOOK_SECRET
+
+Вебхук отвечает, как только апдейт встал в очередь, так что это время
+приема. С --local бот поднимается в этом же процессе с фейковым Bot API
+(replay.FakeRequest) и настоящей БД из POSTGRES_* - тогда печатается
+еще время до обработки всех апдейтов хендлерами.
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+from _corpus import COMMON
+
+BOT = Path(__file__).resolve().parent.parent / "bot"
+CHAT_ID = -1_001_000_000_000
+
+
+def updates(count: int, chats: int, users: int, seed: int = 0) -> list[dict]:
+    """Обычная переписка: сообщения случайных участников в нескольких группах."""
+    rng = random.Random(seed)
+    result = []
+    for update_id in range(1, count + 1):
+        user_id = rng.randrange(users) + 10**6
+        result.append({
+            "update_id": update_id,
+            "message": {
+                "message_id": update_id,
+                "date": int(time.time()),
+                "chat": {"id": CHAT_ID - rng.randrange(chats), "type": "supergroup", "title": "load"},
+                "from": {"id": user_id, "is_bot": False, "first_name": f"user{user_id}"},
+                "text": " ".join(rng.choices(COMMON, k=rng.randint(2, 15))),
+            },
+        })
+    return result
+
+
+async def start_local_bot(port: int, secret: str | None):
+    sys.path.insert(0, str(BOT))
+    import settings
+    from main import build_application
+    from replay import FakeRequest
+
+    settings.TELEGRAM_RATE_LIMIT = 1e9
+    app = build_application(request=FakeRequest())
+    await app.initialize()
+    await app.post_init(app)
+    await app.updater.start_webhook(
+        listen="127.0.0.1",
+        port=port,
+        url_path="telegram",
+        secret_token=secret,
+        webhook_url=f"http://127.0.0.1:{port}/telegram",
+    )
+    await app.start()
+    return app
+
+
+async def stop_local_bot(app):
+    await app.updater.stop()
+    await app.stop()
+    await app.shutdown()
+    await app.post_shutdown(app)
+
+
+async def drained(app):
+    while not app.update_queue.empty() or app.update_processor.current_concurrent_updates:
+        await asyncio.sleep(0.01)
+
+
+async def load(url: str, secret: str | None, batch: list[dict], concurrency: int) -> tuple[list[float], int]:
+    headers = {"X-Telegram-Bot-Api-Secret-Token": secret} if secret else {}
+    latencies, errors = [], 0
+    queue = iter(batch)
+
+    async def client_loop(client: httpx.AsyncClient):
+        nonlocal errors
+        for update in queue:
+            started = time.perf_counter()
+            try:
+                response = await client.post(url, json=update, headers=headers)
+                response.raise_for_status()
+            except httpx.HTTPError:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=30) as client:
+        await asyncio.gather(*(client_loop(client) for _ in range(concurrency)))
+    return latencies, errors
+
+
+async def run(args):
+    app = None
+    url = args.url
+    if args.local:
+        app = await start_local_bot(args.port, args.secret)
+        url = f"http://127.0.0.1:{args.port}/telegram"
+
+    batch = updates(args.count, args.chats, args.users)
+    started = time.perf_counter()
+    latencies, errors = await load(url, args.secret, batch, args.concurrency)
+    accepted = time.perf_counter() - started
+    if app:
+        await drained(app)
+        processed = time.perf_counter() - started
+        await stop_local_bot(app)
+
+    latencies.sort()
+    print(f"апдейтов: {len(batch)}, параллельно: {args.concurrency}, ошибок: {errors}")
+    if latencies:
+        print(
+            f"прием: {len(latencies) / accepted:.0f} апдейтов/с, "
+            f"p50 {statistics.median(latencies) * 1000:.1f} мс, "
+            f"p99 {latencies[min(int(0.99 * len(latencies)), len(latencies) - 1)] * 1000:.1f} мс"
+        )
+    if app:
+        print(f"обработка: {len(batch) / processed:.0f} апдейтов/с, всего {processed:.2f} с")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("url", nargs="?", help="адрес вебхука бота")
+    parser.add_argument("--secret", help="WEBHOOK_SECRET бота")
+    parser.add_argument("--local", action="store_true", help="поднять бота в этом процессе")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--count", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--chats", type=int, default=10)
+    parser.add_argument("--users", type=int, default=500)
+    args = parser.parse_args()
+    if not args.url and not args.local:
+        parser.error("нужен адрес вебхука или --local")
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
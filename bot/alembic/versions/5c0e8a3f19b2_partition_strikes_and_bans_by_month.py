@@ -0,0 +1,120 @@
+"""partition strikes and bans by month
+
+Необязательная: таблицы перестраиваются только с PARTITION_TABLES=true
+(в том числе при MIGRATE_ON_STARTUP) или при ручном запуске
+`alembic -x partitioning=true upgrade head`, иначе ревизия ничего не
+меняет. Для базы, уже прошедшей ее без флага, партиционирование
+включается только новой ревизией вперед: откат ниже удалил бы таблицы
+более поздних ревизий. После нее RetentionJob архивирует и удаляет
+старые месяцы целиком (DETACH + DROP партиции) и заранее создает
+партиции на следующий месяц.
+
+Revision ID: 5c0e8a3f19b2
+Revises: 7b7d03d24a91
+Create Date: 2026-10-18 17:32:10.418233
+
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+import settings
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c0e8a3f19b2'
+down_revision: Union[str, Sequence[str], None] = '7b7d03d24a91'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+TABLES = ('strikes', 'bans')
+
+
+def _is_partitioned(table: str) -> bool:
+    return op.get_bind().execute(sa.text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table p "
+        "JOIN pg_class c ON c.oid = p.partrelid WHERE c.relname = :table)"
+    ), {"table": table}).scalar()
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    forced = context.get_x_argument(as_dictionary=True).get('partitioning') == 'true'
+    if not (settings.PARTITION_TABLES or forced):
+        return
+    for table in TABLES:
+        op.execute(f"ALTER TABLE {table} RENAME TO {table}_old")
+        op.execute(f"ALTER TABLE {table}_old RENAME CONSTRAINT {table}_pkey TO {table}_old_pkey")
+        op.execute(f"ALTER INDEX ix_{table}_telegram_user_id_chat_id_created_at RENAME TO ix_{table}_old_lookup")
+        op.execute(f"ALTER SEQUENCE {table}_id_seq OWNED BY NONE")
+
+        # Ключ партиционирования обязан входить в первичный ключ
+        op.execute(f"""
+            CREATE TABLE {table} (LIKE {table}_old INCLUDING DEFAULTS)
+            PARTITION BY RANGE (created_at)
+        """)
+        op.execute(f"ALTER TABLE {table} ADD PRIMARY KEY (id, created_at)")
+        op.execute(f"""
+            ALTER TABLE {table} ADD FOREIGN KEY (telegram_user_id)
+            REFERENCES telegram_users (id) ON DELETE CASCADE
+        """)
+        op.create_index(
+            f'ix_{table}_telegram_user_id_chat_id_created_at',
+            table, ['telegram_user_id', 'chat_id', 'created_at'], unique=False,
+        )
+        op.execute(f"ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id")
+
+        # Партиции с первого месяца истории и до следующего месяца включительно
+        op.execute(f"""
+            DO $$
+            DECLARE
+                month date;
+            BEGIN
+                FOR month IN
+                    SELECT generate_series(
+                        date_trunc('month', coalesce(min(created_at), now())),
+                        date_trunc('month', now()) + interval '1 month',
+                        interval '1 month'
+                    ) FROM {table}_old
+                LOOP
+                    EXECUTE format(
+                        'CREATE TABLE %I PARTITION OF {table} FOR VALUES FROM (%L) TO (%L)',
+                        '{table}_' || to_char(month, 'YYYY_MM'),
+                        month,
+                        month + interval '1 month'
+                    );
+                END LOOP;
+            END $$
+        """)
+        op.execute(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT")
+
+        op.execute(f"INSERT INTO {table} SELECT * FROM {table}_old")
+        op.drop_table(f'{table}_old')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in TABLES:
+        if not _is_partitioned(table):
+            continue
+        op.execute(f"ALTER TABLE {table} RENAME TO {table}_partitioned")
+        op.execute(f"ALTER TABLE {table}_partitioned RENAME CONSTRAINT {table}_pkey TO {table}_partitioned_pkey")
+        op.execute(f"ALTER INDEX ix_{table}_telegram_user_id_chat_id_created_at RENAME TO ix_{table}_partitioned_lookup")
+        op.execute(f"ALTER SEQUENCE {table}_id_seq OWNED BY NONE")
+
+        op.execute(f"CREATE TABLE {table} (LIKE {table}_partitioned INCLUDING DEFAULTS)")
+        op.execute(f"ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY (id)")
+        op.execute(f"""
+            ALTER TABLE {table} ADD FOREIGN KEY (telegram_user_id)
+            REFERENCES telegram_users (id) ON DELETE CASCADE
+        """)
+        op.create_index(
+            f'ix_{table}_telegram_user_id_chat_id_created_at',
+            table, ['telegram_user_id', 'chat_id', 'created_at'], unique=False,
+        )
+        op.execute(f"ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id")
+
+        op.execute(f"INSERT INTO {table} SELECT * FROM {table}_partitioned")
+        op.drop_table(f'{table}_partitioned')
@@ -0,0 +1,66 @@
+"""add violation counters
+
+Revision ID: 7b7d03d24a91
+Revises: d2d83de66fe8
+Create Date: 2026-10-18 16:47:52.061877
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+import settings
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7b7d03d24a91'
+down_revision: Union[str, Sequence[str], None] = 'd2d83de66fe8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('violation_counters',
+    sa.Column('telegram_user_id', sa.Integer(), nullable=False),
+    sa.Column('chat_id', sa.BigInteger(), nullable=False),
+    sa.Column('strikes', sa.Integer(), nullable=False),
+    sa.Column('bans', sa.Integer(), nullable=False),
+    sa.Column('strikes_cutoff', sa.TIMESTAMP(timezone=True), nullable=False),
+    sa.Column('bans_cutoff', sa.TIMESTAMP(timezone=True), nullable=False),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False),
+    sa.Column('updated_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False),
+    sa.ForeignKeyConstraint(['telegram_user_id'], ['telegram_users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('telegram_user_id', 'chat_id')
+    )
+
+    # Заполняем счетчики по уже накопленным страйкам и банам - за те же
+    # окна, что потом вычитает компакция
+    op.execute(f"""
+        INSERT INTO violation_counters
+            (telegram_user_id, chat_id, strikes, bans, strikes_cutoff, bans_cutoff)
+        SELECT
+            k.telegram_user_id,
+            k.chat_id,
+            (SELECT count(*) FROM strikes s
+             WHERE s.telegram_user_id = k.telegram_user_id AND s.chat_id = k.chat_id
+               AND s.created_at >= now() - interval '{settings.STRIKES_WINDOW_DAYS} days'),
+            (SELECT count(*) FROM bans b
+             WHERE b.telegram_user_id = k.telegram_user_id AND b.chat_id = k.chat_id
+               AND b.created_at >= now() - interval '{settings.BANS_WINDOW_DAYS} days'),
+            now() - interval '{settings.STRIKES_WINDOW_DAYS} days',
+            now() - interval '{settings.BANS_WINDOW_DAYS} days'
+        FROM (
+            SELECT telegram_user_id, chat_id FROM strikes WHERE chat_id IS NOT NULL
+            UNION
+            SELECT telegram_user_id, chat_id FROM bans WHERE chat_id IS NOT NULL
+        ) k
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('violation_counters')
@@ -0,0 +1,84 @@
+"""backfill legacy chat id
+
+Страйки и баны, записанные до d2d83de66fe8, остались с chat_id IS NULL,
+а счетчики и подсчет по группе их не видят. Ревизия относит их к группе
+LEGACY_CHAT_ID и пересчитывает для нее violation_counters. Если такие
+записи есть, а LEGACY_CHAT_ID не задан, миграция останавливается, чтобы
+история не пропала из подсчета молча.
+
+Revision ID: c9e1d5a7b2f4
+Revises: e4b27d9a0c16
+Create Date: 2026-10-18 19:52:13.204117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+import settings
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c9e1d5a7b2f4'
+down_revision: Union[str, Sequence[str], None] = 'e4b27d9a0c16'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+TABLES = ('strikes', 'bans')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    legacy = sum(
+        bind.execute(sa.text(f"SELECT count(*) FROM {table} WHERE chat_id IS NULL")).scalar()
+        for table in TABLES
+    )
+    if not legacy:
+        return
+    if settings.LEGACY_CHAT_ID is None:
+        raise RuntimeError(
+            f"Записей без группы: {legacy}. Укажите в LEGACY_CHAT_ID id группы, "
+            "где они были сделаны, и повторите миграцию"
+        )
+
+    for table in TABLES:
+        bind.execute(
+            sa.text(f"UPDATE {table} SET chat_id = :chat_id WHERE chat_id IS NULL"),
+            {"chat_id": settings.LEGACY_CHAT_ID},
+        )
+
+    # Счетчики группы пересчитываются заново по сырым таблицам
+    bind.execute(sa.text(f"""
+        INSERT INTO violation_counters
+            (telegram_user_id, chat_id, strikes, bans, strikes_cutoff, bans_cutoff)
+        SELECT
+            k.telegram_user_id,
+            :chat_id,
+            (SELECT count(*) FROM strikes s
+             WHERE s.telegram_user_id = k.telegram_user_id AND s.chat_id = :chat_id
+               AND s.created_at >= now() - interval '{settings.STRIKES_WINDOW_DAYS} days'),
+            (SELECT count(*) FROM bans b
+             WHERE b.telegram_user_id = k.telegram_user_id AND b.chat_id = :chat_id
+               AND b.created_at >= now() - interval '{settings.BANS_WINDOW_DAYS} days'),
+            now() - interval '{settings.STRIKES_WINDOW_DAYS} days',
+            now() - interval '{settings.BANS_WINDOW_DAYS} days'
+        FROM (
+            SELECT telegram_user_id FROM strikes WHERE chat_id = :chat_id
+            UNION
+            SELECT telegram_user_id FROM bans WHERE chat_id = :chat_id
+        ) k
+        ON CONFLICT (telegram_user_id, chat_id) DO UPDATE SET
+            strikes = EXCLUDED.strikes,
+            bans = EXCLUDED.bans,
+            strikes_cutoff = EXCLUDED.strikes_cutoff,
+            bans_cutoff = EXCLUDED.bans_cutoff
+    """), {"chat_id": settings.LEGACY_CHAT_ID})
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Какие записи были без группы, уже не восстановить
+    pass
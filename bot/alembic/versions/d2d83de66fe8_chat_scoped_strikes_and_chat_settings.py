@@ -0,0 +1,53 @@
+"""chat scoped strikes and chat settings
+
+Revision ID: d2d83de66fe8
+Revises: d546b7d23808
+Create Date: 2026-10-18 15:21:06.306519
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2d83de66fe8'
+down_revision: Union[str, Sequence[str], None] = 'd546b7d23808'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('chat_settings',
+    sa.Column('chat_id', sa.BigInteger(), nullable=False),
+    sa.Column('moderators_ids', sa.JSON(), nullable=True),
+    sa.Column('moderator_topic_id', sa.BigInteger(), nullable=True),
+    sa.Column('strikes_limit', sa.Integer(), nullable=True),
+    sa.Column('ban_limits', sa.JSON(), nullable=True),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False),
+    sa.Column('updated_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('chat_id')
+    )
+    op.add_column('strikes', sa.Column('chat_id', sa.BigInteger(), nullable=True))
+    op.add_column('bans', sa.Column('chat_id', sa.BigInteger(), nullable=True))
+
+    op.drop_index('ix_strikes_telegram_user_id_created_at', table_name='strikes')
+    op.drop_index('ix_bans_telegram_user_id_created_at', table_name='bans')
+    op.create_index('ix_strikes_telegram_user_id_chat_id_created_at', 'strikes', ['telegram_user_id', 'chat_id', 'created_at'], unique=False)
+    op.create_index('ix_bans_telegram_user_id_chat_id_created_at', 'bans', ['telegram_user_id', 'chat_id', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_bans_telegram_user_id_chat_id_created_at', table_name='bans')
+    op.drop_index('ix_strikes_telegram_user_id_chat_id_created_at', table_name='strikes')
+    op.create_index('ix_strikes_telegram_user_id_created_at', 'strikes', ['telegram_user_id', 'created_at'], unique=False)
+    op.create_index('ix_bans_telegram_user_id_created_at', 'bans', ['telegram_user_id', 'created_at'], unique=False)
+
+    op.drop_column('bans', 'chat_id')
+    op.drop_column('strikes', 'chat_id')
+    op.drop_table('chat_settings')
@@ -0,0 +1,78 @@
+"""bigint unique telegram id and composite indexes
+
+Revision ID: d546b7d23808
+Revises: e82d9bb52de1
+Create Date: 2026-10-18 13:02:17.540913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd546b7d23808'
+down_revision: Union[str, Sequence[str], None] = 'e82d9bb52de1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Дубли пользователей (гонка в старом create_telegram_user) сливаем
+    # в самую раннюю запись, перенося на нее страйки и баны
+    op.execute("""
+        CREATE TEMPORARY TABLE telegram_user_duplicates ON COMMIT DROP AS
+        SELECT id, min(id) OVER (PARTITION BY telegram_id) AS keep_id
+        FROM telegram_users
+        WHERE telegram_id IS NOT NULL
+    """)
+    op.execute("""
+        UPDATE strikes SET telegram_user_id = d.keep_id
+        FROM telegram_user_duplicates d
+        WHERE strikes.telegram_user_id = d.id AND d.id <> d.keep_id
+    """)
+    op.execute("""
+        UPDATE bans SET telegram_user_id = d.keep_id
+        FROM telegram_user_duplicates d
+        WHERE bans.telegram_user_id = d.id AND d.id <> d.keep_id
+    """)
+    op.execute("""
+        UPDATE telegram_users SET confirmed = true
+        WHERE id IN (
+            SELECT d.keep_id FROM telegram_user_duplicates d
+            JOIN telegram_users u ON u.id = d.id
+            WHERE u.confirmed
+        )
+    """)
+    op.execute("""
+        DELETE FROM telegram_users
+        USING telegram_user_duplicates d
+        WHERE telegram_users.id = d.id AND d.id <> d.keep_id
+    """)
+
+    op.alter_column(
+        'telegram_users',
+        'telegram_id',
+        type_=sa.BigInteger(),
+        existing_type=sa.Text(),
+        postgresql_using='telegram_id::bigint',
+    )
+    op.create_unique_constraint('telegram_users_telegram_id_key', 'telegram_users', ['telegram_id'])
+    op.create_index('ix_strikes_telegram_user_id_created_at', 'strikes', ['telegram_user_id', 'created_at'], unique=False)
+    op.create_index('ix_bans_telegram_user_id_created_at', 'bans', ['telegram_user_id', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_bans_telegram_user_id_created_at', table_name='bans')
+    op.drop_index('ix_strikes_telegram_user_id_created_at', table_name='strikes')
+    op.drop_constraint('telegram_users_telegram_id_key', 'telegram_users', type_='unique')
+    op.alter_column(
+        'telegram_users',
+        'telegram_id',
+        type_=sa.Text(),
+        existing_type=sa.BigInteger(),
+        postgresql_using='telegram_id::text',
+    )
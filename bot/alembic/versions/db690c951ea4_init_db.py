@@ -1,7 +1,7 @@
 """init db
 
 Revision ID: db690c951ea4
-Revises: 
+Revises: 4b8e2f7a1c05
 Create Date: 2026-01-16 17:54:33.712248
 
 """
@@ -13,7 +13,7 @@ import sqlalchemy as sa
 
 # revision identifiers, used by Alembic.
 revision: str = 'db690c951ea4'
-down_revision: Union[str, Sequence[str], None] = None
+down_revision: Union[str, Sequence[str], None] = '4b8e2f7a1c05'
 branch_labels: Union[str, Sequence[str], None] = None
 depends_on: Union[str, Sequence[str], None] = None
 
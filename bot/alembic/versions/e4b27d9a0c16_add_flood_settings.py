@@ -0,0 +1,32 @@
+"""add flood settings
+
+Revision ID: e4b27d9a0c16
+Revises: a3f9c1d27e4b
+Create Date: 2026-10-18 18:41:27.550914
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4b27d9a0c16'
+down_revision: Union[str, Sequence[str], None] = 'a3f9c1d27e4b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('chat_settings', sa.Column('flood_limit', sa.Integer(), nullable=True))
+    op.add_column('chat_settings', sa.Column('flood_window_seconds', sa.Integer(), nullable=True))
+    op.add_column('chat_settings', sa.Column('flood_mute_minutes', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('chat_settings', 'flood_mute_minutes')
+    op.drop_column('chat_settings', 'flood_window_seconds')
+    op.drop_column('chat_settings', 'flood_limit')
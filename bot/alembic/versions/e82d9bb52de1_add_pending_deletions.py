@@ -0,0 +1,40 @@
+"""add pending deletions
+
+Revision ID: e82d9bb52de1
+Revises: 13f1e59fd4a1
+Create Date: 2026-10-18 12:10:41.118240
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e82d9bb52de1'
+down_revision: Union[str, Sequence[str], None] = '13f1e59fd4a1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('pending_deletions',
+    sa.Column('chat_id', sa.BigInteger(), nullable=False),
+    sa.Column('user_id', sa.BigInteger(), nullable=False),
+    sa.Column('user_message_id', sa.BigInteger(), nullable=False),
+    sa.Column('bot_message_id', sa.BigInteger(), nullable=False),
+    sa.Column('due_at', sa.TIMESTAMP(timezone=True), nullable=False),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False),
+    sa.Column('updated_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_pending_deletions_due_at', 'pending_deletions', ['due_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_pending_deletions_due_at', table_name='pending_deletions')
+    op.drop_table('pending_deletions')
@@ -0,0 +1,168 @@
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+from logging.handlers import QueueHandler, RotatingFileHandler
+
+import settings
+from metrics import registry
+
+try:
+    # Необязательная зависимость (extra orjson): сериализация в разы быстрее
+    import orjson
+except ImportError:
+    orjson = None
+
+_STOP = object()
+
+
+def _dumps(value) -> str:
+    if orjson is not None:
+        return orjson.dumps(value, default=str, option=orjson.OPT_NON_STR_KEYS).decode()
+    return json.dumps(value, ensure_ascii=False, default=str)
+
+
+class AuditQueueHandler(QueueHandler):
+    """Кладет запись в ограниченную очередь и сразу возвращает управление.
+
+    Форматирование не выполняется в потоке event loop, а при переполненной
+    очереди запись отбрасывается и учитывается в счетчике dropped.
+    """
+
+    def __init__(self, queue_: queue.Queue):
+        super().__init__(queue_)
+        self.dropped = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class AuditLog:
+    """Аудит апдейтов в JSONL из отдельного потока.
+
+    Записи сериализуются и пишутся пачками: как только набралось
+    batch_size записей или прошло flush_interval секунд. Без path -
+    в stdout (его собирает docker), с path - в ротируемые файлы, у
+    каждого воркера шарда свой файл: ротация одного файла из нескольких
+    процессов теряет и перемешивает записи.
+    """
+
+    def __init__(
+        self,
+        path: str | None = None,
+        max_bytes: int = 50 * 1024 * 1024,
+        backup_count: int = 10,
+        queue_size: int = 10_000,
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+    ):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.handler = AuditQueueHandler(self.queue)
+        self.written = 0
+        self._file: RotatingFileHandler | None = None
+        self._stream = None
+        self._thread: threading.Thread | None = None
+
+    def shard_path(self) -> str:
+        """updates.jsonl -> updates.1.jsonl для воркера 1, если шардов несколько."""
+        if settings.SHARDS <= 1:
+            return self.path
+        root, ext = os.path.splitext(self.path)
+        return f"{root}.{settings.SHARD_INDEX}{ext}"
+
+    def start(self):
+        if self.path:
+            path = self.shard_path()
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._file = RotatingFileHandler(
+                path,
+                maxBytes=self.max_bytes,
+                backupCount=self.backup_count,
+                encoding="utf-8",
+            )
+            self._stream = self._file.stream
+        else:
+            self._stream = sys.stdout
+        self._thread = threading.Thread(target=self._run, name="audit-log", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if not self._thread:
+            return
+        self.queue.put(_STOP)
+        self._thread.join()
+        self._thread = None
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def stats(self) -> dict:
+        return {
+            "queued": self.queue.qsize(),
+            "written": self.written,
+            "dropped": self.handler.dropped,
+        }
+
+    def _run(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                record = self.queue.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                record = None
+
+            if record is _STOP:
+                self._write(batch)
+                return
+            if record is not None:
+                batch.append(record)
+
+            if len(batch) >= self.batch_size or time.monotonic() >= deadline:
+                self._write(batch)
+                batch = []
+                deadline = time.monotonic() + self.flush_interval
+
+    def _write(self, batch):
+        if not batch:
+            return
+        file = self._file
+        for record in batch:
+            if not isinstance(record.msg, str):
+                record.msg = _dumps(record.msg)
+                record.args = None
+            if file and file.shouldRollover(record):
+                file.doRollover()
+                self._stream = file.stream
+            self._stream.write(record.getMessage() + "\n")
+        self._stream.flush()
+        self.written += len(batch)
+
+
+audit_log = AuditLog(
+    path=settings.AUDIT_LOG_PATH,
+    max_bytes=settings.AUDIT_LOG_MAX_BYTES,
+    backup_count=settings.AUDIT_LOG_BACKUP_COUNT,
+    queue_size=settings.AUDIT_LOG_QUEUE_SIZE,
+)
+
+registry.collector("audit_log", audit_log.stats)
+
+audit_logger = logging.getLogger("audit")
+audit_logger.setLevel(logging.INFO)
+audit_logger.propagate = False
+audit_logger.addHandler(audit_log.handler)
@@ -0,0 +1,60 @@
+import time
+from dataclasses import dataclass
+
+import settings
+from database import cruds
+
+
+@dataclass(frozen=True)
+class ChatConfig:
+    chat_id: int
+    moderators_ids: frozenset[int]
+    moderator_topic_id: int | None
+    strikes_limit: int
+    ban_limits: dict[int, int]
+    flood_limit: int
+    flood_window_seconds: float
+    flood_mute_minutes: int
+
+
+class ChatConfigs:
+    """Настройки групп из chat_settings с откатом на глобальные settings."""
+
+    def __init__(self, ttl: float = 60):
+        self.ttl = ttl
+        self._cache: dict[int, tuple[float, ChatConfig]] = {}
+
+    async def get(self, chat_id: int) -> ChatConfig:
+        cached = self._cache.get(chat_id)
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+
+        row = await cruds.get_chat_settings(chat_id)
+        config = ChatConfig(
+            chat_id=chat_id,
+            moderators_ids=frozenset(
+                int(i) for i in (row and row.moderators_ids or settings.MODERATORS_IDS)
+            ),
+            moderator_topic_id=(
+                row.moderator_topic_id
+                if row and row.moderator_topic_id is not None
+                else settings.MODERATOR_TOPIC_ID
+            ),
+            strikes_limit=row and row.strikes_limit or settings.STRIKES_LIMIT,
+            ban_limits=(
+                {int(k): int(v) for k, v in row.ban_limits.items()}
+                if row and row.ban_limits
+                else settings.BAN_LIMITS
+            ),
+            flood_limit=row and row.flood_limit or settings.FLOOD_LIMIT,
+            flood_window_seconds=row and row.flood_window_seconds or settings.FLOOD_WINDOW_SECONDS,
+            flood_mute_minutes=row and row.flood_mute_minutes or settings.FLOOD_MUTE_MINUTES,
+        )
+        self._cache[chat_id] = (time.monotonic() + self.ttl, config)
+        return config
+
+    def invalidate(self, chat_id: int) -> None:
+        self._cache.pop(chat_id, None)
+
+
+chat_configs = ChatConfigs(ttl=settings.CHAT_CONFIG_TTL)
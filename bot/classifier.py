@@ -0,0 +1,125 @@
+import asyncio
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import settings
+from dictionary import obscene_dictionary
+from metrics import registry
+from obscene import ObsceneMatcher
+from settings import logger
+
+TIMEOUT_VERDICT = "<таймаут проверки>"
+
+_worker_matcher: ObsceneMatcher | None = None
+
+
+def _init_worker(roots: list[str], full_words: list[str]):
+    global _worker_matcher
+    _worker_matcher = ObsceneMatcher(roots, full_words)
+
+
+def _classify_in_worker(text: str, despace: bool) -> str | None:
+    return _worker_matcher.search_normalized(text, despace)
+
+
+class TextClassifier:
+    """Проверка текста на мат без блокировки event loop на длинных текстах.
+
+    Короткие тексты проверяются на месте, длинные уходят в пул процессов
+    с бюджетом времени на сообщение. Если бюджет исчерпан, возвращается
+    fallback-вердикт: пропустить или считать сообщение нарушением, а пул
+    убивается вместе с зависшим воркером и создается заново.
+    """
+
+    def __init__(
+        self,
+        inline_limit: int = 1000,
+        timeout: float = 0.5,
+        workers: int = 2,
+        block_on_timeout: bool = False,
+    ):
+        self.inline_limit = inline_limit
+        self.timeout = timeout
+        self.workers = workers
+        self.block_on_timeout = block_on_timeout
+        self._pool: ProcessPoolExecutor | None = None
+
+        self.inline_latency = registry.histogram("classify_seconds", mode="inline")
+        self.offloaded_latency = registry.histogram("classify_seconds", mode="offloaded")
+        self.timeouts = 0
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_worker,
+                initargs=(obscene_dictionary.roots, obscene_dictionary.full_words),
+            )
+        return self._pool
+
+    async def classify(self, text: str) -> str | None:
+        started = time.perf_counter()
+        if len(text) <= self.inline_limit:
+            result = obscene_dictionary.matcher.search_normalized(
+                text, despace=settings.OBSCENE_DESPACE
+            )
+            self.inline_latency.observe(time.perf_counter() - started)
+            return result
+
+        loop = asyncio.get_running_loop()
+        try:
+            result = await asyncio.wait_for(
+                loop.run_in_executor(
+                    self._get_pool(), _classify_in_worker, text, settings.OBSCENE_DESPACE
+                ),
+                timeout=self.timeout,
+            )
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            logger.warning(f"Проверка текста длиной {len(text)} не уложилась в {self.timeout} сек")
+            # Иначе воркер досчитывал бы регулярку, занимая место в пуле
+            self._kill_pool()
+            result = TIMEOUT_VERDICT if self.block_on_timeout else None
+        except BrokenProcessPool:
+            # Пул убит из-за таймаута соседней проверки
+            result = TIMEOUT_VERDICT if self.block_on_timeout else None
+        self.offloaded_latency.observe(time.perf_counter() - started)
+        return result
+
+    def reload(self, roots: list[str], full_words: list[str]):
+        """Новый словарь: следующий пул стартует с ним, старый дорабатывает."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
+
+    def _kill_pool(self):
+        if self._pool is None:
+            return
+        pool, self._pool = self._pool, None
+        processes = list((pool._processes or {}).values())
+        pool.shutdown(wait=False, cancel_futures=True)
+        for process in processes:
+            process.kill()
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def stats(self) -> dict:
+        return {
+            "inline": self.inline_latency.summary(),
+            "offloaded": self.offloaded_latency.summary(),
+            "timeouts": self.timeouts,
+        }
+
+
+text_classifier = TextClassifier(
+    inline_limit=settings.CLASSIFY_INLINE_LIMIT,
+    timeout=settings.CLASSIFY_TIMEOUT,
+    workers=settings.CLASSIFY_WORKERS,
+    block_on_timeout=settings.CLASSIFY_BLOCK_ON_TIMEOUT,
+)
+obscene_dictionary.on_swap(text_classifier.reload)
+registry.collector("classifier", lambda: {"timeouts": text_classifier.timeouts})
@@ -0,0 +1,82 @@
+import asyncio
+from contextlib import suppress
+
+import settings
+from database import cruds
+from database.cache import UserState
+from metrics import registry
+from settings import logger
+
+
+class ConfirmationWriter:
+    """Копит подтверждения капчи и пишет их в БД одним UPDATE на пачку.
+
+    Кэш состояния пользователя обновляется сразу, так что остальные
+    хендлеры видят подтверждение до того, как оно попадет в БД.
+    """
+
+    def __init__(self, flush_interval: float = 1.0, batch_size: int = 500):
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._pending: set[int] = set()
+        self._full = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self.flushed = 0
+
+    async def confirm(self, telegram_user_id: int) -> None:
+        state = cruds.user_cache.peek(telegram_user_id)
+        if state:
+            state.known = True
+            state.confirmed = True
+        else:
+            cruds.user_cache.set(telegram_user_id, UserState(known=True, confirmed=True))
+        await cruds.share_confirmation(telegram_user_id)
+
+        self._pending.add(telegram_user_id)
+        if len(self._pending) >= self.batch_size:
+            self._full.set()
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        await self.flush()
+
+    async def flush(self):
+        if not self._pending:
+            return
+        batch, self._pending = list(self._pending), set()
+        self._full.clear()
+        try:
+            await cruds.confirm_telegram_users(batch)
+        except Exception:
+            logger.exception("Не удалось сохранить подтверждения")
+            self._pending.update(batch)
+        except BaseException:
+            # Отмена из stop() посреди записи: пачку допишет финальный flush,
+            # повторный UPDATE безвреден
+            self._pending.update(batch)
+            raise
+        else:
+            self.flushed += len(batch)
+
+    async def _run(self):
+        while True:
+            with suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._full.wait(), timeout=self.flush_interval)
+            await self.flush()
+
+
+confirmation_writer = ConfirmationWriter(
+    flush_interval=settings.CONFIRMATION_FLUSH_INTERVAL,
+    batch_size=settings.CONFIRMATION_BATCH_SIZE,
+)
+registry.collector("confirmations", lambda: {
+    "pending": len(confirmation_writer._pending),
+    "flushed": confirmation_writer.flushed,
+})
@@ -0,0 +1,71 @@
+import asyncio
+import sys
+from contextlib import suppress
+
+import settings
+from database import cruds
+from metrics import registry
+from settings import logger
+
+
+class CounterCompactor:
+    """Периодически вычитает из violation_counters выпавшие из окна записи.
+
+    Счетчики растут на пути записи в той же транзакции, что и страйк/бан,
+    а уменьшаются только здесь. Между проходами счетчик может быть
+    завышен не больше чем на interval, что для эскалации допустимо.
+    Из нескольких процессов проход выполняет один (advisory lock).
+    """
+
+    def __init__(self, interval: float = 3600):
+        self.interval = interval
+        self._task: asyncio.Task | None = None
+
+        self.runs = 0
+        self.removed = 0
+        self.failed = 0
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    def stats(self) -> dict:
+        return {"runs": self.runs, "removed": self.removed, "failed": self.failed}
+
+    async def _run(self):
+        while True:
+            try:
+                removed = await cruds.compact_violation_counters()
+                if removed >= 0:
+                    self.runs += 1
+                    self.removed += removed
+            except Exception:
+                self.failed += 1
+                logger.exception("Не удалось пересчитать счетчики нарушений")
+            await asyncio.sleep(self.interval)
+
+
+counter_compactor = CounterCompactor(interval=settings.COUNTERS_COMPACT_INTERVAL)
+registry.collector("violation_counters", counter_compactor.stats)
+
+
+async def _check(fix: bool):
+    mismatches = await cruds.check_violation_counters(fix=fix)
+    for row in mismatches:
+        print(
+            f"user={row['telegram_user_id']} chat={row['chat_id']} "
+            f"strikes {row['strikes']}->{row['real_strikes']} "
+            f"bans {row['bans']}->{row['real_bans']}"
+        )
+    print(f"Расхождений: {len(mismatches)}{' (исправлено)' if fix and mismatches else ''}")
+
+
+if __name__ == "__main__":
+    # python counters.py [--fix] - сверка счетчиков с таблицами strikes/bans
+    asyncio.run(_check("--fix" in sys.argv))
@@ -1,34 +1,140 @@
+import asyncio
+import os
+import re
+
 from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
     AsyncSession,
     async_sessionmaker,
     create_async_engine
 )
+from sqlalchemy import event, inspect, text
+from sqlalchemy.exc import ProgrammingError
 from contextlib import asynccontextmanager
 from typing import AsyncGenerator
 
-from database.models import Base
+from metrics import count_query
 import settings
+from settings import logger
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(__file__)), "alembic.ini")
+# Ревизия, которой соответствует схема, созданная прежним create_all
+CREATE_ALL_REVISION = "13f1e59fd4a1"
+MIGRATIONS_DIR = os.path.join(os.path.dirname(ALEMBIC_INI), "alembic", "versions")
+
+_REVISION = re.compile(r"^revision: str = '(\w+)'", re.MULTILINE)
+_DOWN_REVISION = re.compile(r"^down_revision: .* = (.+)$", re.MULTILINE)
+
+
+def _script_heads() -> set[str]:
+    """Head'ы миграций по тексту файлов, без импорта alembic.
+
+    Импорт alembic - самая долгая часть проверки на старте. Если
+    ревизия БД с этим не совпала, решение принимает сам alembic.
+    """
+    revisions, parents = set(), set()
+    for name in os.listdir(MIGRATIONS_DIR):
+        if not name.endswith(".py"):
+            continue
+        with open(os.path.join(MIGRATIONS_DIR, name), encoding="utf-8") as f:
+            source = f.read()
+        revisions.update(_REVISION.findall(source))
+        for down_revision in _DOWN_REVISION.findall(source):
+            parents.update(re.findall(r"'(\w+)'", down_revision))
+    return revisions - parents
 
 
 class Database:
     def __init__(self, postgres_uri: str):
-        self.engine = create_async_engine(
-            postgres_uri, 
-            echo=False, 
-            future=True,
-            pool_size=10,
-            max_overflow=20,
-            pool_timeout=30,
-            pool_pre_ping=True
-        )
-        self.session_factory = async_sessionmaker(
-            self.engine, expire_on_commit=False, class_=AsyncSession
-        )
-
-    async def init_models(self, base = Base):
-        """Создание таблиц при необходимости."""
-        async with self.engine.begin() as conn:
-            await conn.run_sync(base.metadata.create_all)
+        self.postgres_uri = postgres_uri
+        self._engine: AsyncEngine | None = None
+        self._session_factory: async_sessionmaker | None = None
+
+    @property
+    def engine(self) -> AsyncEngine:
+        """Движок создается при первом обращении, а не при импорте."""
+        if self._engine is None:
+            self._engine = create_async_engine(
+                self.postgres_uri, 
+                echo=False, 
+                future=True,
+                pool_size=10,
+                max_overflow=20,
+                pool_timeout=30,
+                pool_pre_ping=True
+            )
+            event.listen(self._engine.sync_engine, "before_cursor_execute", count_query)
+        return self._engine
+
+    @property
+    def session_factory(self) -> async_sessionmaker:
+        if self._session_factory is None:
+            self._session_factory = async_sessionmaker(
+                self.engine, expire_on_commit=False, class_=AsyncSession
+            )
+        return self._session_factory
+
+    async def check_migrations(self, upgrade: bool = False):
+        """Сверяет ревизию БД с head миграций вместо create_all.
+
+        С upgrade=True недостающие миграции применяются под advisory
+        lock, чтобы несколько воркеров не мигрировали одновременно.
+        База, созданная через create_all, таблицы alembic_version не
+        имеет: она помечается ревизией CREATE_ALL_REVISION и дальше
+        мигрирует как обычно.
+        """
+        async with self.engine.connect() as conn:
+            try:
+                current = set((await conn.execute(text("SELECT version_num FROM alembic_version"))).scalars())
+            except ProgrammingError:
+                current = None
+            if current == _script_heads():
+                return
+
+        from alembic import command
+        from alembic.config import Config
+        from alembic.runtime.migration import MigrationContext
+        from alembic.script import ScriptDirectory
+
+        config = Config(ALEMBIC_INI)
+        heads = set(ScriptDirectory.from_config(config).get_heads())
+
+        def current_heads(connection):
+            return set(MigrationContext.configure(connection).get_current_heads())
+
+        def created_by_create_all(connection):
+            tables = inspect(connection).get_table_names()
+            return "telegram_users" in tables and "alembic_version" not in tables
+
+        async with self.engine.connect() as conn:
+            if await conn.run_sync(current_heads) == heads:
+                return
+            if not upgrade:
+                raise RuntimeError(
+                    f"Схема БД не на ревизии {', '.join(heads)}: выполните `alembic upgrade head` "
+                    f"(для базы, созданной через create_all, сначала `alembic stamp {CREATE_ALL_REVISION}`)"
+                )
+
+            await conn.execute(text("SELECT pg_advisory_lock(hashtext('alembic'))"))
+            try:
+                if await conn.run_sync(created_by_create_all):
+                    logger.info(f"База создана через create_all, помечаю ревизией {CREATE_ALL_REVISION}")
+                    await asyncio.to_thread(command.stamp, config, CREATE_ALL_REVISION)
+                current = await conn.run_sync(current_heads)
+                if current != heads:
+                    logger.info(f"Применяю миграции: {current or 'пустая база'} -> {heads}")
+                    await asyncio.to_thread(command.upgrade, config, "head")
+            finally:
+                await conn.execute(text("SELECT pg_advisory_unlock(hashtext('alembic'))"))
+                await conn.commit()
+
+    async def warm_up(self, connections: int):
+        """Открывает соединения пула заранее, до первого апдейта."""
+        async def ping():
+            async with self.engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+
+        await asyncio.gather(*(ping() for _ in range(connections)))
 
     @asynccontextmanager
     async def session(self) -> AsyncGenerator[AsyncSession, None]:
@@ -0,0 +1,62 @@
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+
+@dataclass
+class UserState:
+    """То, что нужно хендлерам на каждое сообщение, без истории страйков."""
+
+    known: bool
+    confirmed: bool = False
+    # Страйки за стандартное окно по группам: {chat_id: count}
+    strikes: dict[int | None, int] = field(default_factory=dict)
+
+
+class UserStateCache:
+    """Ограниченный по размеру LRU-кэш состояний пользователей с TTL."""
+
+    def __init__(self, maxsize: int = 10_000, ttl: float = 300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[str, tuple[float, UserState]] = OrderedDict()
+
+    def get(self, telegram_user_id: int | str) -> UserState | None:
+        key = str(telegram_user_id)
+        item = self._data.get(key)
+        if item is None or item[0] < time.monotonic():
+            if item is not None:
+                del self._data[key]
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return item[1]
+
+    def set(self, telegram_user_id: int | str, state: UserState) -> None:
+        key = str(telegram_user_id)
+        self._data[key] = (time.monotonic() + self.ttl, state)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def peek(self, telegram_user_id: int | str) -> UserState | None:
+        """Как get, но без учета в счетчиках и без продления LRU."""
+        item = self._data.get(str(telegram_user_id))
+        if item is None or item[0] < time.monotonic():
+            return None
+        return item[1]
+
+    def invalidate(self, telegram_user_id: int | str) -> None:
+        self._data.pop(str(telegram_user_id), None)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
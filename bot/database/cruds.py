@@ -1,27 +1,57 @@
-from database.models import TelegramUser, Strikes, Ban
+from database.models import (
+    TelegramUser, Strikes, Ban, PendingDeletion, ChatSettings, ViolationCounter,
+    ObsceneWord,
+)
 from database import database, Database
+from database.cache import UserState, UserStateCache
+from metrics import registry, timed
+from state import state_backend
+import settings
 
-from sqlalchemy import select, func
+from sqlalchemy import select, func, delete, update, text
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import  joinedload
 from datetime import datetime, timezone, timedelta
 
 
+user_cache = UserStateCache(
+    maxsize=settings.USER_CACHE_SIZE,
+    ttl=settings.USER_CACHE_TTL,
+)
+registry.collector("user_cache", user_cache.stats)
+
+
+@timed("db")
 async def create_telegram_user(db: Database = database, **telegram_user_data):
+    """Upsert по telegram_id: параллельные апдейты не создают дублей."""
     async with db.session() as session:
-        user = TelegramUser(
-            telegram_id=str(telegram_user_data["id"]),
-            first_name=telegram_user_data.get("first_name"),
-            username=telegram_user_data.get("username"),
+        stmt = (
+            insert(TelegramUser)
+            .values(
+                telegram_id=int(telegram_user_data["id"]),
+                first_name=telegram_user_data.get("first_name"),
+                username=telegram_user_data.get("username"),
+            )
+            .on_conflict_do_update(
+                index_elements=[TelegramUser.telegram_id],
+                set_={
+                    "first_name": telegram_user_data.get("first_name"),
+                    "username": telegram_user_data.get("username"),
+                },
+            )
+            .returning(TelegramUser)
         )
-        session.add(user)
-        await session.flush()
+        result = await session.execute(stmt)
+        user = result.scalar_one()
+        user_cache.set(user.telegram_id, UserState(known=True, confirmed=bool(user.confirmed)))
         return user
 
 
+@timed("db")
 async def confirm_telegram_user(telegram_user_id: str, db: Database = database):
     async with db.session() as session:
         result = await session.execute(
-            select(TelegramUser).where(TelegramUser.telegram_id == str(telegram_user_id))
+            select(TelegramUser).where(TelegramUser.telegram_id == int(telegram_user_id))
         )
         user = result.scalar_one_or_none()
 
@@ -30,9 +60,31 @@ async def confirm_telegram_user(telegram_user_id: str, db: Database = database):
 
         user.confirmed = True
         await session.flush()
+        state = user_cache.peek(telegram_user_id)
+        if state:
+            state.known = True
+            state.confirmed = True
+        else:
+            user_cache.set(telegram_user_id, UserState(known=True, confirmed=True))
         return user
 
 
+@timed("db")
+async def confirm_telegram_users(telegram_user_ids: list[int], db: Database = database) -> int:
+    """Подтверждает пачку пользователей одним UPDATE."""
+    if not telegram_user_ids:
+        return 0
+    async with db.session() as session:
+        result = await session.execute(
+            update(TelegramUser)
+            .where(TelegramUser.telegram_id.in_(telegram_user_ids))
+            .values(confirmed=True)
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount
+
+
+@timed("db")
 async def get_telegram_user(telegram_user_id: int | str, db: Database = database):
     async with db.session() as session:
         stmt = (
@@ -40,34 +92,165 @@ async def get_telegram_user(telegram_user_id: int | str, db: Database = database
             .options(
                 joinedload(TelegramUser.strikes)
             )
-            .where(TelegramUser.telegram_id == str(telegram_user_id))
+            .where(TelegramUser.telegram_id == int(telegram_user_id))
         )
         result = await session.execute(stmt)
         user = result.unique().scalar_one_or_none()
         return user
 
 
+@timed("db")
+async def get_user_state(telegram_user_id: int | str, db: Database = database) -> UserState:
+    """Состояние пользователя из кэша, при промахе - один легкий SELECT.
+
+    С общим бэкендом перед БД проверяется еще отметка о подтверждении:
+    подтверждения пишутся в БД пачками, а капчу могли нажать на другой
+    реплике.
+    """
+    state = user_cache.get(telegram_user_id)
+    if state is not None:
+        return state
+
+    if state_backend.shared:
+        if await state_backend.get(f"confirmed:{telegram_user_id}") is not None:
+            state = UserState(known=True, confirmed=True)
+            user_cache.set(telegram_user_id, state)
+            return state
+
+    async with db.session() as session:
+        result = await session.execute(
+            select(TelegramUser.confirmed).where(
+                TelegramUser.telegram_id == int(telegram_user_id)
+            )
+        )
+        row = result.first()
+
+    state = UserState(known=row is not None, confirmed=bool(row and row.confirmed))
+    user_cache.set(telegram_user_id, state)
+    return state
+
+
+async def share_confirmation(telegram_user_id: int | str) -> None:
+    """Отметка для других реплик, пока подтверждение не дошло до БД."""
+    if state_backend.shared:
+        await state_backend.set(
+            f"confirmed:{telegram_user_id}", "1", ttl=settings.USER_CACHE_TTL
+        )
+
+
+async def _bump_counters(
+    session, user_pk: int, chat_id: int, strikes: int = 0, bans: int = 0
+) -> tuple[int, int]:
+    """Увеличивает счетчики пользователя в группе, возвращает новые значения."""
+    now = datetime.now(tz=timezone.utc)
+    stmt = (
+        insert(ViolationCounter)
+        .values(
+            telegram_user_id=user_pk,
+            chat_id=chat_id,
+            strikes=strikes,
+            bans=bans,
+            strikes_cutoff=now - timedelta(days=settings.STRIKES_WINDOW_DAYS),
+            bans_cutoff=now - timedelta(days=settings.BANS_WINDOW_DAYS),
+        )
+        .on_conflict_do_update(
+            index_elements=[ViolationCounter.telegram_user_id, ViolationCounter.chat_id],
+            set_={
+                "strikes": ViolationCounter.strikes + strikes,
+                "bans": ViolationCounter.bans + bans,
+            },
+        )
+        .returning(ViolationCounter.strikes, ViolationCounter.bans)
+    )
+    result = await session.execute(stmt)
+    return tuple(result.one())
+
+
+async def _block_until(session, user_pk: int, days: int):
+    await session.execute(
+        update(TelegramUser)
+        .where(TelegramUser.id == user_pk)
+        .values(blocked_until=(datetime.now(tz=timezone.utc) + timedelta(days=days)).date())
+    )
+
+
+async def _read_counters(telegram_user_id: int | str, chat_id: int, db: Database) -> tuple[int, int] | None:
+    async with db.session() as session:
+        result = await session.execute(
+            select(
+                TelegramUser.id,
+                func.coalesce(ViolationCounter.strikes, 0),
+                func.coalesce(ViolationCounter.bans, 0),
+            )
+            .outerjoin(
+                ViolationCounter,
+                (ViolationCounter.telegram_user_id == TelegramUser.id)
+                & (ViolationCounter.chat_id == chat_id),
+            )
+            .where(TelegramUser.telegram_id == int(telegram_user_id))
+        )
+        row = result.first()
+    return (row[1], row[2]) if row else None
+
 
-async def create_strike_record(telegram_user_id: int | str, message: str, db: Database = database):
+@timed("db")
+async def create_strike_record(
+    telegram_user_id: int | str,
+    message: str,
+    chat_id: int | None = None,
+    db: Database = database,
+):
     async with db.session() as session:
         result = await session.execute(
-            select(TelegramUser).where(TelegramUser.telegram_id == str(telegram_user_id))
+            select(TelegramUser).where(TelegramUser.telegram_id == int(telegram_user_id))
         )
         user = result.scalar_one_or_none()
 
         if not user:
             return None
         
-        strike = Strikes(telegram_user_id=user.id, message=message)
+        strike = Strikes(telegram_user_id=user.id, chat_id=chat_id, message=message)
         session.add(strike)
         await session.flush()
+        if chat_id is not None:
+            await _bump_counters(session, user.id, chat_id, strikes=1)
+        state = user_cache.peek(telegram_user_id)
+        if state:
+            if chat_id in state.strikes:
+                state.strikes[chat_id] += 1
+            if chat_id is not None:
+                state.strikes.pop(None, None)
         return strike
     
 
-async def count_strikes(telegram_user_id: int | str, db: Database = database, days: int = 30):
+def _chat_filter(column, chat_id: int | None):
+    # chat_id=None - по всем группам сразу (и по старым записям без чата)
+    return column == chat_id if chat_id is not None else True
+
+
+@timed("db")
+async def count_strikes(
+    telegram_user_id: int | str,
+    db: Database = database,
+    days: int = settings.STRIKES_WINDOW_DAYS,
+    chat_id: int | None = None,
+):
+    # В кэше хранится только счетчик за стандартное окно
+    state = user_cache.peek(telegram_user_id) if days == settings.STRIKES_WINDOW_DAYS else None
+    if state and chat_id in state.strikes:
+        return state.strikes[chat_id]
+
+    if chat_id is not None and days == settings.STRIKES_WINDOW_DAYS:
+        counters = await _read_counters(telegram_user_id, chat_id, db)
+        if counters is None:
+            return None
+        if state:
+            state.strikes[chat_id] = counters[0]
+        return counters[0]
+
     async with db.session() as session:
         result = await session.execute(
-            select(TelegramUser).where(TelegramUser.telegram_id == str(telegram_user_id))
+            select(TelegramUser).where(TelegramUser.telegram_id == int(telegram_user_id))
         )
         user = result.scalar_one_or_none()
 
@@ -79,18 +262,28 @@ async def count_strikes(telegram_user_id: int | str, db: Database = database, da
 
         query = select(func.count(Strikes.id)).where(
             Strikes.telegram_user_id == user.id,
-            Strikes.created_at >= start_time
+            Strikes.created_at >= start_time,
+            _chat_filter(Strikes.chat_id, chat_id),
         )
 
         result = await session.execute(query)
         count = result.scalar_one()
+        if days == settings.STRIKES_WINDOW_DAYS and (state := user_cache.peek(telegram_user_id)):
+            state.strikes[chat_id] = count
         return count
     
-async def create_ban(telegram_user_id: int, reason: str, period: int, db: Database = database):
+@timed("db")
+async def create_ban(
+    telegram_user_id: int,
+    reason: str,
+    period: int,
+    chat_id: int | None = None,
+    db: Database = database,
+):
     async with db.session() as session:
 
         result = await session.execute(
-            select(TelegramUser).where(TelegramUser.telegram_id == str(telegram_user_id))
+            select(TelegramUser).where(TelegramUser.telegram_id == int(telegram_user_id))
         )
         user = result.scalar_one_or_none()
 
@@ -98,15 +291,23 @@ async def create_ban(telegram_user_id: int, reason: str, period: int, db: Databa
             return None
         
 
-        ban = Ban(telegram_user_id=user.id, reason=reason, period=period)
+        ban = Ban(telegram_user_id=user.id, chat_id=chat_id, reason=reason, period=period)
         session.add(ban)
         await session.flush()
+        if chat_id is not None:
+            await _bump_counters(session, user.id, chat_id, bans=1)
+        await _block_until(session, user.id, period)
         return ban
     
-async def count_bans(telegram_user_id: str | int, db: Database = database):
+@timed("db")
+async def count_bans(telegram_user_id: str | int, chat_id: int | None = None, db: Database = database):
+    if chat_id is not None:
+        counters = await _read_counters(telegram_user_id, chat_id, db)
+        return counters[1] if counters else None
+
     async with db.session() as session:
         result = await session.execute(
-            select(TelegramUser).where(TelegramUser.telegram_id == str(telegram_user_id))
+            select(TelegramUser).where(TelegramUser.telegram_id == int(telegram_user_id))
         )
         user = result.scalar_one_or_none()
 
@@ -116,9 +317,365 @@ async def count_bans(telegram_user_id: str | int, db: Database = database):
 
         query = select(func.count(Ban.id)).where(
             Ban.telegram_user_id == user.id,
-            Ban.created_at >= datetime.now(tz=timezone.utc) - timedelta(days=365)
+            Ban.created_at >= datetime.now(tz=timezone.utc) - timedelta(days=settings.BANS_WINDOW_DAYS),
         )
 
         result = await session.execute(query)
         count = result.scalar_one()
-        return count
\ No newline at end of file
+        return count
+
+@timed("db")
+async def register_violation(
+    telegram_user_id: int | str,
+    message: str,
+    chat_id: int | None = None,
+    db: Database = database,
+    strikes_limit: int | None = None,
+    ban_limits: dict[int, int] | None = None,
+):
+    """Страйк и подсчет страйков/банов одной транзакцией.
+
+    Для группы решение принимается по материализованным счетчикам
+    (O(1) чтение), без chat_id - подсчетом по сырым таблицам.
+    Возвращает (страйков за окно, дней бана или None), либо None,
+    если пользователь неизвестен. Сам бан здесь не записывается: его
+    пишет create_ban после того, как Telegram применил ограничение.
+    """
+    strikes_limit = strikes_limit or settings.STRIKES_LIMIT
+    ban_limits = ban_limits or settings.BAN_LIMITS
+    now = datetime.now(tz=timezone.utc)
+
+    # Параллельные нарушения одного пользователя (в том числе на разных
+    # репликах) не должны выдать два бана за один и тот же страйк
+    async with state_backend.lock(f"violation:{telegram_user_id}:{chat_id}"):
+        violation = await _register_violation(
+            telegram_user_id, message, chat_id, db, strikes_limit, ban_limits, now
+        )
+    if violation is None:
+        return None
+
+    strikes, ban_days = violation
+    if state := user_cache.peek(telegram_user_id):
+        state.strikes[chat_id] = strikes
+        if chat_id is not None:
+            state.strikes.pop(None, None)
+    return strikes, ban_days
+
+
+async def _register_violation(telegram_user_id, message, chat_id, db, strikes_limit, ban_limits, now):
+    async with db.session() as session:
+        if chat_id is not None:
+            result = await session.execute(
+                select(TelegramUser.id).where(TelegramUser.telegram_id == int(telegram_user_id))
+            )
+            user_pk = result.scalar_one_or_none()
+            if user_pk is None:
+                return None
+            session.add(Strikes(telegram_user_id=user_pk, chat_id=chat_id, message=message))
+            strikes, bans = await _bump_counters(session, user_pk, chat_id, strikes=1)
+        else:
+            strikes_count = (
+                select(func.count(Strikes.id))
+                .where(
+                    Strikes.telegram_user_id == TelegramUser.id,
+                    Strikes.created_at >= now - timedelta(days=settings.STRIKES_WINDOW_DAYS),
+                )
+                .scalar_subquery()
+            )
+            bans_count = (
+                select(func.count(Ban.id))
+                .where(
+                    Ban.telegram_user_id == TelegramUser.id,
+                    Ban.created_at >= now - timedelta(days=settings.BANS_WINDOW_DAYS),
+                )
+                .scalar_subquery()
+            )
+            result = await session.execute(
+                select(TelegramUser.id, strikes_count, bans_count).where(
+                    TelegramUser.telegram_id == int(telegram_user_id)
+                )
+            )
+            row = result.first()
+            if not row:
+                return None
+            user_pk, strikes, bans = row
+            strikes += 1
+            session.add(Strikes(telegram_user_id=user_pk, message=message))
+
+        await session.flush()
+
+    ban_days = ban_limits.get(bans, 365) if strikes >= strikes_limit else None
+    return strikes, ban_days
+
+
+_COMPACT_SQL = """
+    WITH expired AS (
+        SELECT c.id, count(t.id) AS n
+        FROM violation_counters c
+        JOIN {table} t
+          ON t.telegram_user_id = c.telegram_user_id AND t.chat_id = c.chat_id
+         AND t.created_at >= c.{column}_cutoff AND t.created_at < :cutoff
+        GROUP BY c.id
+    )
+    UPDATE violation_counters c
+    SET {column} = greatest(c.{column} - expired.n, 0)
+    FROM expired
+    WHERE c.id = expired.id
+"""
+
+
+@timed("db")
+async def compact_violation_counters(db: Database = database) -> int:
+    """Вычитает из счетчиков записи, выпавшие из окна, и удаляет пустые счетчики.
+
+    Возвращает число удаленных счетчиков или -1, если компакцию уже
+    выполняет другой процесс.
+    """
+    now = datetime.now(tz=timezone.utc)
+    async with db.session() as session:
+        locked = await session.execute(
+            text("SELECT pg_try_advisory_xact_lock(hashtext('violation_counters'))")
+        )
+        if not locked.scalar_one():
+            return -1
+
+        for table, column, days in (
+            ("strikes", "strikes", settings.STRIKES_WINDOW_DAYS),
+            ("bans", "bans", settings.BANS_WINDOW_DAYS),
+        ):
+            cutoff = now - timedelta(days=days)
+            await session.execute(text(_COMPACT_SQL.format(table=table, column=column)), {"cutoff": cutoff})
+            await session.execute(
+                text(f"UPDATE violation_counters SET {column}_cutoff = :cutoff WHERE {column}_cutoff < :cutoff"),
+                {"cutoff": cutoff},
+            )
+
+        result = await session.execute(
+            delete(ViolationCounter).where(ViolationCounter.strikes == 0, ViolationCounter.bans == 0)
+        )
+        return result.rowcount
+
+
+@timed("db")
+async def check_violation_counters(fix: bool = False, db: Database = database) -> list[dict]:
+    """Пересчитывает счетчики по сырым таблицам и возвращает расхождения.
+
+    С fix=True заодно исправляет их.
+    """
+    async with db.session() as session:
+        result = await session.execute(text("""
+            SELECT c.id, c.telegram_user_id, c.chat_id, c.strikes, c.bans,
+                (SELECT count(*) FROM strikes s
+                 WHERE s.telegram_user_id = c.telegram_user_id AND s.chat_id = c.chat_id
+                   AND s.created_at >= c.strikes_cutoff) AS real_strikes,
+                (SELECT count(*) FROM bans b
+                 WHERE b.telegram_user_id = c.telegram_user_id AND b.chat_id = c.chat_id
+                   AND b.created_at >= c.bans_cutoff) AS real_bans
+            FROM violation_counters c
+        """))
+        mismatches = [
+            dict(row._mapping)
+            for row in result
+            if row.strikes != row.real_strikes or row.bans != row.real_bans
+        ]
+        if fix:
+            for row in mismatches:
+                await session.execute(
+                    update(ViolationCounter)
+                    .where(ViolationCounter.id == row["id"])
+                    .values(strikes=row["real_strikes"], bans=row["real_bans"])
+                )
+        return mismatches
+
+
+@timed("db")
+async def get_chat_settings(chat_id: int, db: Database = database) -> ChatSettings | None:
+    async with db.session() as session:
+        result = await session.execute(
+            select(ChatSettings).where(ChatSettings.chat_id == chat_id)
+        )
+        return result.scalar_one_or_none()
+
+
+@timed("db")
+async def get_obscene_words(db: Database = database) -> list[ObsceneWord]:
+    async with db.session() as session:
+        result = await session.execute(select(ObsceneWord).order_by(ObsceneWord.id))
+        return list(result.scalars())
+
+
+@timed("db")
+async def set_obscene_word(
+    pattern: str,
+    kind: str,
+    enabled: bool,
+    chat_id: int | None = None,
+    added_by: int | None = None,
+    db: Database = database,
+):
+    async with db.session() as session:
+        await session.execute(
+            insert(ObsceneWord)
+            .values(pattern=pattern, kind=kind, enabled=enabled, chat_id=chat_id, added_by=added_by)
+            .on_conflict_do_update(
+                index_elements=[ObsceneWord.pattern],
+                set_={"kind": kind, "enabled": enabled, "chat_id": chat_id, "added_by": added_by},
+            )
+        )
+
+
+@timed("db")
+async def schedule_deletion(
+    chat_id: int,
+    user_id: int,
+    user_message_id: int,
+    bot_message_id: int,
+    delay_seconds: int,
+    db: Database = database,
+):
+    async with db.session() as session:
+        job = PendingDeletion(
+            chat_id=chat_id,
+            user_id=user_id,
+            user_message_id=user_message_id,
+            bot_message_id=bot_message_id,
+            due_at=datetime.now(tz=timezone.utc) + timedelta(seconds=delay_seconds),
+        )
+        session.add(job)
+        await session.flush()
+        return job
+
+
+def _shard_filter(column, shard: int, shards: int):
+    # Как sharding.shard_for: остаток неотрицательный и для id групп < 0
+    if shards <= 1:
+        return True
+    return func.mod(func.mod(column, shards) + shards, shards) == shard
+
+
+@timed("db")
+async def claim_due_deletions(
+    limit: int, lease_seconds: float, shard: int = 0, shards: int = 1, db: Database = database
+) -> list[PendingDeletion]:
+    """Берет в работу пачку созревших удалений (самые старые первыми).
+
+    Задачи не удаляются, а откладываются на lease_seconds: если процесс
+    упадет или остановится посреди пачки, необработанные задачи снова
+    созреют. Обработанные удаляет complete_deletions. Воркер шарда
+    берет только задачи своих групп.
+    """
+    now = datetime.now(tz=timezone.utc)
+    async with db.session() as session:
+        due = (
+            select(PendingDeletion.id)
+            .where(
+                PendingDeletion.due_at <= now,
+                _shard_filter(PendingDeletion.chat_id, shard, shards),
+            )
+            .order_by(PendingDeletion.due_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        result = await session.execute(
+            update(PendingDeletion)
+            .where(PendingDeletion.id.in_(due))
+            .values(due_at=now + timedelta(seconds=lease_seconds))
+            .returning(PendingDeletion)
+            .execution_options(synchronize_session=False)
+        )
+        return list(result.scalars())
+
+
+@timed("db")
+async def complete_deletions(job_ids: list[int], db: Database = database) -> None:
+    async with db.session() as session:
+        await session.execute(delete(PendingDeletion).where(PendingDeletion.id.in_(job_ids)))
+
+
+@timed("db")
+async def count_pending_deletions(shard: int = 0, shards: int = 1, db: Database = database) -> int:
+    async with db.session() as session:
+        result = await session.execute(
+            select(func.count(PendingDeletion.id)).where(
+                _shard_filter(PendingDeletion.chat_id, shard, shards)
+            )
+        )
+        return result.scalar_one()
+
+
+@timed("db")
+async def archive_expired(model, before: datetime, limit: int, sink, db: Database = database) -> int:
+    """Удаляет пачку записей старше before, предварительно отдав их в sink.
+
+    sink вызывается внутри транзакции: если архив не записался,
+    удаление откатывается. Пачка ограничена limit, а ожидание
+    блокировок - lock_timeout, чтобы не держать таблицу надолго.
+    """
+    columns = [column for column in model.__table__.columns]
+    async with db.session() as session:
+        await session.execute(text("SET LOCAL lock_timeout = '5s'"))
+        expired = (
+            select(model.id)
+            .where(model.created_at < before)
+            .order_by(model.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        result = await session.execute(
+            delete(model).where(model.id.in_(expired.scalar_subquery())).returning(*columns)
+        )
+        rows = [dict(row._mapping) for row in result]
+        if rows:
+            await sink(model.__tablename__, rows)
+        return len(rows)
+
+
+_PARTITIONS_SQL = """
+    SELECT child.relname
+    FROM pg_inherits
+    JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+    JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+    WHERE parent.relname = :table
+"""
+
+
+@timed("db")
+async def get_partitions(table: str, db: Database = database) -> list[str]:
+    """Имена партиций таблицы (пустой список, если таблица не партиционирована)."""
+    async with db.session() as session:
+        result = await session.execute(text(_PARTITIONS_SQL), {"table": table})
+        return [row[0] for row in result]
+
+
+@timed("db")
+async def ensure_month_partition(table: str, month: datetime, db: Database = database) -> None:
+    """Создает партицию {table}_YYYY_MM на месяц month, если ее еще нет."""
+    start = month.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    end = (start + timedelta(days=32)).replace(day=1)
+    async with db.session() as session:
+        await session.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {table}_{start:%Y_%m} PARTITION OF {table} "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        ))
+
+
+@timed("db")
+async def archive_partition(table: str, partition: str, limit: int, sink, db: Database = database) -> int:
+    """Выносит истекшую партицию целиком: строки пачками в sink, затем DETACH + DROP.
+
+    Строки читаются курсором без блокировок таблицы: created_at ставится
+    при вставке, и в целиком истекший месяц новые записи не попадают.
+    Отсоединение и удаление - короткая транзакция после того, как архив
+    записан; если sink упал, партиция остается до следующего прогона.
+    """
+    archived = 0
+    async with db.session() as session:
+        result = await session.stream(text(f"SELECT * FROM {partition} ORDER BY id"))
+        async for rows in result.partitions(limit):
+            await sink(table, [dict(row._mapping) for row in rows])
+            archived += len(rows)
+    async with db.session() as session:
+        await session.execute(text("SET LOCAL lock_timeout = '5s'"))
+        await session.execute(text(f"ALTER TABLE {table} DETACH PARTITION {partition}"))
+        await session.execute(text(f"DROP TABLE {partition}"))
+    return archived
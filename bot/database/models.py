@@ -1,5 +1,6 @@
 from sqlalchemy import (
-    Column, Integer, String, ForeignKey, Text, TIMESTAMP, text, BigInteger, UUID, Boolean, JSON, Date
+    Column, Integer, String, ForeignKey, Text, TIMESTAMP, text, BigInteger, UUID, Boolean, JSON, Date, Index,
+    UniqueConstraint,
 )
 from sqlalchemy.orm import relationship, declarative_base, backref, Mapped
 from sqlalchemy.types import DECIMAL
@@ -26,7 +27,7 @@ class BaseModel(Base):
 class TelegramUser(BaseModel):
     __tablename__ = "telegram_users"
 
-    telegram_id = Column(Text)
+    telegram_id = Column(BigInteger, unique=True)
     username = Column(String(50))
     first_name = Column(String)
 
@@ -48,12 +49,16 @@ class TelegramUser(BaseModel):
 
 class Strikes(BaseModel):
     __tablename__ = "strikes"
+    __table_args__ = (
+        Index("ix_strikes_telegram_user_id_chat_id_created_at", "telegram_user_id", "chat_id", "created_at"),
+    )
 
     telegram_user_id = Column(
         Integer,
         ForeignKey("telegram_users.id", ondelete="CASCADE"),
         nullable=False,
     )
+    chat_id = Column(BigInteger)
     message = Column(Text)
 
     telegram_user = relationship(
@@ -63,6 +68,9 @@ class Strikes(BaseModel):
 
 class Ban(BaseModel):
     __tablename__ = "bans"
+    __table_args__ = (
+        Index("ix_bans_telegram_user_id_chat_id_created_at", "telegram_user_id", "chat_id", "created_at"),
+    )
 
     telegram_user_id = Column(
         Integer,
@@ -70,6 +78,8 @@ class Ban(BaseModel):
         nullable=False,
     )
 
+    chat_id = Column(BigInteger)
+
     reason = Column(Text)
 
     period = Column(Integer)
@@ -78,4 +88,64 @@ class Ban(BaseModel):
         "TelegramUser",
         back_populates="bans",
     )
-    
\ No newline at end of file
+    
+class ChatSettings(BaseModel):
+    """Настройки отдельной группы, пустые поля берутся из глобальных settings."""
+
+    __tablename__ = "chat_settings"
+
+    chat_id = Column(BigInteger, nullable=False, unique=True)
+    moderators_ids = Column(JSON)
+    moderator_topic_id = Column(BigInteger)
+    strikes_limit = Column(Integer)
+    ban_limits = Column(JSON)
+    flood_limit = Column(Integer)
+    flood_window_seconds = Column(Integer)
+    flood_mute_minutes = Column(Integer)
+
+class ObsceneWord(BaseModel):
+    """Слово словаря мата поверх OBSCENE_ROOTS/FULL_WORD_PATTERNS из env.
+
+    kind - "root" (корень, совпадает с продолжением) или "full" (слово
+    целиком). enabled=False убирает слово, в том числе из env.
+    """
+
+    __tablename__ = "obscene_words"
+
+    pattern = Column(String(100), nullable=False, unique=True)
+    kind = Column(String(10), nullable=False, default="root")
+    enabled = Column(Boolean, nullable=False, default=True)
+    chat_id = Column(BigInteger)
+    added_by = Column(BigInteger)
+
+class ViolationCounter(BaseModel):
+    """Страйки и баны пользователя в группе за скользящие окна.
+
+    Пишутся вместе со страйками/банами, старые записи вычитаются
+    периодической компакцией (strikes_cutoff/bans_cutoff - граница,
+    до которой уже вычтено).
+    """
+
+    __tablename__ = "violation_counters"
+    __table_args__ = (UniqueConstraint("telegram_user_id", "chat_id"),)
+
+    telegram_user_id = Column(
+        Integer,
+        ForeignKey("telegram_users.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    chat_id = Column(BigInteger, nullable=False)
+    strikes = Column(Integer, nullable=False, default=0)
+    bans = Column(Integer, nullable=False, default=0)
+    strikes_cutoff = Column(TIMESTAMP(timezone=True), nullable=False)
+    bans_cutoff = Column(TIMESTAMP(timezone=True), nullable=False)
+
+class PendingDeletion(BaseModel):
+    __tablename__ = "pending_deletions"
+    __table_args__ = (Index("ix_pending_deletions_due_at", "due_at"),)
+
+    chat_id = Column(BigInteger, nullable=False)
+    user_id = Column(BigInteger, nullable=False)
+    user_message_id = Column(BigInteger, nullable=False)
+    bot_message_id = Column(BigInteger, nullable=False)
+    due_at = Column(TIMESTAMP(timezone=True), nullable=False)
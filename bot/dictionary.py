@@ -0,0 +1,150 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+from contextlib import suppress
+
+import settings
+from database import cruds
+from metrics import registry
+from obscene import ObsceneMatcher
+from settings import logger
+
+KINDS = ("root", "full")
+
+
+def content_hash(roots: list[str], full_words: list[str]) -> str:
+    payload = json.dumps([sorted(roots), sorted(full_words)], ensure_ascii=False)
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+def is_valid_pattern(pattern: str) -> bool:
+    try:
+        re.compile(pattern)
+    except re.error:
+        return False
+    return True
+
+
+class ObsceneDictionary:
+    """Словарь мата: env как основа плюс правки из таблицы obscene_words.
+
+    Новый матчер собирается в потоке и подменяется одним присваиванием,
+    так что идущие проверки дорабатывают на старом. Проверенный набор
+    паттернов кладется на диск под хэшем содержимого: при рестарте или
+    повторной перезагрузке того же словаря паттерны не валидируются
+    заново по одному. Сам индекс матчера на диск не кладется: он
+    строится в фоне и быстрее, чем чтение файла.
+    Воркеры шардов подхватывают чужие правки периодической сверкой.
+    """
+
+    def __init__(
+        self,
+        roots: list[str],
+        full_words: list[str],
+        reload_interval: float = 60,
+        cache_dir: str | None = None,
+    ):
+        self.base_roots = list(roots)
+        self.base_full_words = list(full_words)
+        self.reload_interval = reload_interval
+        self.cache_dir = cache_dir
+        self.roots = self.base_roots
+        self.full_words = self.base_full_words
+        self.version = content_hash(self.roots, self.full_words)
+        self.matcher = ObsceneMatcher(self.roots, self.full_words)
+        self._listeners = []
+        self._task: asyncio.Task | None = None
+
+        self.reloads = 0
+        self.snapshot_hits = 0
+
+    def on_swap(self, callback) -> None:
+        """callback(roots, full_words) вызывается после подмены матчера."""
+        self._listeners.append(callback)
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "version": self.version,
+            "patterns": len(self.matcher.patterns),
+            "reloads": self.reloads,
+            "snapshot_hits": self.snapshot_hits,
+        }
+
+    async def reload(self) -> bool:
+        """Перечитывает словарь из БД; True, если матчер поменялся."""
+        roots, full_words = list(self.base_roots), list(self.base_full_words)
+        for word in await cruds.get_obscene_words():
+            for words in (roots, full_words):
+                if word.pattern in words:
+                    words.remove(word.pattern)
+            if word.enabled:
+                (roots if word.kind == "root" else full_words).append(word.pattern)
+
+        version = content_hash(roots, full_words)
+        if version == self.version:
+            return False
+
+        roots, full_words = await asyncio.to_thread(self._validated, version, roots, full_words)
+        matcher = ObsceneMatcher(roots, full_words)
+        await asyncio.to_thread(matcher.compile)
+
+        self.roots, self.full_words = roots, full_words
+        self.matcher, self.version = matcher, version
+        self.reloads += 1
+        for callback in self._listeners:
+            callback(roots, full_words)
+        logger.info(f"Словарь мата обновлен: {version}, паттернов {len(matcher.patterns)}")
+        return True
+
+    def _validated(self, version: str, roots: list[str], full_words: list[str]):
+        path = os.path.join(self.cache_dir, f"{version}.json") if self.cache_dir else None
+        if path and os.path.exists(path):
+            with suppress(OSError, ValueError):
+                with open(path, encoding="utf-8") as f:
+                    snapshot = json.load(f)
+                self.snapshot_hits += 1
+                return snapshot["roots"], snapshot["full_words"]
+
+        # Одно битое слово не должно ломать весь матчер
+        valid_roots = [root for root in roots if is_valid_pattern(root)]
+        valid_full_words = [word for word in full_words if is_valid_pattern(word)]
+        if len(valid_roots) + len(valid_full_words) < len(roots) + len(full_words):
+            logger.warning("В словаре мата есть некорректные паттерны, они пропущены")
+
+        if path:
+            with suppress(OSError):
+                os.makedirs(self.cache_dir, exist_ok=True)
+                tmp = f"{path}.tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump({"roots": valid_roots, "full_words": valid_full_words}, f, ensure_ascii=False)
+                os.replace(tmp, path)
+        return valid_roots, valid_full_words
+
+    async def _run(self):
+        while True:
+            try:
+                await self.reload()
+            except Exception:
+                logger.exception("Не удалось перезагрузить словарь мата")
+            await asyncio.sleep(self.reload_interval)
+
+
+obscene_dictionary = ObsceneDictionary(
+    settings._OBSCENE_ROOTS,
+    settings._FULL_WORD_PATTERNS,
+    reload_interval=settings.OBSCENE_RELOAD_INTERVAL,
+    cache_dir=settings.MATCHER_CACHE_DIR,
+)
+registry.collector("obscene_dictionary", obscene_dictionary.stats)
@@ -0,0 +1,64 @@
+import time
+from collections import OrderedDict
+
+import settings
+from metrics import registry
+from state import StateBackend, state_backend
+
+
+class FloodGuard:
+    """Антифлуд: token bucket на пару (группа, пользователь).
+
+    Ведро вмещает limit сообщений и наполняется со скоростью limit/window
+    в секунду, поэтому больше limit сообщений за window секунд подряд не
+    пройдет. Состояние - список [токены, время] в LRU-словаре на
+    max_users записей: около 350 байт на пользователя вместе с ключом
+    (benchmarks/bench_flood.py, tracemalloc на 100 тыс. записей), то
+    есть ~35 МБ на 100 тыс.
+
+    С общим бэкендом (несколько реплик) вместо ведра используется
+    счетчик в окне window в бэкенде: сообщения пользователя могут
+    приходить на разные реплики.
+    """
+
+    def __init__(self, max_users: int = 100_000, backend: StateBackend | None = None):
+        self.max_users = max_users
+        self.backend = backend
+        self._buckets: OrderedDict[tuple[int, int], list[float]] = OrderedDict()
+        self.flooders = 0
+
+    async def hit(self, chat_id: int, user_id: int, limit: int, window: float) -> bool:
+        """Учитывает сообщение; True, если пользователь превысил лимит."""
+        if self.backend is not None and self.backend.shared:
+            return await self.backend.hit(f"flood:{chat_id}:{user_id}", window) > limit
+
+        now = time.monotonic()
+        key = (chat_id, user_id)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [float(limit), now]
+            if len(self._buckets) > self.max_users:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(limit, bucket[0] + (now - bucket[1]) * limit / window)
+            bucket[1] = now
+
+        if bucket[0] < 1:
+            return True
+        bucket[0] -= 1
+        return False
+
+    async def reset(self, chat_id: int, user_id: int) -> None:
+        """После мута счет начинается заново, чтобы не мутить повторно."""
+        self._buckets.pop((chat_id, user_id), None)
+        if self.backend is not None and self.backend.shared:
+            await self.backend.delete(f"flood:{chat_id}:{user_id}")
+        self.flooders += 1
+
+    def stats(self) -> dict:
+        return {"tracked": len(self._buckets), "flooders": self.flooders}
+
+
+flood_guard = FloodGuard(max_users=settings.FLOOD_MAX_USERS, backend=state_backend)
+registry.collector("flood", flood_guard.stats)
@@ -0,0 +1,60 @@
+import re
+import time
+from collections import deque
+from typing import NamedTuple
+
+import settings
+
+
+class SeenMessage(NamedTuple):
+    timestamp: float
+    user_id: int
+    message_id: int
+    text: str
+
+
+class MessageHistory:
+    """Кольцевой буфер последних сообщений каждого чата для /purge и /massban."""
+
+    def __init__(self, maxlen: int = 5000):
+        self.maxlen = maxlen
+        self._chats: dict[int, deque[SeenMessage]] = {}
+
+    def add(self, chat_id: int, user_id: int, message_id: int, text: str | None) -> None:
+        messages = self._chats.get(chat_id)
+        if messages is None:
+            messages = self._chats[chat_id] = deque(maxlen=self.maxlen)
+        messages.append(SeenMessage(time.time(), user_id, message_id, text or ""))
+
+    def find(
+        self,
+        chat_id: int,
+        seconds: float,
+        user_id: int | None = None,
+        pattern: re.Pattern | None = None,
+        exclude: set[int] | frozenset[int] = frozenset(),
+    ) -> list[SeenMessage]:
+        since = time.time() - seconds
+        found = []
+        for message in reversed(self._chats.get(chat_id, ())):
+            if message.timestamp < since:
+                break
+            if message.user_id in exclude:
+                continue
+            if user_id is not None and message.user_id != user_id:
+                continue
+            if pattern is not None and not pattern.search(message.text):
+                continue
+            found.append(message)
+        return found
+
+    def forget(self, chat_id: int, message_ids: set[int]) -> None:
+        messages = self._chats.get(chat_id)
+        if not messages:
+            return
+        self._chats[chat_id] = deque(
+            (m for m in messages if m.message_id not in message_ids), maxlen=self.maxlen
+        )
+
+
+message_history = MessageHistory(maxlen=settings.HISTORY_PER_CHAT)
@@ -1,16 +1,31 @@
 import asyncio
-import json
+import re
 from contextlib import suppress
 from datetime import datetime, timedelta, timezone
 from textwrap import dedent
 
 import settings
+from audit import audit_logger
+from chat_config import chat_configs
+from confirmations import confirmation_writer
 from database import cruds
+from dictionary import KINDS, is_valid_pattern, obscene_dictionary
+from flood import flood_guard
+from history import message_history
+from metrics import registry, timed
+from moderators import moderator_resolver
+from processing import KeyedUpdateProcessor
+from raid import raid_guard
+from scheduler import deletion_scheduler
+from sharding import ShardRouter
+from spam import spam_fingerprints
+from throttling import TelegramRateLimiter, moderator_notifier
 from settings import logger
 from telegram import ChatPermissions, InlineKeyboardButton, InlineKeyboardMarkup, Update
 from telegram.ext import (
     ApplicationBuilder,
     CallbackQueryHandler,
+    ChatMemberHandler,
     CommandHandler,
     ContextTypes,
     MessageHandler,
@@ -20,17 +35,21 @@ from utils import (
     ObsceneWordFound,
     check_obscene,
     extract_name,
-    get_user_hash,
+    make_confirmation_token,
+    shutdown_task,
     startup_task,
+    stop_task,
+    verify_confirmation_token,
 )
 
 
 async def block_user(
     chat_id: int,
     user_id: int,
-    days: int,
+    days: float,
     context: ContextTypes.DEFAULT_TYPE,
     reason: str,
+    record_ban: bool = True,
 ):
     until = datetime.now(tz=timezone.utc) + timedelta(days=days)
 
@@ -53,13 +72,18 @@ async def block_user(
         ),
         until_date=until,
     )
-    await cruds.create_ban(telegram_user_id=user_id, reason=reason, period=days)
+    if record_ban:
+        await cruds.create_ban(
+            telegram_user_id=user_id, reason=reason, period=days, chat_id=chat_id
+        )
 
 
+@timed("handler", count_queries=True)
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text("Привет! Я жив 👋")
 
 
+@timed("handler", count_queries=True)
 async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text(
         dedent(
@@ -76,50 +100,69 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 /strike - предупреждение с фиксацией удалением сообщений
                 
                 /ban {int} - блокировать на int дней
+
+                /purge {минут} [dry] - удалить сообщения за последние минуты
+                (в ответ на сообщение - только его автора)
+
+                /massban {минут} {дней} [dry] {regex} - заблокировать всех,
+                чьи сообщения за последние минуты подходят под regex
+                (regex - весь остаток строки, с пробелами)
+
+                /stats - сводка метрик бота
+
+                /addword {слово} [root|full] - добавить слово в словарь мата
+                (root - корень с любым окончанием, по умолчанию)
+
+                /delword {слово} - убрать слово из словаря мата
+
+                Словарь общий для всех групп: /addword и /delword
+                доступны только модераторам бота (MODERATORS_IDS)
             """
         )
     )
 
 
+@timed("handler", count_queries=True)
 async def strike(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.delete()
 
-    if update.message.from_user.id not in settings.MODERATORS_IDS or \
-        update.message.reply_to_message.from_user.id in settings.MODERATORS_IDS:
-        return
-    
     if not update.message.reply_to_message:
         return
+
+    config = await chat_configs.get(update.message.chat_id)
+    moderators_ids = await moderator_resolver.get(context.bot, update.message.chat_id)
+    if update.message.from_user.id not in moderators_ids or \
+        update.message.reply_to_message.from_user.id in moderators_ids:
+        return
     
-    update.message.reply_to_message.delete()
+    await update.message.reply_to_message.delete()
 
-    await cruds.create_strike_record(
+    violation = await cruds.register_violation(
         telegram_user_id=update.message.reply_to_message.from_user.id,
         message=update.message.reply_to_message.text
         or update.message.reply_to_message.caption,
+        chat_id=update.message.chat_id,
+        strikes_limit=config.strikes_limit,
+        ban_limits=config.ban_limits,
     )
-    current_strikes = await cruds.count_strikes(
-        telegram_user_id=update.message.reply_to_message.from_user.id
-    )
-    if current_strikes < settings.STRIKES_LIMIT:
-        return await context.bot.send_message(
+    if not violation:
+        return
+    current_strikes, days = violation
+    if days is None:
+        return moderator_notifier.notify(
+            context.bot,
             chat_id=update.message.chat_id,
             text=dedent(
                 f"""
                     {await extract_name(update.message.reply_to_message.from_user)},
                     вы нарушили правила сообщества и заработали страйк.
                     
-                    Еще {settings.STRIKES_LIMIT - current_strikes} и будет бан!
+                    Еще {config.strikes_limit - current_strikes} и будет бан!
                 
                 """
             ),
-            message_thread_id=settings.MODERATOR_TOPIC_ID,
         )
 
-    user_bans_amount = await cruds.count_bans(
-        telegram_user_id=update.message.reply_to_message.from_user.id
-    )
-    days = settings.BAN_LIMITS.get(user_bans_amount, 365)
     await block_user(
         chat_id=update.message.chat_id,
         user_id=update.message.reply_to_message.from_user.id,
@@ -128,7 +171,8 @@ async def strike(update: Update, context: ContextTypes.DEFAULT_TYPE):
         reason=update.message.reply_to_message.text
         or update.message.reply_to_message.caption,
     )
-    await context.bot.send_message(
+    moderator_notifier.notify(
+        context.bot,
         chat_id=update.message.chat_id,
         text=dedent(
             f"""
@@ -137,20 +181,21 @@ async def strike(update: Update, context: ContextTypes.DEFAULT_TYPE):
             
             Лимит страйков превышен, доступ в сообщество заблокирован на {days} дн."""
         ),
-        message_thread_id=settings.MODERATOR_TOPIC_ID,
     )
 
 
+@timed("handler", count_queries=True)
 async def ban(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.delete()
-    if update.message.from_user.id not in settings.MODERATORS_IDS:
+    moderators_ids = await moderator_resolver.get(context.bot, update.message.chat_id)
+    if update.message.from_user.id not in moderators_ids:
         return
     if not update.message.reply_to_message:
         return
 
     user_id = update.message.reply_to_message.from_user.id
 
-    if user_id in settings.MODERATORS_IDS:
+    if user_id in moderators_ids:
         return
     
     chat_id = update.effective_chat.id
@@ -171,17 +216,19 @@ async def ban(update: Update, context: ContextTypes.DEFAULT_TYPE):
         context,
         reason=f"MANUAL BLOCK BY {update.message.from_user.id}\n\n{update.message.reply_to_message.text}",
     )
-    await context.bot.send_message(
+    moderator_notifier.notify(
+        context.bot,
         chat_id=update.message.chat_id,
         text=f"Пользователь {await extract_name(update.message.reply_to_message.from_user)} заблокирован на {days} дн.",
-        message_thread_id=settings.MODERATOR_TOPIC_ID,
     )
 
 
+@timed("handler", count_queries=True)
 async def warn(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.delete()
 
-    if update.message.from_user.id not in settings.MODERATORS_IDS:
+    moderators_ids = await moderator_resolver.get(context.bot, update.message.chat_id)
+    if update.message.from_user.id not in moderators_ids:
         return
     if not update.message.reply_to_message:
         return
@@ -199,41 +246,318 @@ async def warn(update: Update, context: ContextTypes.DEFAULT_TYPE):
     )
 
 
-async def delete_if_not_confirmed(
-    chat_id: int | str,
-    user_id: int,
-    user_message_id: int | str,
-    bot_message_id: int | str,
-    context: ContextTypes.DEFAULT_TYPE,
-    delay_seconds: int = 60,
+@timed("handler", count_queries=True)
+async def stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    await update.message.delete()
+    moderators_ids = await moderator_resolver.get(context.bot, update.message.chat_id)
+    if update.message.from_user.id not in moderators_ids:
+        return
+    moderator_notifier.notify(
+        context.bot,
+        chat_id=update.message.chat_id,
+        text=registry.summary_text(),
+    )
+
+
+async def update_dictionary(
+    update: Update, context: ContextTypes.DEFAULT_TYPE, enabled: bool
 ):
-    await asyncio.sleep(delay_seconds)
+    await update.message.delete()
+    # Словарь общий для всех групп, поэтому править его могут только
+    # модераторы бота из MODERATORS_IDS, а не админы отдельной группы
+    if update.message.from_user.id not in settings.MODERATORS_IDS:
+        return
 
-    user = await cruds.get_telegram_user(telegram_user_id=user_id)
+    args = context.args or []
+    if not args:
+        return
+    pattern = args[0].lower()
+    kind = args[1] if len(args) > 1 else "root"
+    if kind not in KINDS or not is_valid_pattern(pattern):
+        return moderator_notifier.notify(
+            context.bot,
+            chat_id=update.message.chat_id,
+            text=f"Некорректное слово или тип: {pattern} {kind}",
+        )
+
+    await cruds.set_obscene_word(
+        pattern=pattern,
+        kind=kind,
+        enabled=enabled,
+        chat_id=update.message.chat_id,
+        added_by=update.message.from_user.id,
+    )
+    await obscene_dictionary.reload()
+    moderator_notifier.notify(
+        context.bot,
+        chat_id=update.message.chat_id,
+        text=(
+            f"Словарь мата: {'добавлено' if enabled else 'убрано'} «{pattern}», "
+            f"версия {obscene_dictionary.version}"
+        ),
+    )
+
+
+@timed("handler", count_queries=True)
+async def add_word(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    await update_dictionary(update, context, enabled=True)
+
+
+@timed("handler", count_queries=True)
+async def del_word(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    await update_dictionary(update, context, enabled=False)
+
+
+def parse_bulk_args(args: list[str]) -> tuple[list[str], bool]:
+    dry_run = "dry" in args
+    return [arg for arg in args if arg != "dry"], dry_run
+
+
+# /massban {минут} {дней} [dry] {regex}: числа впереди, чтобы regex мог
+# содержать пробелы и сам начинаться с чисел
+MASSBAN_ARGS = re.compile(r"\S+\s+(\d+)\s+(\d+)\s+(?:(dry)\s+)?(.+)", re.DOTALL)
+
+
+def parse_massban_args(text: str) -> tuple[re.Pattern, int, int, bool] | None:
+    match = MASSBAN_ARGS.match(text)
+    if not match:
+        return None
+    minutes, days, dry, pattern = match.groups()
+    try:
+        return re.compile(pattern.strip(), re.IGNORECASE), int(minutes), max(int(days), 1), bool(dry)
+    except re.error:
+        return None
 
-    await context.bot.delete_message(chat_id=chat_id, message_id=bot_message_id)
 
-    if user.confirmed:
+def estimate_seconds(deletions: int, bans: int = 0) -> float:
+    # deleteMessages удаляет до 100 сообщений за вызов
+    calls = -(-deletions // 100) + bans
+    return calls / settings.BULK_ACTIONS_PER_SECOND
+
+
+async def delete_in_batches(bot, chat_id: int, message_ids: list[int]):
+    for i in range(0, len(message_ids), 100):
+        try:
+            await bot.delete_messages(chat_id=chat_id, message_ids=message_ids[i:i + 100])
+        except Exception as e:
+            logger.warning(f"Не удалось удалить пачку сообщений: {e}")
+    message_history.forget(chat_id, set(message_ids))
+
+
+@timed("handler", count_queries=True)
+async def purge(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    await update.message.delete()
+    moderators_ids = await moderator_resolver.get(context.bot, update.message.chat_id)
+    if update.message.from_user.id not in moderators_ids:
         return
 
+    args, dry_run = parse_bulk_args(context.args or [])
     try:
-        await context.bot.delete_message(chat_id=chat_id, message_id=user_message_id)
-    except Exception as e:
-        print(f"Не удалось удалить сообщение: {e}")
+        minutes = int(args[0]) if args else 10
+    except ValueError:
+        minutes = 10
+
+    target = update.message.reply_to_message
+    messages = message_history.find(
+        chat_id=update.message.chat_id,
+        seconds=minutes * 60,
+        user_id=target.from_user.id if target else None,
+        exclude=moderators_ids,
+    )
+    message_ids = [message.message_id for message in messages]
+
+    if dry_run:
+        return moderator_notifier.notify(
+            context.bot,
+            chat_id=update.message.chat_id,
+            text=(
+                f"/purge: будет удалено {len(message_ids)} сообщений "
+                f"от {len({message.user_id for message in messages})} пользователей "
+                f"за {minutes} мин., примерно {estimate_seconds(len(message_ids)):.1f} сек."
+            ),
+        )
+
+    await delete_in_batches(context.bot, update.message.chat_id, message_ids)
+    moderator_notifier.notify(
+        context.bot,
+        chat_id=update.message.chat_id,
+        text=f"/purge: удалено {len(message_ids)} сообщений за {minutes} мин.",
+    )
 
 
+@timed("handler", count_queries=True)
+async def massban(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    await update.message.delete()
+    moderators_ids = await moderator_resolver.get(context.bot, update.message.chat_id)
+    if update.message.from_user.id not in moderators_ids:
+        return
+
+    parsed = parse_massban_args(update.message.text or "")
+    if parsed is None:
+        return
+    pattern, minutes, days, dry_run = parsed
+
+    chat_id = update.message.chat_id
+    messages = message_history.find(
+        chat_id=chat_id,
+        seconds=minutes * 60,
+        pattern=pattern,
+        exclude=moderators_ids,
+    )
+    user_ids = {message.user_id for message in messages}
+    message_ids = [message.message_id for message in messages]
+
+    if dry_run:
+        return moderator_notifier.notify(
+            context.bot,
+            chat_id=chat_id,
+            text=(
+                f"/massban: будет заблокировано {len(user_ids)} пользователей "
+                f"на {days} дн. и удалено {len(message_ids)} сообщений за {minutes} мин., "
+                f"примерно {estimate_seconds(len(message_ids), len(user_ids)):.1f} сек."
+            ),
+        )
+
+    await delete_in_batches(context.bot, chat_id, message_ids)
+
+    semaphore = asyncio.Semaphore(settings.MASSBAN_CONCURRENCY)
+
+    async def ban_one(user_id: int):
+        async with semaphore:
+            try:
+                await block_user(
+                    chat_id,
+                    user_id,
+                    days,
+                    context,
+                    reason=f"MASSBAN BY {update.message.from_user.id}: {pattern.pattern}",
+                )
+            except Exception as e:
+                logger.warning(f"Не удалось заблокировать {user_id}: {e}")
+
+    await asyncio.gather(*(ban_one(user_id) for user_id in user_ids))
+    moderator_notifier.notify(
+        context.bot,
+        chat_id=chat_id,
+        text=f"/massban: заблокировано {len(user_ids)} пользователей на {days} дн.",
+    )
+
+
+async def check_flood(update: Update, context: ContextTypes.DEFAULT_TYPE) -> bool:
+    """Мутит пользователя, превысившего лимит сообщений группы."""
+    chat_id = update.message.chat_id
+    user_id = update.message.from_user.id
+    config = await chat_configs.get(chat_id)
+    if not await flood_guard.hit(chat_id, user_id, config.flood_limit, config.flood_window_seconds):
+        return False
+    if user_id in await moderator_resolver.get(context.bot, chat_id):
+        return False
+
+    await flood_guard.reset(chat_id, user_id)
+    await update.message.delete()
+    await block_user(
+        chat_id=chat_id,
+        user_id=user_id,
+        days=config.flood_mute_minutes / (24 * 60),
+        context=context,
+        reason="флуд",
+        record_ban=False,
+    )
+    moderator_notifier.notify(
+        context.bot,
+        chat_id=chat_id,
+        text=(
+            f"{await extract_name(update.message.from_user)}, слишком много сообщений. "
+            f"Мут на {config.flood_mute_minutes} мин."
+        ),
+    )
+    return True
+
+
+def media_fingerprint(message) -> str | None:
+    # Стикеры и гифки честно повторяются у разных людей, их не считаем.
+    # Пересланное медиа тоже: один и тот же мем из канала пересылают многие,
+    # а рекламу в подписи все равно поймает отпечаток текста
+    if message.forward_origin:
+        return None
+    if message.photo:
+        return message.photo[-1].file_unique_id
+    media = message.video or message.document
+    return media.file_unique_id if media else None
+
+
+async def handle_spam(
+    update: Update, context: ContextTypes.DEFAULT_TYPE, copies: list[tuple[int, int]]
+) -> bool:
+    """Удаляет копии спама (и при SPAM_ACTION=strike выдает страйки).
+
+    Возвращает False, если сообщение модератора и трогать его не нужно.
+    """
+    chat_id = update.message.chat_id
+    moderators_ids = await moderator_resolver.get(context.bot, chat_id)
+    copies = [(user_id, message_id) for user_id, message_id in copies if user_id not in moderators_ids]
+    if not copies:
+        return False
+
+    await delete_in_batches(context.bot, chat_id, [message_id for _, message_id in copies])
+    spammers = {user_id for user_id, _ in copies}
+    moderator_notifier.notify(
+        context.bot,
+        chat_id=chat_id,
+        text=f"Удалено копий спама: {len(copies)} от {len(spammers)} пользователей",
+    )
+    if settings.SPAM_ACTION != "strike":
+        return True
+
+    config = await chat_configs.get(chat_id)
+    reason = "спам: " + (update.message.text or update.message.caption or "медиа")
+    for user_id in spammers:
+        violation = await cruds.register_violation(
+            telegram_user_id=user_id,
+            message=reason,
+            chat_id=chat_id,
+            strikes_limit=config.strikes_limit,
+            ban_limits=config.ban_limits,
+        )
+        if violation and violation[1] is not None:
+            await block_user(
+                chat_id=chat_id,
+                user_id=user_id,
+                days=violation[1],
+                context=context,
+                reason=reason,
+            )
+    return True
+
+
+@timed("handler", count_queries=True)
 async def listen_all_mesages(update: Update, context: ContextTypes.DEFAULT_TYPE):
     with suppress(Exception):
-        logger.info(json.dumps(update.message.to_dict(), ensure_ascii=False))
+        audit_logger.info(update.message.to_dict())
+
+    message_history.add(
+        chat_id=update.message.chat_id,
+        user_id=update.message.from_user.id,
+        message_id=update.message.message_id,
+        text=update.message.text or update.message.caption,
+    )
+
+    if await check_flood(update, context):
+        return
 
-    user = await cruds.get_telegram_user(telegram_user_id=update.message.from_user.id)
-    if not user:
+    user = await cruds.get_user_state(telegram_user_id=update.message.from_user.id)
+    if not user.known:
         user = await cruds.create_telegram_user(**update.message.from_user.to_dict())
 
     if not user.confirmed:
-        user_hash = await get_user_hash(user_data=update.message.from_user.to_dict())
-        callback_data = f"user_confirmation_{update.message.from_user.id}"
-        logger.info(f"{callback_data=}")
+        raid_guard.register(update.message.chat_id, update.message.from_user.id)
+        if not raid_guard.should_send_captcha(update.message.chat_id, update.message.from_user.id):
+            raid_guard.delete_later(
+                context.bot, update.message.chat_id, update.message.message_id
+            )
+            return
+
+        callback_data = make_confirmation_token(update.message.from_user.id)
         message = await update.message.reply_text(
             dedent(
                 f"""
@@ -257,54 +581,63 @@ async def listen_all_mesages(update: Update, context: ContextTypes.DEFAULT_TYPE)
                 ]
             ),
         )
-        asyncio.create_task(
-            delete_if_not_confirmed(
-                chat_id=update.message.chat_id,
-                user_id=update.message.from_user.id,
-                user_message_id=update.message.message_id,
-                bot_message_id=message.id,
-                context=context,
-                delay_seconds=60,
-            )
+        raid_guard.captcha_sent(update.message.chat_id, update.message.from_user.id)
+        await deletion_scheduler.schedule(
+            chat_id=update.message.chat_id,
+            user_id=update.message.from_user.id,
+            user_message_id=update.message.message_id,
+            bot_message_id=message.id,
+            delay_seconds=settings.CAPTCHA_TIMEOUT_SECONDS,
         )
 
+    copies = spam_fingerprints.check(
+        chat_id=update.message.chat_id,
+        user_id=update.message.from_user.id,
+        message_id=update.message.message_id,
+        text=update.message.text or update.message.caption,
+        file_unique_id=media_fingerprint(update.message),
+    )
+    if copies and await handle_spam(update, context, copies):
+        return
+
     try:
         await check_obscene(text=update.message.text or update.message.caption)
     except ObsceneWordFound:
-        if update.message.from_user.id in settings.MODERATORS_IDS:
+        config = await chat_configs.get(update.message.chat_id)
+        moderators_ids = await moderator_resolver.get(context.bot, update.message.chat_id)
+        if update.message.from_user.id in moderators_ids:
             return
-        await context.bot.send_message(
+        moderator_notifier.notify(
+            context.bot,
             chat_id=update.message.chat_id,
             text=f"{await extract_name(update.message.from_user)}, у нас не матерятся!",
-            message_thread_id=settings.MODERATOR_TOPIC_ID,
         )
         await update.message.delete()
-        await cruds.create_strike_record(
+        violation = await cruds.register_violation(
             telegram_user_id=update.message.from_user.id,
             message=update.message.text or update.message.caption,
+            chat_id=update.message.chat_id,
+            strikes_limit=config.strikes_limit,
+            ban_limits=config.ban_limits,
         )
-        current_strikes = await cruds.count_strikes(
-            telegram_user_id=update.message.from_user.id
-        )
-        if current_strikes < settings.STRIKES_LIMIT:
-            return await context.bot.send_message(
+        if not violation:
+            return
+        current_strikes, days = violation
+        if days is None:
+            return moderator_notifier.notify(
+                context.bot,
                 chat_id=update.message.chat_id,
                 text=dedent(
                     f"""
                         {await extract_name(update.message.from_user)},
                         вы нарушили правила сообщества и заработали страйк.
                         
-                        Еще {settings.STRIKES_LIMIT - current_strikes} и будет бан!
+                        Еще {config.strikes_limit - current_strikes} и будет бан!
                     
                     """
                 ),
-                message_thread_id=settings.MODERATOR_TOPIC_ID,
             )
 
-        user_bans_amount = await cruds.count_bans(
-            telegram_user_id=update.message.from_user.id
-        )
-        days = settings.BAN_LIMITS.get(user_bans_amount, 365)
         await block_user(
             chat_id=update.message.chat_id,
             user_id=update.message.from_user.id,
@@ -313,7 +646,8 @@ async def listen_all_mesages(update: Update, context: ContextTypes.DEFAULT_TYPE)
             reason=update.message.text
             or update.message.caption,
         )
-        await context.bot.send_message(
+        moderator_notifier.notify(
+            context.bot,
             chat_id=update.message.chat_id,
             text=dedent(
                 f"""
@@ -322,40 +656,46 @@ async def listen_all_mesages(update: Update, context: ContextTypes.DEFAULT_TYPE)
                 
                 Лимит страйков превышен, доступ в сообщество заблокирован на {days} дн."""
             ),
-            message_thread_id=settings.MODERATOR_TOPIC_ID,
         )
 
+@timed("handler", count_queries=True)
 async def confirm_user(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    current_user_hash = await get_user_hash(update.callback_query.from_user.to_dict())
-    button_user_hash = update.callback_query.data.rsplit("_", 1)[-1]
-
     current_user_id = update.callback_query.from_user.id
-    try:
-        button_user_id = int(update.callback_query.data.rsplit("_", 1)[-1])
-        logger.info(f"{current_user_id=} {button_user_id=}")
-        if button_user_id != current_user_id:
-            return
-        await cruds.confirm_telegram_user(
-            telegram_user_id=update.callback_query.from_user.id
-        )
-        await update.callback_query.answer()
-        await update.callback_query.edit_message_text(
-            f"{await extract_name(update.callback_query.from_user)}, добро пожаловать!"
-        )
-    except ValueError as error:
-        logger.exception(error)
+    button_user_id = verify_confirmation_token(update.callback_query.data)
+    if button_user_id != current_user_id:
+        return await update.callback_query.answer()
+
+    await confirmation_writer.confirm(current_user_id)
+    await update.callback_query.answer()
+    await update.callback_query.edit_message_text(
+        f"{await extract_name(update.callback_query.from_user)}, добро пожаловать!"
+    )
 
 async def error_handler(update: object, context: ContextTypes.DEFAULT_TYPE):
     logger.exception("Ошибка при обработке апдейта", exc_info=context.error)
 
 
-def main():
-    app = (
+def build_application(updater: bool = True, request=None, rate_limiter=None):
+    if rate_limiter is None:
+        rate_limiter = TelegramRateLimiter(overall_rate=settings.TELEGRAM_RATE_LIMIT)
+    registry.collector("telegram_api", rate_limiter.stats)
+
+    builder = (
         ApplicationBuilder()
         .token(settings.TELEGRAM_BOT_TOKEN)
+        .rate_limiter(rate_limiter)
+        .concurrent_updates(KeyedUpdateProcessor(settings.CONCURRENT_UPDATES))
         .post_init(startup_task)
-        .build()
+        .post_stop(stop_task)
+        .post_shutdown(shutdown_task)
     )
+    if not updater:
+        # Воркер шарда: апдейты приходят от роутера, а не из Telegram
+        builder = builder.updater(None)
+    if request is not None:
+        # Подмена HTTP-клиента Bot API, например фейковым в replay.py
+        builder = builder.request(request)
+    app = builder.build()
 
     # Команды
     app.add_handler(CommandHandler("start", start))
@@ -363,6 +703,16 @@ def main():
     app.add_handler(CommandHandler("strike", strike))
     app.add_handler(CommandHandler("warn", warn))
     app.add_handler(CommandHandler("ban", ban))
+    app.add_handler(CommandHandler("purge", purge))
+    app.add_handler(CommandHandler("massban", massban))
+    app.add_handler(CommandHandler("stats", stats))
+    app.add_handler(CommandHandler("addword", add_word))
+    app.add_handler(CommandHandler("delword", del_word))
+
+    # Смена администраторов чата
+    app.add_handler(
+        ChatMemberHandler(moderator_resolver.on_chat_member, ChatMemberHandler.CHAT_MEMBER)
+    )
 
     # Кнопки
     app.add_handler(CallbackQueryHandler(confirm_user, pattern="user_confirmation"))
@@ -372,6 +722,27 @@ def main():
 
     # Обработчик ошибок
     app.add_error_handler(error_handler)
+    return app
+
+
+def main():
+    if settings.SHARDS > 1:
+        # Главный процесс только принимает апдейты и раздает их воркерам
+        app = ShardRouter(settings.SHARDS, build_application).build_router()
+    else:
+        app = build_application()
+
+    if settings.WEBHOOK_URL:
+        # Вебхук: Telegram сам присылает апдейты, запросы без секрета отбрасываются
+        app.run_webhook(
+            listen=settings.WEBHOOK_LISTEN,
+            port=settings.WEBHOOK_PORT,
+            url_path=settings.WEBHOOK_PATH,
+            webhook_url=f"{settings.WEBHOOK_URL.rstrip('/')}/{settings.WEBHOOK_PATH}",
+            secret_token=settings.WEBHOOK_SECRET,
+            allowed_updates=Update.ALL_TYPES,
+        )
+        return
 
     # Long-polling
     app.run_polling(
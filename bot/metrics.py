@@ -0,0 +1,193 @@
+import asyncio
+import bisect
+import time
+from contextvars import ContextVar
+from functools import wraps
+from typing import Callable
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+
+class Histogram:
+    """Гистограмма с фиксированными границами корзин, как в Prometheus."""
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Верхняя граница корзины, в которую попадает квантиль q."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "avg": self.sum / self.count if self.count else 0.0,
+            "p50": self.quantile(0.5),
+            "p99": self.quantile(0.99),
+        }
+
+
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34)
+
+_update_queries: ContextVar[list[int] | None] = ContextVar("update_queries", default=None)
+
+
+class Registry:
+    """Все метрики процесса: гистограммы плюс снимки stats() подсистем."""
+
+    def __init__(self):
+        self._histograms: dict[tuple[str, tuple], Histogram] = {}
+        self._collectors: dict[str, Callable[[], dict]] = {}
+
+    def histogram(self, name: str, buckets: tuple[float, ...] = DEFAULT_BUCKETS, **labels) -> Histogram:
+        key = (name, tuple(sorted(labels.items())))
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = self._histograms[key] = Histogram(buckets)
+        return histogram
+
+    def collector(self, name: str, stats: Callable[[], dict]) -> None:
+        self._collectors[name] = stats
+
+    def histograms(self, name: str) -> dict[tuple, Histogram]:
+        return {labels: h for (n, labels), h in self._histograms.items() if n == name}
+
+    def collect(self) -> dict[str, dict]:
+        return {name: stats() for name, stats in self._collectors.items()}
+
+    def summary_text(self) -> str:
+        """Короткая сводка для /stats."""
+        lines = []
+        for metric in ("handler_seconds", "db_seconds", "telegram_api_seconds"):
+            for labels, histogram in sorted(self.histograms(metric).items()):
+                if not histogram.count:
+                    continue
+                summary = histogram.summary()
+                lines.append(
+                    f"{metric} {dict(labels).popitem()[1]}: n={summary['count']}, "
+                    f"avg={summary['avg'] * 1000:.1f}ms, p99<={summary['p99'] * 1000:g}ms"
+                )
+        for labels, histogram in sorted(self.histograms("handler_db_queries").items()):
+            if histogram.count:
+                lines.append(
+                    f"db queries/update {dict(labels).popitem()[1]}: "
+                    f"avg={histogram.sum / histogram.count:.1f}"
+                )
+        for name, stats in self.collect().items():
+            values = ", ".join(
+                f"{key}={value:.2f}" if isinstance(value, float) else f"{key}={value}"
+                for key, value in _flatten(stats)
+            )
+            lines.append(f"{name}: {values}")
+        return "\n".join(lines) or "Пока нет данных"
+
+    def render(self) -> str:
+        """Текстовый формат экспорта Prometheus."""
+        lines = []
+        for (name, labels), histogram in sorted(self._histograms.items()):
+            cumulative = 0
+            for bound, count in zip((*histogram.buckets, "+Inf"), histogram.counts):
+                cumulative += count
+                lines.append(f"{name}_bucket{_labels(labels, le=bound)} {cumulative}")
+            lines.append(f"{name}_sum{_labels(labels)} {histogram.sum}")
+            lines.append(f"{name}_count{_labels(labels)} {histogram.count}")
+        for name, stats in self.collect().items():
+            for key, value in _flatten(stats):
+                lines.append(f"{name}_{key} {float(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels: tuple, **extra) -> str:
+    pairs = [*labels, *extra.items()]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in pairs) + "}"
+
+
+def _flatten(stats: dict, prefix: str = ""):
+    for key, value in stats.items():
+        if isinstance(value, dict):
+            yield from _flatten(value, f"{prefix}{key}_")
+        elif isinstance(value, (int, float, bool)):
+            yield f"{prefix}{key}", value
+
+
+def count_query(*args) -> None:
+    """Слушатель before_cursor_execute: считает запросы текущего апдейта."""
+    counter = _update_queries.get()
+    if counter is not None:
+        counter[0] += 1
+
+
+def timed(metric: str, count_queries: bool = False):
+    """Пишет время выполнения корутины в гистограмму {metric}_seconds.
+
+    С count_queries=True еще и число SQL-запросов, сделанных за вызов
+    (для хендлеров это запросы на один апдейт).
+    """
+
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            token = _update_queries.set([0]) if count_queries else None
+            started = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                registry.histogram(f"{metric}_seconds", func=func.__name__).observe(
+                    time.perf_counter() - started
+                )
+                if token is not None:
+                    registry.histogram(
+                        f"{metric}_db_queries", QUERY_BUCKETS, func=func.__name__
+                    ).observe(_update_queries.get()[0])
+                    _update_queries.reset(token)
+
+        return wrapper
+
+    return decorator
+
+
+async def _serve(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    try:
+        request_line = await reader.readline()
+        while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+            pass
+        parts = request_line.decode(errors="replace").split()
+        if len(parts) >= 2 and parts[1] == "/metrics":
+            status, body = "200 OK", registry.render()
+        else:
+            status, body = "404 Not Found", "not found\n"
+        payload = body.encode()
+        writer.write(
+            f"HTTP/1.1 {status}\r\n"
+            "Content-Type: text/plain; version=0.0.4\r\n"
+            f"Content-Length: {len(payload)}\r\n"
+            "Connection: close\r\n\r\n".encode() + payload
+        )
+        await writer.drain()
+    finally:
+        writer.close()
+
+
+async def start_metrics_server(host: str, port: int) -> asyncio.AbstractServer:
+    return await asyncio.start_server(_serve, host, port)
+
+
+registry = Registry()
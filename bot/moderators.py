@@ -0,0 +1,85 @@
+import asyncio
+import time
+
+from telegram import ChatMember, Update
+from telegram.ext import ContextTypes
+
+import settings
+from chat_config import chat_configs
+from settings import logger
+
+ADMIN_STATUSES = {ChatMember.ADMINISTRATOR, ChatMember.OWNER}
+
+
+class ModeratorResolver:
+    """Модераторы группы: администраторы чата плюс статический список.
+
+    Состав кэшируется по чатам как frozenset с TTL. Устаревший кэш
+    отдается сразу, а getChatAdministrators выполняется в фоне. При
+    холодном промахе обновление ждется: иначе первые команды в чате после
+    запуска проверялись бы только по статическому списку и отклонялись
+    для администраторов группы. Одновременные запросы ждут одно и то же
+    обновление. Апдейты chat_member правят кэш сразу, не дожидаясь
+    истечения TTL.
+    """
+
+    def __init__(self, ttl: float = 600):
+        self.ttl = ttl
+        self._cache: dict[int, tuple[float, frozenset[int]]] = {}
+        # Идущие обновления по чатам; заодно ссылки на задачи, иначе их может собрать GC
+        self._refreshing: dict[int, asyncio.Task] = {}
+
+    async def get(self, bot, chat_id: int) -> frozenset[int]:
+        cached = self._cache.get(chat_id)
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+
+        task = self._refreshing.get(chat_id)
+        if task is None:
+            task = asyncio.create_task(self.refresh(bot, chat_id))
+            self._refreshing[chat_id] = task
+
+        if cached:
+            return cached[1]
+        # shield: отмена одного обработчика не должна отменять общее обновление
+        await asyncio.shield(task)
+        cached = self._cache.get(chat_id)
+        if cached:
+            return cached[1]
+        return (await chat_configs.get(chat_id)).moderators_ids
+
+    async def refresh(self, bot, chat_id: int) -> None:
+        try:
+            static = (await chat_configs.get(chat_id)).moderators_ids
+            try:
+                admins = await bot.get_chat_administrators(chat_id)
+                ids = static | frozenset(
+                    admin.user.id for admin in admins if not admin.user.is_bot
+                )
+            except Exception as e:
+                logger.warning(f"Не удалось получить администраторов {chat_id}: {e}")
+                ids = static
+            self._cache[chat_id] = (time.monotonic() + self.ttl, ids)
+        except Exception:
+            logger.exception(f"Не удалось обновить модераторов {chat_id}")
+        finally:
+            self._refreshing.pop(chat_id, None)
+
+    async def on_chat_member(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        change = update.chat_member
+        cached = self._cache.get(change.chat.id)
+        if not cached:
+            return
+
+        user_id = change.new_chat_member.user.id
+        expires, ids = cached
+        if change.new_chat_member.status in ADMIN_STATUSES:
+            ids = ids | {user_id}
+        elif change.old_chat_member.status in ADMIN_STATUSES:
+            static = (await chat_configs.get(change.chat.id)).moderators_ids
+            if user_id not in static:
+                ids = ids - {user_id}
+        self._cache[change.chat.id] = (expires, ids)
+
+
+moderator_resolver = ModeratorResolver(ttl=settings.MODERATORS_CACHE_TTL)
@@ -0,0 +1,138 @@
+import re
+from functools import lru_cache
+from typing import NamedTuple
+
+# Латиница и цифры, которыми подменяют кириллицу, ё и невидимые символы
+_LOOKALIKES = str.maketrans(
+    {
+        **dict(zip("aeopcxykmthbun", "аеорсхукмтнвип")),
+        **dict(zip("0346@$", "озчбас")),
+        "ё": "е",
+        "\u00ad": None,
+        "\u200b": None,
+        "\u200c": None,
+        "\u200d": None,
+        "\u2060": None,
+        "\ufeff": None,
+    }
+)
+_REPEATS = re.compile(r"(\w)\1+")
+# Три и больше одиночных символа через один и тот же разделитель:
+# "х у й", "х.у.й", "х_у_й". Сокращения вроде "и т.д. и т.п." разделены по-разному
+# и не склеиваются
+_SPACED = re.compile(r"(?<![^\W_])[^\W_]([\W_]+)[^\W_](?![^\W_])(?:\1[^\W_](?![^\W_]))+")
+_SEPARATORS = re.compile(r"[\W_]+")
+
+
+@lru_cache(maxsize=4096)
+def normalize(text: str, despace: bool = True) -> tuple[str, ...]:
+    """Варианты текста для проверки: нормализованный и со схлопнутыми повторами.
+
+    Результат кэшируется, так что одинаковые сообщения (флуд, копипаста)
+    нормализуются один раз.
+    """
+    normalized = text.lower().translate(_LOOKALIKES)
+    if despace:
+        normalized = _SPACED.sub(lambda m: _SEPARATORS.sub("", m.group()), normalized)
+    collapsed = _REPEATS.sub(r"\1", normalized)
+    if collapsed == normalized:
+        return (normalized,)
+    return normalized, collapsed
+
+
+_TOKENS = re.compile(r"\w+")
+_LITERAL = re.compile(r"\w+")
+
+
+class _Index(NamedTuple):
+    roots: dict[str, str]
+    root_lengths: tuple[int, ...]
+    words: dict[str, str]
+    regex: re.Pattern | None
+    groups: dict[str, str]
+
+
+class ObsceneMatcher:
+    """Проверка текста по словарю за один проход по словам сообщения.
+
+    Паттерны из одних буквенных символов (обычный случай) попадают в
+    словари: корень ищется среди префиксов каждого слова, полное слово -
+    прямым поиском, оба за O(1) на слово. Такие паттерны заносятся и в
+    виде после замены похожих букв, как у normalize(), иначе латинские
+    слова словаря в нормализованном тексте не нашлись бы. Только паттерны с синтаксисом
+    регулярок собираются в общую альтернацию именованных групп: в re
+    такая альтернация проверяется в каждой позиции текста и на сотнях
+    паттернов медленнее даже цикла по отдельным регуляркам.
+    Индекс строится при первом поиске (или явным compile() в фоне).
+    """
+
+    def __init__(self, roots: list[str], full_words: list[str]):
+        self.roots = list(roots)
+        self.full_words = list(full_words)
+        self.patterns = [rf"\b{root}\w*\b" for root in self.roots] + [
+            rf"\b{word}\b" for word in self.full_words
+        ]
+        self._index: _Index | None = None
+
+    def compile(self) -> _Index:
+        if self._index is not None:
+            return self._index
+
+        roots, words, groups = {}, {}, {}
+        for entries, literals, template in (
+            (self.roots, roots, r"\b{}\w*\b"),
+            (self.full_words, words, r"\b{}\b"),
+        ):
+            for entry in entries:
+                pattern = template.format(entry)
+                if _LITERAL.fullmatch(entry):
+                    literals.setdefault(entry.lower(), pattern)
+                    literals.setdefault(entry.lower().translate(_LOOKALIKES), pattern)
+                else:
+                    groups[f"p{len(groups)}"] = pattern
+
+        regex = (
+            re.compile(
+                "|".join(f"(?P<{name}>{pattern})" for name, pattern in groups.items()),
+                re.IGNORECASE,
+            )
+            if groups
+            else None
+        )
+        # Присваивание одно, так что параллельный compile() безопасен
+        self._index = _Index(
+            roots, tuple(sorted({len(root) for root in roots})), words, regex, groups
+        )
+        return self._index
+
+    def search(self, text: str) -> str | None:
+        """Возвращает сработавший паттерн или None."""
+        if not text:
+            return None
+        index = self._index or self.compile()
+
+        if index.roots or index.words:
+            for token in _TOKENS.findall(text.lower()):
+                pattern = index.words.get(token)
+                if pattern:
+                    return pattern
+                for length in index.root_lengths:
+                    if length > len(token):
+                        break
+                    pattern = index.roots.get(token[:length])
+                    if pattern:
+                        return pattern
+
+        if index.regex is not None:
+            match = index.regex.search(text)
+            if match:
+                return index.groups[match.lastgroup]
+        return None
+
+    def search_normalized(self, text: str, despace: bool = True) -> str | None:
+        # Исходный текст тоже: регулярки словаря не нормализуются
+        for variant in (text, *normalize(text, despace)):
+            pattern = self.search(variant)
+            if pattern:
+                return pattern
+        return None
@@ -0,0 +1,107 @@
+import asyncio
+from contextlib import AsyncExitStack
+
+from telegram import MessageEntity, Update
+from telegram.ext import BaseUpdateProcessor
+
+
+class KeyedUpdateProcessor(BaseUpdateProcessor):
+    """Параллельная обработка апдейтов с сохранением порядка для пользователя.
+
+    Апдейты одного пользователя (или чата, если пользователя нет)
+    выполняются строго по очереди, чтобы подсчет страйков не гонялся сам с
+    собой, а общее число одновременно выполняемых апдейтов ограничено
+    max_concurrent_updates.
+
+    Слот занимается только после того, как апдейт дождался своей очереди:
+    семафор BaseUpdateProcessor берется еще до do_process_update, и хвост
+    сообщений одного флудера занял бы им все слоты. Поэтому базовому
+    классу передается заведомо большой предел, а настоящий - свой.
+
+    Команда ответом на сообщение (/strike, /ban, ...) встает в очередь и
+    автора, и того, кому он отвечает: страйк модератора и нарушение самого
+    пользователя не считаются одновременно.
+    """
+
+    # Предел семафора базового класса: им только считаются принятые апдейты.
+    # Базовый __init__ строит семафор по max_concurrent_updates, поэтому до
+    # его вызова свойство отдает этот предел (атрибут класса)
+    _UNBOUNDED = _limit = 2**31
+
+    def __init__(self, max_concurrent_updates: int):
+        if max_concurrent_updates < 1:
+            raise ValueError("`max_concurrent_updates` must be a positive integer!")
+        super().__init__(self._UNBOUNDED)
+        self._limit = max_concurrent_updates
+        self._slots = asyncio.BoundedSemaphore(max_concurrent_updates)
+        self._running = 0
+        self._locks: dict[int, asyncio.Lock] = {}
+        self._waiters: dict[int, int] = {}
+
+    @property
+    def max_concurrent_updates(self) -> int:
+        return self._limit
+
+    @property
+    def current_concurrent_updates(self) -> int:
+        """Апдейты в обработке, включая ждущие своей очереди или слота."""
+        return self._UNBOUNDED - self._semaphore.current_value
+
+    @property
+    def running_updates(self) -> int:
+        """Апдейты, которые сейчас занимают слот."""
+        return self._running
+
+    @staticmethod
+    def _keys(update: object) -> list[int]:
+        if not isinstance(update, Update):
+            return []
+        if update.effective_user:
+            keys = {update.effective_user.id}
+        elif update.effective_chat:
+            keys = {update.effective_chat.id}
+        else:
+            return []
+
+        message = update.effective_message
+        target = message.reply_to_message if message else None
+        if (
+            target
+            and target.from_user
+            and message.entities
+            and message.entities[0].type == MessageEntity.BOT_COMMAND
+            and message.entities[0].offset == 0
+        ):
+            keys.add(target.from_user.id)
+        # Один порядок захвата для всех апдейтов - без взаимных блокировок
+        return sorted(keys)
+
+    def _acquire(self, key: int) -> asyncio.Lock:
+        self._waiters[key] = self._waiters.get(key, 0) + 1
+        return self._locks.setdefault(key, asyncio.Lock())
+
+    def _release(self, key: int) -> None:
+        self._waiters[key] -= 1
+        if not self._waiters[key]:
+            del self._waiters[key]
+            del self._locks[key]
+
+    async def do_process_update(self, update: object, coroutine) -> None:
+        keys = self._keys(update)
+        async with AsyncExitStack() as stack:
+            for key in keys:
+                lock = self._acquire(key)
+                stack.callback(self._release, key)
+                await stack.enter_async_context(lock)
+            async with self._slots:
+                self._running += 1
+                try:
+                    await coroutine
+                finally:
+                    self._running -= 1
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
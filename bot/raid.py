@@ -0,0 +1,131 @@
+import asyncio
+import time
+from collections import OrderedDict, deque
+
+import settings
+from metrics import registry
+from settings import logger
+
+
+class _ChatRaid:
+    """Состояние рейда одной группы."""
+
+    def __init__(self, maxlen: int):
+        self.events: deque[float] = deque(maxlen=maxlen)
+        self.active = False
+        self.captcha_sent: OrderedDict[int, float] = OrderedDict()
+        self.watcher: asyncio.Task | None = None
+
+
+class RaidGuard:
+    """Режим рейда: реакция на всплеск сообщений от неподтвержденных.
+
+    Считается по каждой группе отдельно. Рейд включается, когда за
+    window секунд в группу приходит threshold сообщений от
+    неподтвержденных пользователей, и выключается, когда поток падает
+    ниже половины порога: это проверяется и на новых сообщениях, и
+    фоновой задачей, так что рейд заканчивается и в затихшей группе.
+    Пока рейд активен, капча уходит пользователю не чаще раза в
+    captcha_window секунд, а остальные его сообщения удаляются пачками
+    через deleteMessages.
+    """
+
+    def __init__(
+        self,
+        threshold: int = 20,
+        window: float = 10,
+        captcha_window: float = 300,
+        flush_interval: float = 1.0,
+    ):
+        self.threshold = threshold
+        self.window = window
+        self.captcha_window = captcha_window
+        self.flush_interval = flush_interval
+
+        self._chats: dict[int, _ChatRaid] = {}
+        self._pending: dict[int, list[int]] = {}
+        self._flush_task: asyncio.Task | None = None
+
+    def is_active(self, chat_id: int) -> bool:
+        raid = self._chats.get(chat_id)
+        return bool(raid and raid.active)
+
+    def stats(self) -> dict:
+        return {"active_chats": sum(raid.active for raid in self._chats.values())}
+
+    def register(self, chat_id: int, user_id: int) -> None:
+        """Учитывает сообщение неподтвержденного пользователя в группе."""
+        raid = self._chats.get(chat_id)
+        if raid is None:
+            raid = self._chats[chat_id] = _ChatRaid(maxlen=self.threshold * 4)
+        raid.events.append(time.monotonic())
+        self._update(chat_id, raid)
+
+    def _update(self, chat_id: int, raid: _ChatRaid) -> None:
+        now = time.monotonic()
+        while raid.events and raid.events[0] < now - self.window:
+            raid.events.popleft()
+        while raid.captcha_sent and next(iter(raid.captcha_sent.values())) < now - self.captcha_window:
+            raid.captcha_sent.popitem(last=False)
+
+        rate = len(raid.events)
+        if not raid.active and rate >= self.threshold:
+            raid.active = True
+            if raid.watcher is None or raid.watcher.done():
+                raid.watcher = asyncio.create_task(self._watch(chat_id, raid))
+            logger.warning(f"Режим рейда в {chat_id} включен: {rate} сообщений за {self.window} сек")
+        elif raid.active and rate < self.threshold / 2:
+            raid.active = False
+            logger.warning(f"Режим рейда в {chat_id} выключен")
+        if not raid.active and not raid.events and not raid.captcha_sent:
+            self._chats.pop(chat_id, None)
+
+    async def _watch(self, chat_id: int, raid: _ChatRaid) -> None:
+        # Без новых сообщений register() не вызывается, и рейд иначе
+        # оставался бы включенным до следующего новичка. После рейда
+        # задача дочищает окно и убирает группу из _chats
+        while raid.active or raid.events or raid.captcha_sent:
+            await asyncio.sleep(self.window / 4)
+            self._update(chat_id, raid)
+
+    def should_send_captcha(self, chat_id: int, user_id: int) -> bool:
+        raid = self._chats.get(chat_id)
+        if not raid or not raid.active:
+            return True
+        return user_id not in raid.captcha_sent
+
+    def captcha_sent(self, chat_id: int, user_id: int) -> None:
+        raid = self._chats.get(chat_id)
+        if raid is None:
+            return
+        raid.captcha_sent.pop(user_id, None)
+        raid.captcha_sent[user_id] = time.monotonic()
+
+    def delete_later(self, bot, chat_id: int, message_id: int) -> None:
+        self._pending.setdefault(chat_id, []).append(message_id)
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush(bot))
+
+    async def _flush(self, bot):
+        # Пока идут удаления, могут прийти новые сообщения: задача
+        # работает, пока очередь не опустеет
+        while self._pending:
+            await asyncio.sleep(self.flush_interval)
+            pending, self._pending = self._pending, {}
+            for chat_id, message_ids in pending.items():
+                # deleteMessages принимает не больше 100 id за раз
+                for i in range(0, len(message_ids), 100):
+                    try:
+                        await bot.delete_messages(
+                            chat_id=chat_id, message_ids=message_ids[i:i + 100]
+                        )
+                    except Exception:
+                        logger.exception("Не удалось удалить пачку сообщений")
+
+
+raid_guard = RaidGuard(
+    threshold=settings.RAID_THRESHOLD,
+    window=settings.RAID_WINDOW_SECONDS,
+    captcha_window=settings.RAID_CAPTCHA_WINDOW_SECONDS,
+)
+registry.collector("raid", raid_guard.stats)
@@ -0,0 +1,294 @@
+"""Прогон записанных или синтетических апдейтов через настоящие хендлеры.
+
+    python replay.py --database replay_db logs/updates.jsonl
+    python replay.py --database replay_db --synthetic raid --count 5000 --output run.json
+    python replay.py --database replay_db --synthetic spam --baseline run.json
+
+Bot API подменяется FakeRequest (ответы без сети, с задержкой
+--api-latency), БД - настоящая: Postgres из POSTGRES_* (SQLite не
+подходит - запросы используют upsert и SKIP LOCKED Postgres), но база
+задается отдельно через --database и не может совпадать с POSTGRES_DB
+бота: прогон пишет в нее страйки и баны. База должна существовать,
+миграции применяются сами. Фоновые задачи бота (удаления по расписанию,
+архив, обновление словаря) не запускаются. Апдейты идут через
+KeyedUpdateProcessor, как в боте. Печатает p50/p99 по
+хендлерам и по апдейтам, SQL-запросы на апдейт и, с --allocations,
+память по tracemalloc. С --baseline сравнивает p99 с прошлым прогоном
+и завершается с кодом 1 при регрессии больше --tolerance.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import sys
+import time
+import tracemalloc
+
+from telegram import Update
+from telegram.request import BaseRequest
+
+import settings
+from metrics import registry
+
+BOT_ID = 1_000_000
+CHAT_ID = -1_001_000_000_000
+
+
+class FakeRequest(BaseRequest):
+    """Bot API без сети: правдоподобные ответы и счетчик вызовов."""
+
+    def __init__(self, latency: float = 0.0, record: bool = False):
+        self.latency = latency
+        self.calls: dict[str, int] = {}
+        # С record=True - еще и параметры каждого вызова (для тестов)
+        self.requests: list[tuple[str, dict]] | None = [] if record else None
+        # Кого getChatAdministrators вернет администраторами (владельцами)
+        self.admins: list[int] = []
+        self._message_ids = itertools.count(10_000_000)
+
+    @property
+    def read_timeout(self):
+        return None
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    async def do_request(self, url, method, request_data=None, **kwargs):
+        endpoint = url.rsplit("/", 1)[-1]
+        self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        params = request_data.parameters if request_data else {}
+        if self.requests is not None:
+            self.requests.append((endpoint, params))
+        return 200, json.dumps({"ok": True, "result": self._result(endpoint, params)}).encode()
+
+    def _result(self, endpoint: str, params: dict):
+        if endpoint == "getMe":
+            return {"id": BOT_ID, "is_bot": True, "first_name": "bot", "username": "replay_bot"}
+        if endpoint in ("sendMessage", "editMessageText"):
+            return {
+                "message_id": next(self._message_ids),
+                "date": int(time.time()),
+                "chat": {"id": int(params.get("chat_id", CHAT_ID)), "type": "supergroup"},
+                "text": params.get("text", ""),
+            }
+        if endpoint == "getChatAdministrators":
+            return [{"status": "creator", "user": _user(user_id), "is_anonymous": False} for user_id in self.admins]
+        return True
+
+
+def _user(user_id: int) -> dict:
+    return {"id": user_id, "is_bot": False, "first_name": f"user{user_id}"}
+
+
+def _message(message_id: int, user_id: int, text: str, **extra) -> dict:
+    return {
+        "message_id": message_id,
+        "date": int(time.time()),
+        "chat": {"id": CHAT_ID, "type": "supergroup", "title": "replay"},
+        "from": _user(user_id),
+        "text": text,
+        **extra,
+    }
+
+
+def synthetic(scenario: str, count: int, seed: int = 0) -> list[dict]:
+    """Апдейты сценария: raid, spam или chat (обычная переписка со страйками)."""
+    from utils import make_confirmation_token
+
+    rng = random.Random(seed)
+    message_ids = itertools.count(1)
+    updates = []
+    moderator = settings.MODERATORS_IDS[0] if settings.MODERATORS_IDS else None
+
+    def message(user_id: int, text: str, **extra):
+        updates.append({"message": _message(next(message_ids), user_id, text, **extra)})
+        return updates[-1]["message"]
+
+    if scenario == "raid":
+        # Волна новых аккаунтов, часть проходит капчу
+        for _ in range(count):
+            user_id = rng.randrange(10**9, 2 * 10**9)
+            message(user_id, rng.choice(["привет", "всем привет", "заходите к нам", "👋"]))
+            if rng.random() < 0.3:
+                updates.append({"callback_query": {
+                    "id": str(len(updates)),
+                    "from": _user(user_id),
+                    "chat_instance": "replay",
+                    "data": make_confirmation_token(user_id),
+                    "message": _message(next(message_ids), BOT_ID, "капча"),
+                }})
+    elif scenario == "spam":
+        # Одна рекламная копипаста с мелкими правками от многих аккаунтов
+        template = "Заработок от {n} рублей в день без вложений, пиши в личку {tail}"
+        for _ in range(count):
+            text = template.format(n=rng.choice([3000, 5000, 7000]), tail=rng.choice(["!", "!!", "", " срочно"]))
+            message(rng.randrange(10**9, 2 * 10**9), text)
+    elif scenario == "chat":
+        users = [rng.randrange(10**6, 10**7) for _ in range(50)]
+        for _ in range(count):
+            target = message(rng.choice(users), " ".join(rng.choices(
+                ["как", "дела", "кто", "идет", "завтра", "сгущенка", "вкусная", "да", "нет"], k=rng.randint(2, 12)
+            )))
+            if moderator and rng.random() < 0.02:
+                message(
+                    moderator,
+                    "/strike",
+                    entities=[{"type": "bot_command", "offset": 0, "length": 7}],
+                    reply_to_message=target,
+                )
+    else:
+        raise ValueError(f"Неизвестный сценарий: {scenario}")
+    return updates
+
+
+def load_jsonl(path: str) -> list[dict]:
+    """Строки audit-лога - это message.to_dict(), либо целые апдейты."""
+    updates = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            data = json.loads(line)
+            updates.append(data if "update_id" in data else {"message": data})
+    return updates
+
+
+def _percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(int(q * len(values)), len(values) - 1)]
+
+
+async def replay(updates: list[dict], concurrency: int, api_latency: float, allocations: bool) -> dict:
+    from main import build_application
+    from utils import prepare_handlers, release_handlers, stop_task
+
+    from throttling import TelegramRateLimiter
+
+    from audit import audit_logger
+
+    settings.CONCURRENT_UPDATES = concurrency
+    # Повторный аудит прогона не нужен и смешался бы с результатом в stdout
+    audit_logger.disabled = True
+    request = FakeRequest(latency=api_latency)
+    # Лимиты Telegram, общий и по чатам, в прогоне только мешают мерить сами хендлеры
+    unlimited = TelegramRateLimiter(overall_rate=1e9, chat_rate=1e9, chat_burst=10**9)
+    app = build_application(updater=False, request=request, rate_limiter=unlimited)
+    await app.initialize()
+    await prepare_handlers(upgrade=True)
+
+    latencies: dict[str, list[float]] = {}
+
+    async def handle(update: Update, kind: str):
+        # Время считается с момента, когда процессор пустил апдейт в работу
+        started = time.perf_counter()
+        await app.process_update(update)
+        latencies.setdefault(kind, []).append(time.perf_counter() - started)
+
+    async def process(index: int, data: dict):
+        update = Update.de_json({"update_id": index, **data}, app.bot)
+        kind = "callback_query" if update.callback_query else "message"
+        await app.update_processor.process_update(update, handle(update, kind))
+
+    if allocations:
+        tracemalloc.start()
+    started = time.perf_counter()
+    await asyncio.gather(*(process(i, data) for i, data in enumerate(updates, 1)))
+    elapsed = time.perf_counter() - started
+    memory = tracemalloc.get_traced_memory() if allocations else None
+    if allocations:
+        tracemalloc.stop()
+
+    await stop_task(app)
+    await app.shutdown()
+    await release_handlers()
+
+    result = {
+        "updates": len(updates),
+        "seconds": elapsed,
+        "updates_per_second": len(updates) / elapsed if elapsed else 0.0,
+        "updates_latency": {
+            kind: {"count": len(values), "p50": _percentile(values, 0.5), "p99": _percentile(values, 0.99)}
+            for kind, values in latencies.items()
+        },
+        "handlers": {
+            dict(labels)["func"]: histogram.summary()
+            for labels, histogram in registry.histograms("handler_seconds").items()
+            if histogram.count
+        },
+        "db_queries_per_update": {
+            dict(labels)["func"]: histogram.sum / histogram.count
+            for labels, histogram in registry.histograms("handler_db_queries").items()
+            if histogram.count
+        },
+        "api_calls": request.calls,
+    }
+    if memory:
+        result["allocations"] = {
+            "current_bytes": memory[0],
+            "peak_bytes": memory[1],
+            "bytes_per_update": memory[0] / len(updates) if updates else 0.0,
+        }
+    return result
+
+
+def regressions(result: dict, baseline: dict, tolerance: float) -> list[str]:
+    found = []
+    for kind, latency in result["updates_latency"].items():
+        before = baseline.get("updates_latency", {}).get(kind)
+        if before and latency["p99"] > before["p99"] * (1 + tolerance):
+            found.append(f"{kind}: p99 {before['p99'] * 1000:.2f} -> {latency['p99'] * 1000:.2f} мс")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path", nargs="?", help="JSONL с апдейтами или сообщениями (audit-лог)")
+    parser.add_argument("--database", required=True, help="отдельная база для прогона, не POSTGRES_DB бота")
+    parser.add_argument("--synthetic", choices=["raid", "spam", "chat"])
+    parser.add_argument("--count", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--concurrency", type=int, default=settings.CONCURRENT_UPDATES)
+    parser.add_argument("--api-latency", type=float, default=0.0, help="задержка фейкового Bot API, сек")
+    parser.add_argument("--allocations", action="store_true")
+    parser.add_argument("--output")
+    parser.add_argument("--baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    if args.database == settings.POSTGRES_DB:
+        parser.error("--database совпадает с POSTGRES_DB бота, нужна отдельная база")
+    # До первого импорта database: движок создается при импорте
+    settings.POSTGRES_DB = args.database
+
+    if args.synthetic:
+        updates = synthetic(args.synthetic, args.count, args.seed)
+    elif args.path:
+        updates = load_jsonl(args.path)
+    else:
+        parser.error("нужен путь к JSONL или --synthetic")
+
+    result = asyncio.run(replay(updates, args.concurrency, args.api_latency, args.allocations))
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            found = regressions(result, json.load(f), args.tolerance)
+        for line in found:
+            print(f"Регрессия: {line}", file=sys.stderr)
+        if found:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
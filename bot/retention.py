@@ -0,0 +1,147 @@
+import asyncio
+import gzip
+import json
+import os
+import socket
+from collections import defaultdict
+from contextlib import suppress
+from datetime import datetime, timedelta, timezone
+
+import settings
+from database import cruds
+from database.models import Ban, Strikes
+from metrics import registry
+from settings import logger
+
+
+def _write_archive(directory: str, table: str, rows: list[dict]) -> None:
+    # Файлы по дням создания записи и по писателю:
+    # archive/strikes/2025-01/2025-01-31.<хост>-<воркер>.jsonl.gz.
+    # gzip допускает дописывание новым членом в конец файла, но только
+    # одним процессом: воркеры и реплики пишут каждый в свой файл.
+    writer = f"{socket.gethostname()}-{settings.SHARD_INDEX}"
+    by_day = defaultdict(list)
+    for row in rows:
+        by_day[row["created_at"].date()].append(row)
+
+    for day, day_rows in by_day.items():
+        path = os.path.join(directory, table, f"{day:%Y-%m}", f"{day.isoformat()}.{writer}.jsonl.gz")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with gzip.open(path, "at", encoding="utf-8") as f:
+            for row in day_rows:
+                f.write(json.dumps(row, ensure_ascii=False, default=str) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+
+class RetentionJob:
+    """Выносит старые страйки и баны в сжатый архив и удаляет их из БД.
+
+    Удаление идет пачками по batch_size в отдельных коротких
+    транзакциях, запись в архив - в потоке, до коммита удаления.
+    Срок хранения не опускается ниже окна счетчиков, иначе
+    компакция violation_counters не увидит, что вычитать.
+    Если таблица партиционирована по месяцам (PARTITION_TABLES),
+    целиком истекшие месяцы архивируются и удаляются партициями, без
+    построчного DELETE, а партиции на текущий и следующий месяц
+    создаются заранее - даже когда срок хранения не задан: иначе новые
+    записи копились бы в партиции по умолчанию.
+    """
+
+    def __init__(
+        self,
+        retention_days: dict,
+        interval: float = 6 * 60 * 60,
+        batch_size: int = 1000,
+        archive_dir: str = "archive",
+        partitioned: bool = False,
+    ):
+        self.retention_days = retention_days
+        self.interval = interval
+        self.batch_size = batch_size
+        self.archive_dir = archive_dir
+        self.partitioned = partitioned
+        self._task: asyncio.Task | None = None
+
+        self.archived = 0
+        self.partitions_dropped = 0
+        self.failed = 0
+
+    def start(self):
+        if self.partitioned or any(days for days, _ in self.retention_days.values()):
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "archived": self.archived,
+            "partitions_dropped": self.partitions_dropped,
+            "failed": self.failed,
+        }
+
+    async def _sink(self, table: str, rows: list[dict]) -> None:
+        await asyncio.to_thread(_write_archive, self.archive_dir, table, rows)
+
+    async def run_once(self) -> None:
+        now = datetime.now(tz=timezone.utc)
+        for model, (days, window) in self.retention_days.items():
+            table = model.__tablename__
+            partitions = await cruds.get_partitions(table)
+            for month in (now, now + timedelta(days=32)) if partitions else ():
+                await cruds.ensure_month_partition(table, month)
+            if not days:
+                continue
+            before = now - timedelta(days=max(days, window + 1))
+
+            for partition in partitions:
+                if _partition_end(table, partition) <= before:
+                    self.archived += await cruds.archive_partition(
+                        table, partition, self.batch_size, self._sink
+                    )
+                    self.partitions_dropped += 1
+
+            # Остаток - частично истекший месяц или таблица без партиций
+            while True:
+                archived = await cruds.archive_expired(model, before, self.batch_size, self._sink)
+                self.archived += archived
+                if archived < self.batch_size:
+                    break
+                # Отдаем соединения и блокировки обычным запросам
+                await asyncio.sleep(0.1)
+
+    async def _run(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception:
+                self.failed += 1
+                logger.exception("Ошибка архивации старых записей")
+            await asyncio.sleep(self.interval)
+
+
+def _partition_end(table: str, partition: str) -> datetime:
+    """Конец диапазона партиции {table}_YYYY_MM; для прочих - бесконечность."""
+    try:
+        start = datetime.strptime(partition.removeprefix(f"{table}_"), "%Y_%m")
+    except ValueError:
+        return datetime.max.replace(tzinfo=timezone.utc)
+    return (start + timedelta(days=32)).replace(day=1, tzinfo=timezone.utc)
+
+
+retention_job = RetentionJob(
+    retention_days={
+        Strikes: (settings.RETENTION_STRIKES_DAYS, settings.STRIKES_WINDOW_DAYS),
+        Ban: (settings.RETENTION_BANS_DAYS, settings.BANS_WINDOW_DAYS),
+    },
+    interval=settings.RETENTION_INTERVAL,
+    batch_size=settings.RETENTION_BATCH_SIZE,
+    archive_dir=settings.ARCHIVE_DIR,
+    partitioned=settings.PARTITION_TABLES,
+)
+registry.collector("retention", retention_job.stats)
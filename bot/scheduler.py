@@ -0,0 +1,151 @@
+import asyncio
+from contextlib import suppress
+
+import settings
+from database import cruds
+from metrics import registry
+from settings import logger
+
+
+class DeletionScheduler:
+    """Отложенное удаление капчи через очередь в Postgres.
+
+    Задачи лежат в таблице pending_deletions (индекс по due_at), поэтому
+    переживают рестарт контейнера, а в памяти живет только один цикл,
+    который раз в poll_interval забирает созревшие задачи пачками и
+    выполняет их не более чем по concurrency штук одновременно. Задача
+    удаляется из таблицы только после обработки: взятые, но не
+    обработанные (рестарт, stop() посреди пачки) вернутся через lease
+    секунд.
+    При SHARDS > 1 каждый воркер берет только задачи групп своего шарда:
+    подтверждения капчи этих групп проходят через его же кэш.
+    """
+
+    def __init__(
+        self,
+        poll_interval: float = 1.0,
+        batch_size: int = 100,
+        concurrency: int = 10,
+        lease: float = 300,
+    ):
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.lease = lease
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._task: asyncio.Task | None = None
+        self._bot = None
+
+        self.queue_depth = 0
+        self.in_flight = 0
+        self.processed = 0
+        self.failed = 0
+
+    async def schedule(
+        self,
+        chat_id: int,
+        user_id: int,
+        user_message_id: int,
+        bot_message_id: int,
+        delay_seconds: int = 60,
+    ):
+        await cruds.schedule_deletion(
+            chat_id=chat_id,
+            user_id=user_id,
+            user_message_id=user_message_id,
+            bot_message_id=bot_message_id,
+            delay_seconds=delay_seconds,
+        )
+        self.queue_depth += 1
+
+    def start(self, bot):
+        self._bot = bot
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self.queue_depth,
+            "in_flight": self.in_flight,
+            "processed": self.processed,
+            "failed": self.failed,
+        }
+
+    async def _run(self):
+        shard = {"shard": settings.SHARD_INDEX, "shards": settings.SHARDS}
+        try:
+            self.queue_depth = await cruds.count_pending_deletions(**shard)
+        except Exception:
+            logger.exception("Не удалось посчитать очередь удалений")
+
+        while True:
+            jobs = []
+            try:
+                jobs = await cruds.claim_due_deletions(
+                    limit=self.batch_size, lease_seconds=self.lease, **shard
+                )
+                if jobs:
+                    self.queue_depth = max(self.queue_depth - len(jobs), 0)
+                    await self._process_batch(jobs)
+            except Exception:
+                logger.exception("Ошибка обработки очереди удалений")
+
+            # Полная пачка - скорее всего есть еще созревшие задачи
+            if len(jobs) < self.batch_size:
+                await asyncio.sleep(self.poll_interval)
+
+    async def _process_batch(self, jobs):
+        done: list[int] = []
+        try:
+            await asyncio.gather(*(self._process(job, done) for job in jobs))
+        finally:
+            # И при отмене из stop(): удаляются только обработанные задачи
+            if done:
+                await cruds.complete_deletions(done)
+
+    async def _process(self, job, done: list[int]):
+        async with self._semaphore:
+            self.in_flight += 1
+            try:
+                await delete_if_not_confirmed(self._bot, job)
+                self.processed += 1
+            except Exception:
+                self.failed += 1
+                logger.exception("Ошибка при удалении сообщения капчи")
+            finally:
+                self.in_flight -= 1
+            done.append(job.id)
+
+
+async def delete_if_not_confirmed(bot, job):
+    user = await cruds.get_user_state(telegram_user_id=job.user_id)
+    if not user.confirmed:
+        # Капчу могли подтвердить через другой воркер или реплику,
+        # кэш этого процесса об этом не знает
+        cruds.user_cache.invalidate(job.user_id)
+        user = await cruds.get_user_state(telegram_user_id=job.user_id)
+
+    with suppress(Exception):
+        await bot.delete_message(chat_id=job.chat_id, message_id=job.bot_message_id)
+
+    if user.confirmed:
+        return
+
+    try:
+        await bot.delete_message(chat_id=job.chat_id, message_id=job.user_message_id)
+    except Exception as e:
+        logger.warning(f"Не удалось удалить сообщение {job.user_message_id} в {job.chat_id}: {e}")
+
+
+deletion_scheduler = DeletionScheduler(
+    poll_interval=settings.DELETION_POLL_INTERVAL,
+    batch_size=settings.DELETION_BATCH_SIZE,
+    concurrency=settings.DELETION_CONCURRENCY,
+    lease=settings.DELETION_LEASE_SECONDS,
+)
+registry.collector("deletions", deletion_scheduler.stats)
@@ -1,6 +1,7 @@
 from environs import Env
+import hashlib
 import logging
-import re
+
 
 env = Env()
 env.read_env()
@@ -11,6 +12,9 @@ MODERATORS_IDS = [int(i) for i in env.list("MODERATORS_IDS", list())]
 
 MODERATOR_TOPIC_ID = env.int("MODERATOR_TOPIC_ID", None)
 
+# Администраторы чата подтягиваются через getChatAdministrators и кэшируются
+MODERATORS_CACHE_TTL = env.int("MODERATORS_CACHE_TTL", 600)
+
 POSTGRES_HOST = env.str("POSTGRES_HOST")
 POSTGRES_PORT = env.int("POSTGRES_PORT", 5432)
 POSTGRES_USER = env.str("POSTGRES_USER")
@@ -20,6 +24,104 @@ POSTGRES_DB = env.str("POSTGRES_DB")
 STRIKES_LIMIT = env.int("STRIKES_LIMIT", 3)
 STRIKES_LIMIT_PERIOD_MONTHS = env.int("STRIKES_LIMIT_PERIOD_MONTHS", 1)
 
+# Окна, за которые считаются страйки и баны для эскалации
+STRIKES_WINDOW_DAYS = env.int("STRIKES_WINDOW_DAYS", 30)
+BANS_WINDOW_DAYS = env.int("BANS_WINDOW_DAYS", 365)
+COUNTERS_COMPACT_INTERVAL = env.int("COUNTERS_COMPACT_INTERVAL", 60 * 60)
+# Группа для страйков и банов, записанных до привязки к чатам (chat_id IS NULL);
+# нужна один раз, миграции c9e1d5a7b2f4
+LEGACY_CHAT_ID = env.int("LEGACY_CHAT_ID", None)
+
+USER_CACHE_SIZE = env.int("USER_CACHE_SIZE", 10_000)
+USER_CACHE_TTL = env.int("USER_CACHE_TTL", 300)
+
+CAPTCHA_TIMEOUT_SECONDS = env.int("CAPTCHA_TIMEOUT_SECONDS", 60)
+CAPTCHA_TOKEN_TTL = env.int("CAPTCHA_TOKEN_TTL", 24 * 60 * 60)
+# Ключ подписи кнопок капчи, по умолчанию выводится из токена бота
+CALLBACK_SECRET = env.str(
+    "CALLBACK_SECRET", hashlib.sha256(TELEGRAM_BOT_TOKEN.encode()).hexdigest()
+).encode()
+CONFIRMATION_FLUSH_INTERVAL = env.float("CONFIRMATION_FLUSH_INTERVAL", 1.0)
+CONFIRMATION_BATCH_SIZE = env.int("CONFIRMATION_BATCH_SIZE", 500)
+DELETION_POLL_INTERVAL = env.float("DELETION_POLL_INTERVAL", 1.0)
+DELETION_BATCH_SIZE = env.int("DELETION_BATCH_SIZE", 100)
+DELETION_CONCURRENCY = env.int("DELETION_CONCURRENCY", 10)
+# Через сколько секунд взятая, но не обработанная задача снова доступна
+DELETION_LEASE_SECONDS = env.int("DELETION_LEASE_SECONDS", 300)
+
+RAID_THRESHOLD = env.int("RAID_THRESHOLD", 20)
+RAID_WINDOW_SECONDS = env.float("RAID_WINDOW_SECONDS", 10)
+RAID_CAPTCHA_WINDOW_SECONDS = env.float("RAID_CAPTCHA_WINDOW_SECONDS", 300)
+
+# Копипаста: одно и то же от SPAM_DISTINCT_USERS разных пользователей
+# за окно - спам. SPAM_ACTION: delete - удалить, strike - еще и страйк
+SPAM_DISTINCT_USERS = env.int("SPAM_DISTINCT_USERS", 3)
+SPAM_WINDOW_SECONDS = env.float("SPAM_WINDOW_SECONDS", 600)
+SPAM_MAX_FINGERPRINTS = env.int("SPAM_MAX_FINGERPRINTS", 50_000)
+SPAM_MIN_TEXT_LENGTH = env.int("SPAM_MIN_TEXT_LENGTH", 30)
+SPAM_ACTION = env.str("SPAM_ACTION", "delete")
+
+# Антифлуд: больше FLOOD_LIMIT сообщений за FLOOD_WINDOW_SECONDS - мут
+# на FLOOD_MUTE_MINUTES (в группе переопределяется в chat_settings)
+FLOOD_LIMIT = env.int("FLOOD_LIMIT", 10)
+FLOOD_WINDOW_SECONDS = env.float("FLOOD_WINDOW_SECONDS", 5)
+FLOOD_MUTE_MINUTES = env.int("FLOOD_MUTE_MINUTES", 10)
+FLOOD_MAX_USERS = env.int("FLOOD_MAX_USERS", 100_000)
+
+NOTIFY_COALESCE_SECONDS = env.float("NOTIFY_COALESCE_SECONDS", 2.0)
+
+# Если задан WEBHOOK_URL - бот работает через вебхук вместо long-polling
+WEBHOOK_URL = env.str("WEBHOOK_URL", None)
+WEBHOOK_SECRET = env.str("WEBHOOK_SECRET", None)
+WEBHOOK_LISTEN = env.str("WEBHOOK_LISTEN", "0.0.0.0")
+WEBHOOK_PORT = env.int("WEBHOOK_PORT", 8080)
+WEBHOOK_PATH = env.str("WEBHOOK_PATH", "telegram")
+CONCURRENT_UPDATES = env.int("CONCURRENT_UPDATES", 32)
+
+# Общий лимит запросов к Telegram в секунду, делится между воркерами
+TELEGRAM_RATE_LIMIT = env.float("TELEGRAM_RATE_LIMIT", 30)
+# Число процессов-воркеров, апдейты распределяются по chat_id
+SHARDS = env.int("SHARDS", 1)
+# Номер воркера этого процесса, выставляется в sharding.run_worker
+SHARD_INDEX = 0
+CHAT_CONFIG_TTL = env.int("CHAT_CONFIG_TTL", 60)
+
+# Общее состояние реплик: memory:// (одна реплика) или redis://host:6379/0
+STATE_BACKEND_URL = env.str("STATE_BACKEND_URL", "memory://")
+
+HISTORY_PER_CHAT = env.int("HISTORY_PER_CHAT", 5000)
+BULK_ACTIONS_PER_SECOND = env.float("BULK_ACTIONS_PER_SECOND", 30)
+MASSBAN_CONCURRENCY = env.int("MASSBAN_CONCURRENCY", 5)
+
+# /metrics в формате Prometheus, 0 - не поднимать
+METRICS_HOST = env.str("METRICS_HOST", "0.0.0.0")
+METRICS_PORT = env.int("METRICS_PORT", 0)
+
+# Аудит апдейтов: по умолчанию в stdout; с путем - в файлы на постоянном
+# томе, при нескольких шардах у каждого воркера свой (updates.<номер>.jsonl)
+AUDIT_LOG_PATH = env.str("AUDIT_LOG_PATH", "")
+AUDIT_LOG_MAX_BYTES = env.int("AUDIT_LOG_MAX_BYTES", 50 * 1024 * 1024)
+AUDIT_LOG_BACKUP_COUNT = env.int("AUDIT_LOG_BACKUP_COUNT", 10)
+AUDIT_LOG_QUEUE_SIZE = env.int("AUDIT_LOG_QUEUE_SIZE", 10_000)
+
+# Запуск: применять миграции самому (иначе только проверить ревизию)
+# и сколько соединений пула открыть заранее
+MIGRATE_ON_STARTUP = env.bool("MIGRATE_ON_STARTUP", True)
+DB_WARMUP_CONNECTIONS = env.int("DB_WARMUP_CONNECTIONS", 5)
+
+# Хранение истории: старше - уходит в архив и удаляется (0 - хранить вечно).
+# Включать только с ARCHIVE_DIR на постоянном томе, иначе архив пропадет
+# вместе с контейнером
+RETENTION_STRIKES_DAYS = env.int("RETENTION_STRIKES_DAYS", 0)
+RETENTION_BANS_DAYS = env.int("RETENTION_BANS_DAYS", 0)
+RETENTION_INTERVAL = env.int("RETENTION_INTERVAL", 6 * 60 * 60)
+RETENTION_BATCH_SIZE = env.int("RETENTION_BATCH_SIZE", 1000)
+ARCHIVE_DIR = env.str("ARCHIVE_DIR", "archive")
+# Помесячные партиции strikes и bans: читается миграцией 5c0e8a3f19b2,
+# поэтому включается до того, как база ее пройдет. С ними старые месяцы
+# уходят в архив целиком, а партиции на будущее создаются заранее
+PARTITION_TABLES = env.bool("PARTITION_TABLES", False)
+
 logging.basicConfig(
     format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
     level=logging.INFO,
@@ -31,14 +133,19 @@ _OBSCENE_ROOTS = env.list("OBSCENE_ROOTS")
 
 _FULL_WORD_PATTERNS = env.list("FULL_WORD_PATTERNS")
 
-# Компилируем регулярки с границами слов
-_PATTERNS = [
-    re.compile(rf"\b{root}\w*\b", re.IGNORECASE)
-    for root in _OBSCENE_ROOTS
-] + [
-    re.compile(rf"\b{root}\b", re.IGNORECASE)
-    for root in _FULL_WORD_PATTERNS
-]
+# Основа словаря; правки /addword и /delword хранятся в БД
+# и подхватываются без рестарта (см. dictionary.py)
+OBSCENE_RELOAD_INTERVAL = env.int("OBSCENE_RELOAD_INTERVAL", 60)
+MATCHER_CACHE_DIR = env.str("MATCHER_CACHE_DIR", "cache/matcher")
+
+# Склеивать слова, набранные по одной букве через пробел
+OBSCENE_DESPACE = env.bool("OBSCENE_DESPACE", True)
+
+# Тексты длиннее лимита проверяются в отдельных процессах с бюджетом времени
+CLASSIFY_INLINE_LIMIT = env.int("CLASSIFY_INLINE_LIMIT", 1000)
+CLASSIFY_TIMEOUT = env.float("CLASSIFY_TIMEOUT", 0.5)
+CLASSIFY_WORKERS = env.int("CLASSIFY_WORKERS", 2)
+CLASSIFY_BLOCK_ON_TIMEOUT = env.bool("CLASSIFY_BLOCK_ON_TIMEOUT", False)
 
 BAN_LIMITS = {
     0: 7,
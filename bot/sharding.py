@@ -0,0 +1,130 @@
+import asyncio
+import multiprocessing
+from contextlib import suppress
+
+from telegram import Update
+from telegram.ext import ApplicationBuilder, ApplicationHandlerStop, TypeHandler
+
+import settings
+from settings import logger
+
+
+def shard_for(chat_id: int | None, shards: int) -> int:
+    """Все апдейты одной группы попадают в один и тот же воркер."""
+    return (chat_id or 0) % shards
+
+
+class ShardRouter:
+    """Принимает апдейты в главном процессе и раздает их воркерам по chat_id.
+
+    Каждый воркер - отдельный процесс с полноценным Application без
+    updater'а, все они работают с общим Postgres. Состояние в памяти
+    (кэши, рейд, история сообщений) живет в воркере своей группы.
+    Упавший воркер перезапускается с новой очередью: убитый процесс мог
+    оставить захваченной блокировку чтения старой. Апдейты, не забранные
+    из старой очереди, теряются.
+    """
+
+    def __init__(self, shards: int, build_application, supervise_interval: float = 1.0):
+        self.shards = shards
+        self.build_application = build_application
+        self.supervise_interval = supervise_interval
+        self._context = multiprocessing.get_context("spawn")
+        self._queues = [self._context.Queue() for _ in range(shards)]
+        self._workers: list = []
+        self._supervisor: asyncio.Task | None = None
+
+        self.restarts = 0
+
+    def stats(self) -> dict:
+        return {
+            "workers_alive": sum(worker.is_alive() for worker in self._workers),
+            "restarts": self.restarts,
+        }
+
+    def _spawn(self, index: int):
+        worker = self._context.Process(
+            target=run_worker,
+            args=(self.build_application, index, self.shards, self._queues[index]),
+            name=f"shard-{index}",
+            daemon=True,
+        )
+        worker.start()
+        return worker
+
+    async def start(self, app):
+        self._workers = [self._spawn(index) for index in range(self.shards)]
+        self._supervisor = asyncio.create_task(self._supervise())
+        logger.info(f"Запущено воркеров: {self.shards}")
+
+    async def _supervise(self):
+        while True:
+            await asyncio.sleep(self.supervise_interval)
+            for index, worker in enumerate(self._workers):
+                if worker.is_alive():
+                    continue
+                logger.error(f"Воркер {worker.name} завершился с кодом {worker.exitcode}, перезапускаю")
+                self.restarts += 1
+                stale, self._queues[index] = self._queues[index], self._context.Queue()
+                stale.cancel_join_thread()
+                stale.close()
+                self._workers[index] = self._spawn(index)
+
+    async def stop(self, app):
+        if self._supervisor:
+            self._supervisor.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._supervisor
+            self._supervisor = None
+        for queue in self._queues:
+            queue.put(None)
+        for worker in self._workers:
+            await asyncio.get_running_loop().run_in_executor(None, worker.join, 10)
+        self._workers = []
+
+    async def route(self, update: Update, context):
+        chat = update.effective_chat
+        self._queues[shard_for(chat.id if chat else None, self.shards)].put(update.to_dict())
+        raise ApplicationHandlerStop
+
+    def build_router(self):
+        app = (
+            ApplicationBuilder()
+            .token(settings.TELEGRAM_BOT_TOKEN)
+            .post_init(self.start)
+            .post_shutdown(self.stop)
+            .build()
+        )
+        app.add_handler(TypeHandler(Update, self.route))
+        return app
+
+
+def run_worker(build_application, index: int, shards: int, queue):
+    # Порт метрик и общий лимит Telegram делятся между воркерами
+    settings.SHARD_INDEX = index
+    settings.SHARDS = shards
+    if settings.METRICS_PORT:
+        settings.METRICS_PORT += index
+    settings.TELEGRAM_RATE_LIMIT /= shards
+    asyncio.run(_worker_loop(build_application(updater=False), queue))
+
+
+async def _worker_loop(app, queue):
+    loop = asyncio.get_running_loop()
+    await app.initialize()
+    if app.post_init:
+        await app.post_init(app)
+    await app.start()
+    try:
+        while True:
+            data = await loop.run_in_executor(None, queue.get)
+            if data is None:
+                break
+            await app.update_queue.put(Update.de_json(data, app.bot))
+    finally:
+        await app.stop()
+        if app.post_stop:
+            await app.post_stop(app)
+        await app.shutdown()
+        if app.post_shutdown:
+            await app.post_shutdown(app)
@@ -0,0 +1,177 @@
+import hashlib
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+import settings
+from metrics import registry
+from obscene import normalize
+
+_WORDS = re.compile(r"\w+")
+_BANDS = 4
+_BAND_BITS = 64 // _BANDS
+_BAND_MASK = (1 << _BAND_BITS) - 1
+
+
+def _hash64(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+
+
+def simhash(text: str) -> int:
+    """64-битный SimHash по шинглам из трех слов."""
+    words = _WORDS.findall(text)
+    shingles = [" ".join(words[i:i + 3]) for i in range(max(len(words) - 2, 1))]
+    weights = [0] * 64
+    for shingle in shingles:
+        value = _hash64(shingle)
+        for bit in range(64):
+            weights[bit] += 1 if value >> bit & 1 else -1
+    return sum(1 << bit for bit in range(64) if weights[bit] > 0)
+
+
+@dataclass
+class Fingerprint:
+    simhash: int | None
+    last_seen: float
+    # {user_id: [message_id, ...]} - чьи копии уже видели
+    messages: dict[int, list[int]] = field(default_factory=dict)
+    flagged: bool = False
+
+
+class SpamFingerprints:
+    """Копипаста от разных аккаунтов: окно отпечатков последних сообщений.
+
+    Точный отпечаток - хэш нормализованного текста или file_unique_id
+    медиа. Для почти одинаковых текстов считается SimHash: он разбит
+    на 4 полосы по 16 бит, и по принципу Дирихле отпечатки с
+    расстоянием Хэмминга до 3 совпадают хотя бы в одной полосе, так что
+    кандидаты находятся по индексу полос без перебора.
+
+    Когда одно содержимое приходит от threshold разных пользователей за
+    window секунд, check возвращает все известные копии, дальше -
+    каждую новую. Память ограничена max_entries отпечатками (около
+    2 КБ на отпечаток, benchmarks/bench_spam.py): старые вытесняются
+    по времени и по LRU.
+    """
+
+    def __init__(
+        self,
+        threshold: int = 3,
+        window: float = 600,
+        max_entries: int = 50_000,
+        min_length: int = 30,
+        max_distance: int = 3,
+    ):
+        self.threshold = threshold
+        self.window = window
+        self.max_entries = max_entries
+        self.min_length = min_length
+        self.max_distance = min(max_distance, _BANDS - 1)
+        self._entries: OrderedDict[tuple, Fingerprint] = OrderedDict()
+        self._bands: dict[tuple, set[tuple]] = {}
+
+        self.checked = 0
+        self.flagged = 0
+        self.evicted = 0
+
+    def check(
+        self,
+        chat_id: int,
+        user_id: int,
+        message_id: int,
+        text: str | None = None,
+        file_unique_id: str | None = None,
+    ) -> list[tuple[int, int]]:
+        """Учитывает сообщение и возвращает [(user_id, message_id)] копий спама."""
+        now = time.monotonic()
+        self._evict(now)
+        self.checked += 1
+
+        text = normalize(text, False)[-1].strip() if text else ""
+        if file_unique_id:
+            key, fingerprint_simhash = (chat_id, "file", file_unique_id), None
+        elif len(text) >= self.min_length:
+            key = (chat_id, "text", hashlib.blake2b(text.encode(), digest_size=16).digest())
+            fingerprint_simhash = simhash(text)
+        else:
+            return []
+
+        entry = self._entries.get(key)
+        if entry is None and fingerprint_simhash is not None:
+            key, entry = self._find_similar(chat_id, fingerprint_simhash, key)
+        if entry is None:
+            entry = self._add(key, fingerprint_simhash)
+
+        entry.last_seen = now
+        self._entries.move_to_end(key)
+        entry.messages.setdefault(user_id, []).append(message_id)
+        del entry.messages[user_id][:-10]
+
+        if entry.flagged:
+            self.flagged += 1
+            return [(user_id, message_id)]
+        if len(entry.messages) >= self.threshold:
+            entry.flagged = True
+            found = [(user, message) for user, ids in entry.messages.items() for message in ids]
+            self.flagged += len(found)
+            return found
+        return []
+
+    def _find_similar(self, chat_id: int, value: int, key: tuple):
+        for band in range(_BANDS):
+            for candidate in self._bands.get(self._band_key(chat_id, band, value), ()):
+                entry = self._entries[candidate]
+                if (entry.simhash ^ value).bit_count() <= self.max_distance:
+                    return candidate, entry
+        return key, None
+
+    @staticmethod
+    def _band_key(chat_id: int, band: int, value: int) -> tuple:
+        return chat_id, band, value >> (band * _BAND_BITS) & _BAND_MASK
+
+    def _add(self, key: tuple, value: int | None) -> Fingerprint:
+        entry = self._entries[key] = Fingerprint(simhash=value, last_seen=0)
+        if value is not None:
+            for band in range(_BANDS):
+                self._bands.setdefault(self._band_key(key[0], band, value), set()).add(key)
+        while len(self._entries) > self.max_entries:
+            self._remove(*self._entries.popitem(last=False))
+        return entry
+
+    def _evict(self, now: float) -> None:
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            if entry.last_seen >= now - self.window:
+                break
+            del self._entries[key]
+            self._remove(key, entry)
+
+    def _remove(self, key: tuple, entry: Fingerprint) -> None:
+        self.evicted += 1
+        if entry.simhash is None:
+            return
+        for band in range(_BANDS):
+            band_key = self._band_key(key[0], band, entry.simhash)
+            keys = self._bands.get(band_key)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._bands[band_key]
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "checked": self.checked,
+            "flagged": self.flagged,
+            "evicted": self.evicted,
+        }
+
+
+spam_fingerprints = SpamFingerprints(
+    threshold=settings.SPAM_DISTINCT_USERS,
+    window=settings.SPAM_WINDOW_SECONDS,
+    max_entries=settings.SPAM_MAX_FINGERPRINTS,
+    min_length=settings.SPAM_MIN_TEXT_LENGTH,
+)
+registry.collector("spam", spam_fingerprints.stats)
@@ -0,0 +1,164 @@
+import abc
+import asyncio
+import secrets
+import time
+from contextlib import asynccontextmanager
+
+import settings
+
+
+class StateBackend(abc.ABC):
+    """Общее состояние для нескольких реплик бота.
+
+    Ключ-значение с TTL, счетчики в окне (rate limit) и блокировки.
+    shared=False значит, что состояние живет только в этом процессе и
+    вызывающему коду выгоднее пользоваться своими структурами в памяти.
+    """
+
+    shared = False
+
+    @abc.abstractmethod
+    async def get(self, key: str) -> str | None:
+        ...
+
+    @abc.abstractmethod
+    async def set(self, key: str, value: str, ttl: float) -> None:
+        ...
+
+    @abc.abstractmethod
+    async def delete(self, key: str) -> None:
+        ...
+
+    @abc.abstractmethod
+    async def hit(self, key: str, window: float) -> int:
+        """Увеличивает счетчик окна в window секунд, возвращает его значение."""
+
+    @abc.abstractmethod
+    def lock(self, key: str, ttl: float = 10, timeout: float = 10):
+        """Асинхронный контекстный менеджер эксклюзивной блокировки key."""
+
+    async def close(self) -> None:
+        pass
+
+
+class MemoryBackend(StateBackend):
+    """Состояние в памяти процесса - для одной реплики и для тестов."""
+
+    def __init__(self):
+        self._data: dict[str, tuple[float, str]] = {}
+        self._locks: dict[str, tuple[asyncio.Lock, int]] = {}
+
+    async def get(self, key: str) -> str | None:
+        item = self._data.get(key)
+        if item is None or item[0] < time.monotonic():
+            self._data.pop(key, None)
+            return None
+        return item[1]
+
+    async def set(self, key: str, value: str, ttl: float) -> None:
+        self._data[key] = (time.monotonic() + ttl, value)
+
+    async def delete(self, key: str) -> None:
+        self._data.pop(key, None)
+
+    async def hit(self, key: str, window: float) -> int:
+        value = int(await self.get(key) or 0) + 1
+        expires = self._data[key][0] if value > 1 else time.monotonic() + window
+        self._data[key] = (expires, str(value))
+        return value
+
+    @asynccontextmanager
+    async def lock(self, key: str, ttl: float = 10, timeout: float = 10):
+        lock, users = self._locks.get(key, (asyncio.Lock(), 0))
+        self._locks[key] = (lock, users + 1)
+        try:
+            async with asyncio.timeout(timeout):
+                await lock.acquire()
+            try:
+                yield
+            finally:
+                lock.release()
+        finally:
+            lock, users = self._locks[key]
+            if users > 1:
+                self._locks[key] = (lock, users - 1)
+            else:
+                del self._locks[key]
+
+
+class RedisBackend(StateBackend):
+    """Состояние в Redis (или совместимом сервере), общее для всех реплик.
+
+    Пакет redis - необязательная зависимость (extra redis). Вместо client
+    можно передать совместимый клиент, например
+    fakeredis.aioredis.FakeRedis(decode_responses=True): используются
+    только SET/GET/DEL/INCR и WATCH/MULTI, без Lua-скриптов.
+    """
+
+    shared = True
+
+    def __init__(self, url: str | None = None, client=None, prefix: str = "bot:"):
+        if client is None:
+            try:
+                from redis import asyncio as redis
+            except ImportError as e:
+                raise RuntimeError(
+                    "Для STATE_BACKEND_URL=redis://... нужен пакет redis: poetry install --extras redis"
+                ) from e
+            client = redis.from_url(url, decode_responses=True)
+        self.client = client
+        self.prefix = prefix
+
+    async def get(self, key: str) -> str | None:
+        return await self.client.get(self.prefix + key)
+
+    async def set(self, key: str, value: str, ttl: float) -> None:
+        await self.client.set(self.prefix + key, value, px=int(ttl * 1000))
+
+    async def delete(self, key: str) -> None:
+        await self.client.delete(self.prefix + key)
+
+    async def hit(self, key: str, window: float) -> int:
+        key = self.prefix + key
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.set(key, 0, px=int(window * 1000), nx=True)
+            pipe.incr(key)
+            _, value = await pipe.execute()
+        return int(value)
+
+    @asynccontextmanager
+    async def lock(self, key: str, ttl: float = 10, timeout: float = 10):
+        # ttl страхует от вечной блокировки, если реплика упала внутри
+        key = f"{self.prefix}lock:{key}"
+        token = secrets.token_hex(8)
+        deadline = time.monotonic() + timeout
+        while not await self.client.set(key, token, px=int(ttl * 1000), nx=True):
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Не удалось взять блокировку {key}")
+            await asyncio.sleep(0.05)
+        try:
+            yield
+        finally:
+            # Снимаем только свою блокировку, а не перехваченную после ttl
+            async with self.client.pipeline(transaction=True) as pipe:
+                await pipe.watch(key)
+                if await pipe.get(key) == token:
+                    pipe.multi()
+                    pipe.delete(key)
+                    await pipe.execute()
+                else:
+                    await pipe.unwatch()
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+def create_backend(url: str) -> StateBackend:
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBackend(url)
+    if url.startswith("memory://"):
+        return MemoryBackend()
+    raise ValueError(f"Неизвестный STATE_BACKEND_URL: {url}")
+
+
+state_backend = create_backend(settings.STATE_BACKEND_URL)
@@ -0,0 +1,224 @@
+import asyncio
+import time
+from collections import defaultdict
+from contextlib import suppress
+
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+
+import settings
+from chat_config import chat_configs
+from metrics import registry
+from settings import logger
+
+# Модерация важнее уведомлений: эти запросы идут вне очереди
+PRIORITY_ENDPOINTS = {
+    "banChatMember",
+    "restrictChatMember",
+    "deleteMessage",
+    "deleteMessages",
+}
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self._updated = time.monotonic()
+        self._priority_waiting = 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def is_full(self) -> bool:
+        """Полное ведро ничем не отличается от нового и его можно выбросить."""
+        self._refill()
+        return self.tokens >= self.capacity
+
+    async def acquire(self, priority: bool = False):
+        if priority:
+            self._priority_waiting += 1
+        try:
+            while True:
+                self._refill()
+                if self.tokens >= 1 and (priority or not self._priority_waiting):
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep(max((1 - self.tokens) / self.rate, 0.01))
+        finally:
+            if priority:
+                self._priority_waiting -= 1
+
+
+class TelegramRateLimiter(BaseRateLimiter):
+    """Token bucket на все исходящие запросы и отдельно на каждый чат.
+
+    Удаления и ограничения проходят без чатового лимита и вне очереди,
+    RetryAfter от Telegram выдерживается и запрос повторяется.
+    Ведра чатов, которые успели наполниться, раз в prune_every запросов
+    выбрасываются, чтобы словарь не рос на каждую группу навсегда.
+    """
+
+    def __init__(
+        self,
+        overall_rate: float = 30,
+        chat_rate: float = 20 / 60,
+        chat_burst: int = 20,
+        max_retries: int = 3,
+        prune_every: int = 1000,
+    ):
+        self._overall = TokenBucket(overall_rate, overall_rate)
+        self._chats: defaultdict[int | str, TokenBucket] = defaultdict(
+            lambda: TokenBucket(chat_rate, chat_burst)
+        )
+        self.max_retries = max_retries
+        self.prune_every = prune_every
+
+        self.requests = 0
+        self.retries = 0
+        self.dropped = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "retries": self.retries,
+            "dropped": self.dropped,
+            "wait_avg": self.wait_total / self.requests if self.requests else 0.0,
+            "wait_max": self.wait_max,
+            "chat_buckets": len(self._chats),
+        }
+
+    def _prune(self):
+        # У полного ведра нет ждущих: acquire ждет, только пока токенов меньше одного
+        for chat_id in [chat_id for chat_id, bucket in self._chats.items() if bucket.is_full()]:
+            del self._chats[chat_id]
+
+    async def process_request(
+        self, callback, args, kwargs, endpoint, data, rate_limit_args
+    ):
+        priority = endpoint in PRIORITY_ENDPOINTS
+        chat_id = data.get("chat_id")
+
+        started = time.monotonic()
+        if chat_id is not None and not priority:
+            await self._chats[chat_id].acquire()
+        await self._overall.acquire(priority)
+        waited = time.monotonic() - started
+        self.requests += 1
+        if not self.requests % self.prune_every:
+            self._prune()
+        self.wait_total += waited
+        self.wait_max = max(self.wait_max, waited)
+
+        latency = registry.histogram("telegram_api_seconds", endpoint=endpoint)
+        for attempt in range(self.max_retries + 1):
+            started = time.perf_counter()
+            try:
+                result = await callback(*args, **kwargs)
+            except RetryAfter as error:
+                latency.observe(time.perf_counter() - started)
+                if attempt == self.max_retries:
+                    self.dropped += 1
+                    raise
+                self.retries += 1
+                delay = error.retry_after
+                if not isinstance(delay, (int, float)):
+                    delay = delay.total_seconds()
+                logger.warning(f"{endpoint}: RetryAfter {delay} сек")
+                await asyncio.sleep(delay)
+                continue
+            latency.observe(time.perf_counter() - started)
+            return result
+
+
+class ModeratorNotifier:
+    """Склеивает уведомления в топик модераторов, пришедшие подряд.
+
+    Первое уведомление откладывается на delay секунд, все, что пришло
+    за это время в тот же чат, уходит одним сообщением. Сообщения не
+    длиннее max_length (лимит Telegram): длинный текст, например
+    сводка /stats, режется по строкам.
+    """
+
+    def __init__(self, delay: float = 2.0, max_length: int = 4096):
+        self.delay = delay
+        self.max_length = max_length
+        self._pending: dict[int, list[str]] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self._draining = asyncio.Event()
+        self.coalesced = 0
+
+    def notify(self, bot, chat_id: int, text: str) -> None:
+        if chat_id in self._pending:
+            self._pending[chat_id].append(text)
+            self.coalesced += 1
+            return
+        self._pending[chat_id] = [text]
+        # Ссылка на задачу, иначе сборщик мусора может прибить ее на полпути
+        task = asyncio.create_task(self._flush(bot, chat_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def drain(self):
+        """Отправляет отложенные уведомления, не дожидаясь delay (для остановки)."""
+        self._draining.set()
+        while self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def _flush(self, bot, chat_id: int):
+        with suppress(TimeoutError):
+            await asyncio.wait_for(self._draining.wait(), self.delay)
+        texts = self._pending.pop(chat_id, [])
+        try:
+            # Без настроек чата неизвестен топик, а в общий чат слать нельзя
+            config = await chat_configs.get(chat_id)
+        except Exception:
+            logger.exception("Не удалось получить настройки чата для уведомления модераторам")
+            return
+
+        chunks = []
+        for text in texts:
+            for part in _split(text.strip(), self.max_length):
+                if chunks and len(chunks[-1]) + len(part) + 2 <= self.max_length:
+                    chunks[-1] += f"\n\n{part}"
+                else:
+                    chunks.append(part)
+
+        for chunk in chunks:
+            try:
+                await bot.send_message(
+                    chat_id=chat_id,
+                    text=chunk,
+                    message_thread_id=config.moderator_topic_id,
+                )
+            except Exception:
+                logger.exception("Не удалось отправить уведомление модераторам")
+
+
+def _split(text: str, max_length: int) -> list[str]:
+    """Части текста не длиннее max_length: по строкам, слишком длинные строки - подряд."""
+    parts = []
+    for line in text.split("\n"):
+        while len(line) > max_length:
+            parts.append(line[:max_length])
+            line = line[max_length:]
+        if parts and len(parts[-1]) + len(line) + 1 <= max_length:
+            parts[-1] += f"\n{line}"
+        else:
+            parts.append(line)
+    return parts
+
+
+moderator_notifier = ModeratorNotifier(delay=settings.NOTIFY_COALESCE_SECONDS)
+registry.collector("notifier", lambda: {"coalesced": moderator_notifier.coalesced})
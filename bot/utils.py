@@ -1,7 +1,21 @@
+import asyncio
+
 import settings
+from audit import audit_log
+from classifier import text_classifier
 from database import database
+from dictionary import obscene_dictionary
+from metrics import registry, start_metrics_server
+from scheduler import deletion_scheduler
+from confirmations import confirmation_writer
+from settings import logger
+from counters import counter_compactor
+from retention import retention_job
+from state import state_backend
+from throttling import moderator_notifier
 import hashlib
-import json
+import hmac
+import time
 
 class ObsceneWordFound(Exception):
     pass
@@ -11,16 +25,10 @@ async def check_obscene(text: str) -> None:
     if not text:
         return
 
-    normalized = (
-        text
-        .lower()
-        .replace("ё", "е")
-    )
+    pattern = await text_classifier.classify(text)
+    if pattern:
+        raise ObsceneWordFound(f"Найдено матерное слово: {pattern}")
 
-    for rx in settings._PATTERNS:
-        if rx.search(normalized):
-            raise ObsceneWordFound(f"Найдено матерное слово: {rx.pattern}")
-        
 
 async def extract_name(user):
     if user.username:
@@ -30,10 +38,99 @@ async def extract_name(user):
     return "Неопознанный пользователь"
 
 
+async def prepare_handlers(upgrade: bool) -> None:
+    """Схема БД, пул, индекс словаря и буферы записи - то, без чего не работают хендлеры."""
+    started = time.perf_counter()
+    # Индекс словаря мата строится в фоне, пока идет работа с БД
+    compiling = asyncio.create_task(asyncio.to_thread(obscene_dictionary.matcher.compile))
+
+    await database.check_migrations(upgrade=upgrade)
+    migrated = time.perf_counter()
+    await database.warm_up(settings.DB_WARMUP_CONNECTIONS)
+    warmed = time.perf_counter()
+
+    audit_log.start()
+    confirmation_writer.start()
+    await compiling
+    finished = time.perf_counter()
+    for stage, seconds in (
+        ("migrations", migrated - started),
+        ("pool", warmed - migrated),
+        ("total", finished - started),
+    ):
+        registry.histogram("startup_seconds", stage=stage).observe(seconds)
+    logger.info(
+        f"Запуск: миграции {migrated - started:.3f} с, пул {warmed - migrated:.3f} с, "
+        f"всего {finished - started:.3f} с"
+    )
+
+
+async def release_handlers() -> None:
+    await confirmation_writer.stop()
+    text_classifier.shutdown()
+    await state_backend.close()
+    audit_log.stop()
+
+
 async def startup_task(app):
     print("Бот запускается...")
-    await database.init_models()
+    await prepare_handlers(upgrade=settings.MIGRATE_ON_STARTUP)
+
+    # Фоновые задачи
+    deletion_scheduler.start(app.bot)
+    counter_compactor.start()
+    retention_job.start()
+    obscene_dictionary.start()
+    if settings.METRICS_PORT:
+        app.bot_data["metrics_server"] = await start_metrics_server(
+            settings.METRICS_HOST, settings.METRICS_PORT
+        )
     print("Инициализация завершена!")
 
-async def get_user_hash(user_data: dict):
-    return hashlib.md5(json.dumps(user_data, sort_keys=True).encode()).hexdigest()
\ No newline at end of file
+
+async def stop_task(app):
+    # Бот еще может отправлять сообщения: досылаем отложенные уведомления
+    await moderator_notifier.drain()
+
+
+async def shutdown_task(app):
+    await deletion_scheduler.stop()
+    await counter_compactor.stop()
+    await retention_job.stop()
+    await obscene_dictionary.stop()
+    if server := app.bot_data.get("metrics_server"):
+        server.close()
+    await release_handlers()
+
+
+CONFIRMATION_PREFIX = "user_confirmation"
+
+
+def _sign(payload: str) -> str:
+    digest = hmac.digest(settings.CALLBACK_SECRET, payload.encode(), hashlib.sha256)
+    return digest[:10].hex()
+
+
+def make_confirmation_token(user_id: int, ttl: int | None = None) -> str:
+    """callback_data кнопки капчи: id пользователя, срок действия и подпись.
+
+    Укладывается в лимит Telegram в 64 байта.
+    """
+    expires = int(time.time()) + (ttl or settings.CAPTCHA_TOKEN_TTL)
+    payload = f"{CONFIRMATION_PREFIX}_{user_id}_{expires}"
+    return f"{payload}_{_sign(payload)}"
+
+
+def verify_confirmation_token(token: str) -> int | None:
+    """Возвращает id пользователя из валидного токена, иначе None."""
+    try:
+        payload, signature = token.rsplit("_", 1)
+        _, user_id, expires = payload.rsplit("_", 2)
+        user_id, expires = int(user_id), int(expires)
+    except ValueError:
+        return None
+    if not hmac.compare_digest(signature, _sign(payload)):
+        return None
+    if expires < time.time():
+        return None
+    return user_id
\ No newline at end of file
@@ -0,0 +1,22 @@
+"""Приложение воркера шарда для тестов: Bot API без сети с журналом вызовов.
+
+Воркеры - отдельные процессы, поэтому вызовы пишутся в файл
+SHARD_CALLS_LOG строками "pid endpoint chat_id".
+"""
+import os
+
+from replay import FakeRequest
+
+
+class RecordingRequest(FakeRequest):
+    async def do_request(self, url, method, request_data=None, **kwargs):
+        params = request_data.parameters if request_data else {}
+        with open(os.environ["SHARD_CALLS_LOG"], "a", encoding="utf-8") as f:
+            f.write(f"{os.getpid()} {url.rsplit('/', 1)[-1]} {params.get('chat_id')}\n")
+        return await super().do_request(url, method, request_data, **kwargs)
+
+
+def build_application(updater: bool = True):
+    from main import build_application
+
+    return build_application(updater=updater, request=RecordingRequest())
@@ -0,0 +1,127 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "bot"))
+
+# settings читаются при импорте: тестам нельзя подхватить POSTGRES_* из .env,
+# поэтому все значения задаются явно, а база - только отдельная *_test
+TEST_DB = os.environ.get("TEST_POSTGRES_DB", "is_moderator_bot_test")
+assert TEST_DB.endswith("_test"), "тестовая база должна называться *_test"
+
+os.environ.update(
+    {
+        "TELEGRAM_BOT_TOKEN": "123456:test-token",
+        "MODERATORS_IDS": "1",
+        "POSTGRES_HOST": os.environ.get("TEST_POSTGRES_HOST", "localhost"),
+        "POSTGRES_PORT": os.environ.get("TEST_POSTGRES_PORT", "5432"),
+        "POSTGRES_USER": os.environ.get("TEST_POSTGRES_USER", "postgres"),
+        "POSTGRES_PASSWORD": os.environ.get("TEST_POSTGRES_PASSWORD", "postgres"),
+        "POSTGRES_DB": TEST_DB,
+        "OBSCENE_ROOTS": "бля,хуй,пизд,fuck",
+        "FULL_WORD_PATTERNS": "сука,shit",
+        "METRICS_PORT": "0",
+        "MATCHER_CACHE_DIR": "",
+    }
+)
+
+
+def _connect(dbname: str):
+    import psycopg2
+
+    return psycopg2.connect(
+        host=os.environ["POSTGRES_HOST"],
+        port=os.environ["POSTGRES_PORT"],
+        user=os.environ["POSTGRES_USER"],
+        password=os.environ["POSTGRES_PASSWORD"],
+        dbname=dbname,
+        connect_timeout=3,
+    )
+
+
+def recreate_database(name: str) -> None:
+    """Создает базу заново; без Postgres тест пропускается."""
+    import psycopg2
+
+    assert name.endswith("_test")
+    try:
+        conn = _connect("postgres")
+    except psycopg2.OperationalError as e:
+        pytest.skip(f"Postgres для тестов недоступен: {e}")
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        cur.execute(f'DROP DATABASE IF EXISTS "{name}" WITH (FORCE)')
+        cur.execute(f'CREATE DATABASE "{name}"')
+    conn.close()
+
+
+@pytest.fixture(scope="session")
+def migrated_db():
+    """Пустая тестовая база, доведенная миграциями до head."""
+    recreate_database(TEST_DB)
+
+    from alembic import command
+    from alembic.config import Config
+
+    from database import ALEMBIC_INI
+
+    command.upgrade(Config(ALEMBIC_INI), "head")
+    return TEST_DB
+
+
+@pytest.fixture
+async def db(migrated_db):
+    """База с очищенными таблицами и сброшенными кэшами."""
+    from sqlalchemy import text
+
+    from database import cruds, database
+
+    async with database.session() as session:
+        result = await session.execute(text(
+            "SELECT tablename FROM pg_tables WHERE schemaname = 'public' "
+            "AND tablename <> 'alembic_version'"
+        ))
+        tables = ", ".join(row[0] for row in result)
+        await session.execute(text(f"TRUNCATE {tables} RESTART IDENTITY CASCADE"))
+    cruds.user_cache._data.clear()
+    yield database
+
+
+@pytest.fixture
+def fake_api():
+    """Bot API без сети (replay.FakeRequest) со счетчиком вызовов."""
+    from replay import FakeRequest
+
+    return FakeRequest(record=True)
+
+
+@pytest.fixture
+async def bot(fake_api):
+    from telegram import Bot
+
+    bot = Bot(os.environ["TELEGRAM_BOT_TOKEN"], request=fake_api)
+    await bot.initialize()
+    yield bot
+    await bot.shutdown()
+
+
+def make_update(bot, text: str, user_id: int, chat_id: int = -1_001_000_000_000, **message):
+    """Апдейт с текстовым сообщением в группе."""
+    import time
+
+    from telegram import Update
+
+    return Update.de_json({
+        "update_id": 1,
+        "message": {
+            "message_id": 1,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "supergroup", "title": "test"},
+            "from": {"id": user_id, "is_bot": False, "first_name": f"user{user_id}"},
+            "text": text,
+            **message,
+        },
+    }, bot)
@@ -0,0 +1,43 @@
+import json
+import logging
+
+import pytest
+
+import audit
+import settings
+from audit import AuditLog
+
+
+def write(audit: AuditLog, *records: dict):
+    logger = logging.getLogger(f"audit-test-{id(audit)}")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    logger.addHandler(audit.handler)
+    audit.start()
+    for record in records:
+        logger.info(record)
+    audit.stop()
+    logger.removeHandler(audit.handler)
+
+
+@pytest.mark.parametrize("encoder", ["orjson", "json"])
+def test_audit_goes_to_stdout_by_default(capsys, monkeypatch, encoder):
+    if encoder == "json":
+        monkeypatch.setattr(audit, "orjson", None)
+    elif audit.orjson is None:
+        pytest.skip("orjson не установлен")
+    write(AuditLog(), {"message_id": 1, "text": "привет", "chat": {1: "ключ не строка"}})
+    assert json.loads(capsys.readouterr().out) == {
+        "message_id": 1, "text": "привет", "chat": {"1": "ключ не строка"}
+    }
+
+
+def test_each_shard_writes_its_own_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "SHARDS", 2)
+    for shard in (0, 1):
+        monkeypatch.setattr(settings, "SHARD_INDEX", shard)
+        write(AuditLog(str(tmp_path / "updates.jsonl")), {"shard": shard})
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["updates.0.jsonl", "updates.1.jsonl"]
+    for shard in (0, 1):
+        assert json.loads((tmp_path / f"updates.{shard}.jsonl").read_text()) == {"shard": shard}
@@ -0,0 +1,109 @@
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import text
+
+import main
+from conftest import make_update
+from database import cruds
+from history import MessageHistory, message_history
+from moderators import moderator_resolver
+
+CHAT_ID = -1_001_000_000_000
+MODERATOR, ADMIN, SPAMMER, OTHER = 1, 777, 42, 43
+
+
+@pytest.fixture
+def notices(monkeypatch) -> list[str]:
+    sent = []
+
+    async def chat_moderators(bot, chat_id):
+        return {MODERATOR, ADMIN}
+
+    monkeypatch.setattr(moderator_resolver, "get", chat_moderators)
+    monkeypatch.setattr(main, "moderator_notifier", SimpleNamespace(
+        notify=lambda bot, chat_id, text: sent.append(text)
+    ))
+    message_history._chats.clear()
+    yield sent
+    message_history._chats.clear()
+
+
+def deleted(fake_api) -> list[list[int]]:
+    return [params["message_ids"] for endpoint, params in fake_api.requests if endpoint == "deleteMessages"]
+
+
+def command(bot, text: str, **message):
+    update = make_update(bot, text, MODERATOR, **message)
+    return update, SimpleNamespace(bot=bot, args=text.split()[1:])
+
+
+async def test_purge_dry_run_only_reports(bot, fake_api, notices):
+    for message_id in range(1, 6):
+        message_history.add(CHAT_ID, SPAMMER, message_id, "спам")
+    message_history.add(CHAT_ID, ADMIN, 6, "спам")
+
+    await main.purge(*command(bot, "/purge 10 dry"))
+
+    assert notices == ["/purge: будет удалено 5 сообщений от 1 пользователей за 10 мин., примерно 0.0 сек."]
+    assert deleted(fake_api) == []
+    assert len(message_history.find(CHAT_ID, 600)) == 6
+
+
+async def test_purge_deletes_in_batches_of_100(bot, fake_api, notices):
+    for message_id in range(1, 251):
+        message_history.add(CHAT_ID, SPAMMER, message_id, "спам")
+
+    await main.purge(*command(bot, "/purge 10"))
+
+    assert [len(batch) for batch in deleted(fake_api)] == [100, 100, 50]
+    assert sorted(sum(deleted(fake_api), [])) == list(range(1, 251))
+    # Удаленные забыты, повторный /purge их не трогает
+    assert message_history.find(CHAT_ID, 600) == []
+
+
+async def test_massban_pattern_is_rest_of_message(db, bot, fake_api, notices):
+    await cruds.create_telegram_user(id=SPAMMER)
+    message_history.add(CHAT_ID, SPAMMER, 1, "Заработок от 5000 рублей в день")
+    message_history.add(CHAT_ID, OTHER, 2, "заработок от зарплаты")
+    # Модераторов и админов не трогает, даже если текст подходит
+    message_history.add(CHAT_ID, ADMIN, 3, "заработок от 5000 рублей")
+
+    await main.massban(*command(bot, "/massban 60 7 dry заработок от 5000 рублей"))
+    assert notices[-1].startswith("/massban: будет заблокировано 1 пользователей на 7 дн. и удалено 1 сообщений")
+    assert deleted(fake_api) == []
+
+    await main.massban(*command(bot, "/massban 60 7 заработок от 5000 рублей"))
+    assert deleted(fake_api) == [[1]]
+    assert [params["user_id"] for endpoint, params in fake_api.requests if endpoint == "restrictChatMember"] == [
+        SPAMMER
+    ]
+    async with db.session() as session:
+        reasons = (await session.execute(text("SELECT reason FROM bans"))).scalars().all()
+    assert reasons == [f"MASSBAN BY {MODERATOR}: заработок от 5000 рублей"]
+
+
+@pytest.mark.parametrize(
+    "text", ["/massban заработок", "/massban 60 заработок", "/massban 60 7 ([", "/massban 60 7"]
+)
+async def test_massban_ignores_bad_arguments(bot, fake_api, notices, text):
+    message_history.add(CHAT_ID, SPAMMER, 1, "заработок")
+    await main.massban(*command(bot, text))
+    assert notices == []
+    assert deleted(fake_api) == []
+
+
+def test_history_is_bounded_per_chat():
+    history = MessageHistory(maxlen=3)
+    for message_id in range(5):
+        history.add(CHAT_ID, SPAMMER, message_id, None)
+    history.add(CHAT_ID - 1, SPAMMER, 100, "другой чат")
+
+    assert [message.message_id for message in history.find(CHAT_ID, 60)] == [4, 3, 2]
+    history.forget(CHAT_ID, {3})
+    assert [message.message_id for message in history.find(CHAT_ID, 60)] == [4, 2]
+    # После forget предел тот же
+    for message_id in range(5, 8):
+        history.add(CHAT_ID, SPAMMER, message_id, None)
+    assert [message.message_id for message in history.find(CHAT_ID, 60)] == [7, 6, 5]
+    assert [message.message_id for message in history.find(CHAT_ID - 1, 60)] == [100]
@@ -0,0 +1,66 @@
+import time
+
+from database import cruds
+from database.cache import UserState, UserStateCache
+
+CHAT_ID = -1_001_000_000_000
+USER_ID = 42
+
+
+def test_entries_expire_after_ttl():
+    cache = UserStateCache(ttl=0.05)
+    cache.set(USER_ID, UserState(known=True))
+    assert cache.get(USER_ID) == UserState(known=True)
+
+    time.sleep(0.06)
+    assert cache.peek(USER_ID) is None
+    assert cache.get(USER_ID) is None
+    assert cache.stats()["size"] == 0
+
+
+def test_least_recently_used_is_evicted():
+    cache = UserStateCache(maxsize=2)
+    cache.set(1, UserState(known=True))
+    cache.set(2, UserState(known=True))
+    cache.get(1)
+    # peek не продлевает LRU
+    cache.peek(2)
+    cache.set(3, UserState(known=True))
+
+    assert cache.peek(2) is None
+    assert cache.peek(1) is not None and cache.peek(3) is not None
+    assert cache.stats()["size"] == 2
+
+
+def test_hit_and_miss_counters():
+    cache = UserStateCache()
+    cache.get(USER_ID)
+    cache.set(USER_ID, UserState(known=False))
+    cache.get(USER_ID)
+    cache.get(USER_ID)
+    cache.peek(USER_ID)
+
+    assert cache.stats() == {"size": 1, "hits": 2, "misses": 1, "hit_rate": 2 / 3}
+
+
+async def test_writes_update_cached_state(db):
+    assert (await cruds.get_user_state(USER_ID)).known is False
+
+    await cruds.create_telegram_user(id=USER_ID)
+    assert cruds.user_cache.peek(USER_ID) == UserState(known=True, confirmed=False)
+
+    await cruds.confirm_telegram_user(USER_ID)
+    assert cruds.user_cache.peek(USER_ID).confirmed
+
+    assert await cruds.count_strikes(USER_ID, chat_id=CHAT_ID) == 0
+    await cruds.create_strike_record(USER_ID, "мат", chat_id=CHAT_ID)
+    assert cruds.user_cache.peek(USER_ID).strikes == {CHAT_ID: 1}
+
+    assert await cruds.register_violation(USER_ID, "мат", chat_id=CHAT_ID, strikes_limit=3) == (2, None)
+    assert cruds.user_cache.peek(USER_ID).strikes == {CHAT_ID: 2}
+
+    # Кэш совпадает с тем, что прочиталось бы из БД
+    cached = cruds.user_cache.peek(USER_ID)
+    cruds.user_cache.invalidate(USER_ID)
+    assert await cruds.get_user_state(USER_ID) == UserState(known=True, confirmed=True)
+    assert await cruds.count_strikes(USER_ID, chat_id=CHAT_ID) == cached.strikes[CHAT_ID]
@@ -0,0 +1,29 @@
+import asyncio
+
+from classifier import TIMEOUT_VERDICT, TextClassifier
+from dictionary import obscene_dictionary
+
+
+async def test_timeout_kills_stuck_worker(monkeypatch):
+    # Катастрофический бэктрекинг: без убийства воркер считал бы минутами
+    monkeypatch.setattr(obscene_dictionary, "roots", [])
+    monkeypatch.setattr(obscene_dictionary, "full_words", ["сука", "(а+)+б"])
+    classifier = TextClassifier(inline_limit=0, timeout=0.5, workers=1, block_on_timeout=True)
+    try:
+        assert await classifier.classify("сука") is not None  # пул поднят
+        stuck_pool = classifier._pool
+        worker = next(iter(stuck_pool._processes.values()))
+
+        assert await classifier.classify("а" * 40 + "в") == TIMEOUT_VERDICT
+        assert classifier.timeouts == 1
+        assert classifier._pool is None
+        for _ in range(50):
+            if not worker.is_alive():
+                break
+            await asyncio.sleep(0.1)
+        assert not worker.is_alive()
+
+        assert await classifier.classify("вот сука") is not None
+        assert classifier._pool is not stuck_pool
+    finally:
+        classifier.shutdown()
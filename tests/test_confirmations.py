@@ -0,0 +1,35 @@
+import asyncio
+
+from confirmations import ConfirmationWriter
+from database import cruds
+
+USER_ID = 42
+
+
+async def test_batch_cancelled_mid_flush_is_written_on_stop(db, monkeypatch):
+    await cruds.create_telegram_user(id=USER_ID)
+    write = cruds.confirm_telegram_users
+    started = asyncio.Event()
+    calls = []
+
+    async def slow_write(telegram_user_ids):
+        calls.append(list(telegram_user_ids))
+        if len(calls) == 1:
+            started.set()
+            await asyncio.sleep(60)
+        return await write(telegram_user_ids)
+
+    monkeypatch.setattr(cruds, "confirm_telegram_users", slow_write)
+    writer = ConfirmationWriter(flush_interval=60, batch_size=1)
+    writer.start()
+    await writer.confirm(USER_ID)
+    await asyncio.wait_for(started.wait(), 5)
+
+    # stop() отменяет фоновую запись посреди UPDATE
+    await writer.stop()
+
+    assert calls == [[USER_ID], [USER_ID]]
+    assert not writer._pending
+    assert writer.flushed == 1
+    cruds.user_cache.invalidate(USER_ID)
+    assert (await cruds.get_user_state(USER_ID)).confirmed
@@ -0,0 +1,68 @@
+from sqlalchemy import text
+
+from database import cruds
+
+CHAT_ID = -1_001_000_000_000
+USER_ID, GONE_ID = 42, 43
+
+
+async def age(db, table: str, days: int, where: str = "true"):
+    async with db.session() as session:
+        await session.execute(text(
+            f"UPDATE {table} SET created_at = now() - interval '{days} days' WHERE {where}"
+        ))
+
+
+async def counters(db) -> dict[int, tuple]:
+    async with db.session() as session:
+        result = await session.execute(text(
+            "SELECT u.telegram_id, c.strikes, c.bans, now() - c.strikes_cutoff AS strikes_age "
+            "FROM violation_counters c JOIN telegram_users u ON u.id = c.telegram_user_id"
+        ))
+        return {row.telegram_id: row for row in result}
+
+
+async def test_compaction_subtracts_expired_and_advances_cutoff(db):
+    for user_id in (USER_ID, GONE_ID):
+        await cruds.create_telegram_user(id=user_id)
+    for message in ("старый", "старый", "свежий"):
+        await cruds.create_strike_record(USER_ID, message, chat_id=CHAT_ID)
+    await cruds.create_strike_record(GONE_ID, "старый", chat_id=CHAT_ID)
+    await age(db, "strikes", 40, "message = 'старый'")
+    # Счетчики завели до того, как записи устарели: cutoff тоже в прошлом
+    async with db.session() as session:
+        await session.execute(text(
+            "UPDATE violation_counters SET strikes_cutoff = now() - interval '60 days'"
+        ))
+
+    removed = await cruds.compact_violation_counters()
+
+    assert removed == 1
+    rows = await counters(db)
+    assert GONE_ID not in rows
+    assert rows[USER_ID].strikes == 1
+    assert rows[USER_ID].strikes_age.days == 30
+    # Повторный проход уже вычтенное не трогает
+    assert await cruds.compact_violation_counters() == 0
+    assert (await counters(db))[USER_ID].strikes == 1
+
+
+async def test_check_finds_and_fixes_drift(db):
+    await cruds.create_telegram_user(id=USER_ID)
+    await cruds.create_strike_record(USER_ID, "мат", chat_id=CHAT_ID)
+    await cruds.create_ban(USER_ID, "флуд", 1, chat_id=CHAT_ID)
+    assert await cruds.check_violation_counters() == []
+
+    async with db.session() as session:
+        await session.execute(text("UPDATE violation_counters SET strikes = 5, bans = 0"))
+
+    mismatches = await cruds.check_violation_counters()
+    assert [(row["strikes"], row["real_strikes"], row["bans"], row["real_bans"]) for row in mismatches] == [
+        (5, 1, 0, 1)
+    ]
+    # Без fix ничего не меняется
+    assert (await counters(db))[USER_ID].strikes == 5
+
+    assert len(await cruds.check_violation_counters(fix=True)) == 1
+    assert await cruds.check_violation_counters() == []
+    assert (await counters(db))[USER_ID][1:3] == (1, 1)
@@ -0,0 +1,31 @@
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import text
+
+from conftest import make_update
+from dictionary import obscene_dictionary
+from main import add_word
+from moderators import moderator_resolver
+
+CHAT_ADMIN = 777
+
+
+@pytest.fixture
+async def dictionary(db):
+    yield obscene_dictionary
+    async with db.session() as session:
+        await session.execute(text("DELETE FROM obscene_words"))
+    await obscene_dictionary.reload()
+
+
+@pytest.mark.parametrize("user_id, added", [(1, True), (CHAT_ADMIN, False)])
+async def test_only_bot_moderators_edit_the_global_dictionary(dictionary, bot, monkeypatch, user_id, added):
+    # 1 - из MODERATORS_IDS (conftest), CHAT_ADMIN - админ одной группы
+    async def chat_moderators(bot, chat_id):
+        return {1, CHAT_ADMIN}
+
+    monkeypatch.setattr(moderator_resolver, "get", chat_moderators)
+    update = make_update(bot, "/addword жопа", user_id)
+    await add_word(update, SimpleNamespace(bot=bot, args=["жопа"]))
+    assert (dictionary.matcher.search("жопа") is not None) == added
@@ -0,0 +1,61 @@
+import asyncio
+
+from fakeredis import FakeServer
+from fakeredis.aioredis import FakeRedis
+
+from flood import FloodGuard
+from state import MemoryBackend, RedisBackend
+
+CHAT_ID, USER_ID = -100, 1
+
+
+async def hits(guard: FloodGuard, count: int, user_id: int = USER_ID, limit: int = 3, window: float = 0.3):
+    return [await guard.hit(CHAT_ID, user_id, limit, window) for _ in range(count)]
+
+
+async def test_bucket_allows_limit_then_refills():
+    guard = FloodGuard()
+    assert await hits(guard, 4) == [False, False, False, True]
+    # Другой пользователь со своим ведром
+    assert await hits(guard, 1, user_id=2) == [False]
+
+    # За window/limit секунд возвращается один токен
+    await asyncio.sleep(0.11)
+    assert await hits(guard, 2) == [False, True]
+
+
+async def test_least_recently_seen_user_is_evicted():
+    guard = FloodGuard(max_users=2)
+    await guard.hit(CHAT_ID, 1, 3, 10)
+    await guard.hit(CHAT_ID, 2, 3, 10)
+    await guard.hit(CHAT_ID, 1, 3, 10)
+    await guard.hit(CHAT_ID, 3, 3, 10)
+
+    assert list(guard._buckets) == [(CHAT_ID, 1), (CHAT_ID, 3)]
+    assert guard.stats()["tracked"] == 2
+
+
+async def test_reset_starts_over():
+    guard = FloodGuard(backend=MemoryBackend())
+    assert (await hits(guard, 4))[-1]
+    await guard.reset(CHAT_ID, USER_ID)
+    assert await hits(guard, 3) == [False, False, False]
+    assert guard.stats() == {"tracked": 1, "flooders": 1}
+
+
+async def test_shared_backend_counts_in_window():
+    backend = RedisBackend(client=FakeRedis(server=FakeServer(), decode_responses=True))
+    guard = FloodGuard(backend=backend)
+    try:
+        assert await hits(guard, 4) == [False, False, False, True]
+        # Ведра в памяти при общем бэкенде не заводятся
+        assert not guard._buckets
+
+        await asyncio.sleep(0.35)
+        assert await hits(guard, 1) == [False]
+
+        await hits(guard, 3)
+        await guard.reset(CHAT_ID, USER_ID)
+        assert await hits(guard, 1) == [False]
+    finally:
+        await backend.close()
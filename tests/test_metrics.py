@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+
+from database import cruds
+from metrics import Registry, registry, start_metrics_server, timed
+
+
+async def test_timed_records_calls_and_failures():
+    @timed("test")
+    async def work(fail: bool):
+        if fail:
+            raise ValueError("сбой")
+
+    await work(False)
+    with pytest.raises(ValueError):
+        await work(True)
+    assert registry.histogram("test_seconds", func="work").count == 2
+
+
+async def test_query_counter_is_per_call(db):
+    await cruds.create_telegram_user(id=42)
+
+    @timed("test", count_queries=True)
+    async def handler(calls: int):
+        for _ in range(calls):
+            # Окно не стандартное - мимо кэша: пользователь и подсчет, два SELECT
+            await cruds.count_strikes(42, days=1)
+
+    # Одновременные вызовы считают каждый свои запросы
+    await asyncio.gather(handler(1), handler(3))
+    histogram = registry.histogram("test_db_queries", func="handler")
+    assert histogram.count == 2
+    assert histogram.sum == 2 + 6
+    # По одному наблюдению в корзинах "<=2" и "<=8"
+    assert [bound for bound, count in zip(histogram.buckets, histogram.counts) if count] == [2, 8]
+
+
+def test_render_prometheus_text():
+    metrics = Registry()
+    histogram = metrics.histogram("handler_seconds", buckets=(0.1, 1), func="strike")
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+    metrics.collector("flood", lambda: {"tracked": 3, "backend": {"errors": 1}})
+
+    assert metrics.render().splitlines() == [
+        'handler_seconds_bucket{func="strike",le="0.1"} 1',
+        'handler_seconds_bucket{func="strike",le="1"} 2',
+        'handler_seconds_bucket{func="strike",le="+Inf"} 2',
+        'handler_seconds_sum{func="strike"} 0.55',
+        'handler_seconds_count{func="strike"} 2',
+        "flood_tracked 3.0",
+        "flood_backend_errors 1.0",
+    ]
+
+
+async def fetch(port: int, path: str) -> tuple[str, str]:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+    await writer.drain()
+    response = (await reader.read()).decode()
+    writer.close()
+    head, body = response.split("\r\n\r\n", 1)
+    return head.splitlines()[0], body
+
+
+async def test_metrics_endpoint():
+    registry.histogram("endpoint_seconds", func="probe").observe(0.01)
+    server = await start_metrics_server("127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    try:
+        status, body = await fetch(port, "/metrics")
+        assert status == "HTTP/1.1 200 OK"
+        assert 'endpoint_seconds_count{func="probe"} 1' in body.splitlines()
+
+        status, _ = await fetch(port, "/")
+        assert status == "HTTP/1.1 404 Not Found"
+    finally:
+        server.close()
+        await server.wait_closed()
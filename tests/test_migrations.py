@@ -0,0 +1,112 @@
+import pytest
+from alembic import command
+from alembic.config import Config
+from alembic.script import ScriptDirectory
+from sqlalchemy import text
+
+import settings
+from conftest import TEST_DB, recreate_database
+from database import ALEMBIC_INI, CREATE_ALL_REVISION, Database, _script_heads
+
+LEGACY_DB = TEST_DB.removesuffix("_test") + "_legacy_test"
+
+
+def test_script_heads_match_alembic():
+    assert _script_heads() == set(ScriptDirectory.from_config(Config(ALEMBIC_INI)).get_heads())
+
+
+def test_upgrade_from_empty_database(migrated_db):
+    # Фикстура уже прогнала upgrade head на пустой базе
+    assert migrated_db == TEST_DB
+
+
+@pytest.fixture
+def scratch_db(monkeypatch):
+    """Отдельная пустая база, на которую смотрят миграции alembic."""
+    recreate_database(LEGACY_DB)
+    monkeypatch.setattr(settings, "POSTGRES_DB", LEGACY_DB)
+    return Database(
+        f"postgresql+asyncpg://{settings.POSTGRES_USER}:{settings.POSTGRES_PASSWORD}"
+        f"@{settings.POSTGRES_HOST}:{settings.POSTGRES_PORT}/{LEGACY_DB}"
+    )
+
+
+@pytest.fixture
+def legacy_db(scratch_db):
+    """База в том виде, в каком ее оставлял create_all: без alembic_version."""
+    config = Config(ALEMBIC_INI)
+    command.upgrade(config, CREATE_ALL_REVISION)
+    command.stamp(config, "base", purge=True)
+    return scratch_db
+
+
+async def test_legacy_records_are_backfilled_to_legacy_chat(scratch_db, monkeypatch):
+    config = Config(ALEMBIC_INI)
+    command.upgrade(config, "e4b27d9a0c16")
+    async with scratch_db.engine.connect() as conn:
+        await conn.execute(text("INSERT INTO telegram_users (telegram_id) VALUES (42)"))
+        await conn.execute(text(
+            "INSERT INTO strikes (telegram_user_id, message) SELECT id, 'старый' FROM telegram_users"
+        ))
+        await conn.execute(text(
+            "INSERT INTO bans (telegram_user_id, period) SELECT id, 1 FROM telegram_users"
+        ))
+        await conn.commit()
+
+    monkeypatch.setattr(settings, "LEGACY_CHAT_ID", None)
+    with pytest.raises(RuntimeError, match="LEGACY_CHAT_ID"):
+        command.upgrade(config, "head")
+
+    monkeypatch.setattr(settings, "LEGACY_CHAT_ID", -100500)
+    command.upgrade(config, "head")
+    async with scratch_db.engine.connect() as conn:
+        chats = (await conn.execute(text(
+            "SELECT chat_id FROM strikes UNION ALL SELECT chat_id FROM bans"
+        ))).scalars().all()
+        counters = (await conn.execute(text(
+            "SELECT chat_id, strikes, bans FROM violation_counters"
+        ))).all()
+    await scratch_db.engine.dispose()
+    assert chats == [-100500, -100500]
+    assert [tuple(row) for row in counters] == [(-100500, 1, 1)]
+
+
+async def test_counters_backfill_uses_configured_windows(scratch_db, monkeypatch):
+    config = Config(ALEMBIC_INI)
+    command.upgrade(config, "d2d83de66fe8")
+    async with scratch_db.engine.connect() as conn:
+        await conn.execute(text("INSERT INTO telegram_users (telegram_id) VALUES (42)"))
+        for age in (1, 10):
+            await conn.execute(text(
+                "INSERT INTO strikes (telegram_user_id, chat_id, message, created_at) "
+                f"SELECT id, -100, 'мат', now() - interval '{age} days' FROM telegram_users"
+            ))
+        await conn.commit()
+
+    monkeypatch.setattr(settings, "STRIKES_WINDOW_DAYS", 5)
+    command.upgrade(config, "7b7d03d24a91")
+    async with scratch_db.engine.connect() as conn:
+        strikes, cutoff_days = (await conn.execute(text(
+            "SELECT strikes, extract(day FROM now() - strikes_cutoff) FROM violation_counters"
+        ))).one()
+    await scratch_db.engine.dispose()
+    assert (strikes, cutoff_days) == (1, 5)
+
+
+async def test_create_all_database_is_stamped_and_upgraded(legacy_db):
+    async with legacy_db.engine.connect() as conn:
+        await conn.execute(text("DROP TABLE alembic_version"))
+        await conn.execute(text(
+            "INSERT INTO telegram_users (telegram_id, username) VALUES ('42', 'old')"
+        ))
+        await conn.commit()
+
+    with pytest.raises(RuntimeError, match=f"alembic stamp {CREATE_ALL_REVISION}"):
+        await legacy_db.check_migrations()
+
+    await legacy_db.check_migrations(upgrade=True)
+    await legacy_db.check_migrations()
+    async with legacy_db.engine.connect() as conn:
+        telegram_id = await conn.scalar(text("SELECT telegram_id FROM telegram_users"))
+    await legacy_db.engine.dispose()
+    assert telegram_id == 42
@@ -0,0 +1,39 @@
+import asyncio
+
+from chat_config import chat_configs
+from moderators import ModeratorResolver
+
+CHAT_ID = -1_001_000_000_000
+ADMIN, OTHER_ADMIN = 500, 501
+
+
+async def test_failed_config_lookup_does_not_block_refreshes(bot, monkeypatch):
+    async def broken(chat_id):
+        raise ConnectionError("БД недоступна")
+
+    monkeypatch.setattr(chat_configs, "get", broken)
+    resolver = ModeratorResolver()
+    await resolver.refresh(bot, CHAT_ID)
+    assert CHAT_ID not in resolver._refreshing
+
+
+async def test_cold_miss_waits_for_admins(db, bot, fake_api):
+    fake_api.admins = [ADMIN]
+    resolver = ModeratorResolver()
+    moderators = await asyncio.gather(*(resolver.get(bot, CHAT_ID) for _ in range(3)))
+    assert all(ADMIN in ids for ids in moderators)
+    # Одновременные промахи ждут одно обновление
+    assert fake_api.calls["getChatAdministrators"] == 1
+    assert not resolver._refreshing
+
+
+async def test_stale_entry_is_refreshed_in_background(db, bot, fake_api):
+    resolver = ModeratorResolver()
+    resolver._cache[CHAT_ID] = (0, frozenset({ADMIN}))
+    fake_api.admins = [OTHER_ADMIN]
+
+    assert await resolver.get(bot, CHAT_ID) == {ADMIN}
+    task = resolver._refreshing[CHAT_ID]
+    await task
+    assert not resolver._refreshing
+    assert OTHER_ADMIN in await resolver.get(bot, CHAT_ID)
@@ -0,0 +1,84 @@
+import re
+import sys
+from pathlib import Path
+
+import pytest
+
+from obscene import ObsceneMatcher, normalize
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "benchmarks"))
+from _corpus import labeled, messages, precision_recall, roots  # noqa: E402
+
+
+def legacy_search(roots, full_words, text):
+    patterns = [re.compile(rf"\b{root}\w*\b", re.IGNORECASE) for root in roots] + [
+        re.compile(rf"\b{word}\b", re.IGNORECASE) for word in full_words
+    ]
+    return next((rx.pattern for rx in patterns if rx.search(text.lower())), None)
+
+
+@pytest.fixture
+def matcher():
+    return ObsceneMatcher(["бля", "хуй", "пизд"], ["сука", "шлюх[аи]"])
+
+
+@pytest.mark.parametrize(
+    "text, pattern",
+    [
+        ("ну бля", r"\bбля\w*\b"),
+        ("БЛЯДЬ какая", r"\bбля\w*\b"),
+        ("пиздец", r"\bпизд\w*\b"),
+        ("вот сука", r"\bсука\b"),
+        ("шлюхи", r"\bшлюх[аи]\b"),
+    ],
+)
+def test_reports_matched_pattern(matcher, text, pattern):
+    assert matcher.search(text) == pattern
+
+
+@pytest.mark.parametrize(
+    "text",
+    ["", "оскорбление", "употреблять", "сукам", "исука", "шлюхой", "рубля"],
+)
+def test_respects_word_boundaries(matcher, text):
+    assert matcher.search(text) is None
+
+
+def test_agrees_with_per_pattern_loop():
+    dictionary = roots(120)
+    root_list, full_words = dictionary[:100], dictionary[100:]
+    matcher = ObsceneMatcher(root_list, full_words)
+    for text in messages(2000, dictionary, dirty_share=0.2):
+        assert (matcher.search(text) is None) == (legacy_search(root_list, full_words, text) is None)
+
+
+def test_empty_dictionary():
+    assert ObsceneMatcher([], []).search("что угодно") is None
+
+
+@pytest.mark.parametrize("text", ["fuck", "FUCK off", "fuсk", "shiiit"])
+def test_latin_entries_match_normalized_text(text):
+    matcher = ObsceneMatcher(["fuck"], ["shit"])
+    assert matcher.search_normalized(text) is not None
+
+
+@pytest.mark.parametrize(
+    "text, normalized",
+    [
+        ("и т.д. и т.п.", "и т.д. и т.п."),
+        ("в т.ч. дети", "в т.ч. дети"),
+        ("х у й", "хуй"),
+        ("х. у. й.", "хуй."),
+        ("б_л_я", "бля"),
+    ],
+)
+def test_despace_joins_only_evenly_spaced_letters(text, normalized):
+    assert normalize(text)[0] == normalized
+
+
+def test_precision_and_recall_on_labeled_set():
+    dictionary, cases = labeled()
+    matcher = ObsceneMatcher(dictionary["roots"], dictionary["full_words"])
+    precision, recall = precision_recall(cases, matcher.search_normalized)
+    assert precision == 1.0
+    assert recall >= 0.85
@@ -0,0 +1,89 @@
+import asyncio
+
+from conftest import make_update
+from processing import KeyedUpdateProcessor
+
+MODERATOR, VIOLATOR, OTHER = 1, 2, 3
+
+
+def reply_to(user_id: int) -> dict:
+    return {"reply_to_message": {
+        "message_id": 7,
+        "date": 0,
+        "chat": {"id": -1_001_000_000_000, "type": "supergroup"},
+        "from": {"id": user_id, "is_bot": False, "first_name": "x"},
+        "text": "текст",
+    }}
+
+
+async def run_all(processor, updates) -> list[str]:
+    log = []
+
+    async def handle(name):
+        log.append(f"{name}+")
+        await asyncio.sleep(0.01)
+        log.append(f"{name}-")
+
+    await asyncio.gather(*(
+        processor.process_update(update, handle(name)) for name, update in updates
+    ))
+    return log
+
+
+async def test_same_user_is_serialized(bot):
+    processor = KeyedUpdateProcessor(8)
+    log = await run_all(processor, [
+        ("a1", make_update(bot, "раз", VIOLATOR)),
+        ("a2", make_update(bot, "два", VIOLATOR)),
+        ("b", make_update(bot, "три", OTHER)),
+    ])
+    assert log.index("a1-") < log.index("a2+")
+    # Другой пользователь не ждет
+    assert log.index("b+") < log.index("a1-")
+    assert not processor._locks
+
+
+async def test_reply_command_is_serialized_with_target(bot):
+    processor = KeyedUpdateProcessor(8)
+    command = make_update(
+        bot, "/strike", MODERATOR,
+        entities=[{"type": "bot_command", "offset": 0, "length": 7}], **reply_to(VIOLATOR),
+    )
+    plain_reply = make_update(bot, "согласен", OTHER, **reply_to(VIOLATOR))
+    log = await run_all(processor, [
+        ("violation", make_update(bot, "мат", VIOLATOR)),
+        ("strike", command),
+        ("reply", plain_reply),
+    ])
+    assert log.index("violation-") < log.index("strike+")
+    # Обычный ответ не команда - в очередь нарушителя не встает
+    assert log.index("reply+") < log.index("violation-")
+    assert not processor._locks
+
+
+async def test_backlog_does_not_hold_slots(bot):
+    processor = KeyedUpdateProcessor(4)
+    log = await run_all(processor, [
+        *((f"a{i}", make_update(bot, "флуд", VIOLATOR)) for i in range(10)),
+        ("b", make_update(bot, "привет", OTHER)),
+    ])
+    # Очередь флудера ждет без слота, и другой пользователь начинает сразу
+    assert log.index("b+") < log.index("a0-")
+    assert processor.max_concurrent_updates == 4
+    assert processor.current_concurrent_updates == 0
+    assert not processor._locks
+
+
+async def test_slots_limit_running_updates(bot):
+    processor = KeyedUpdateProcessor(2)
+    peak = 0
+
+    async def handle():
+        nonlocal peak
+        peak = max(peak, processor.running_updates)
+        await asyncio.sleep(0.01)
+
+    await asyncio.gather(*(
+        processor.process_update(make_update(bot, "текст", 100 + i), handle()) for i in range(6)
+    ))
+    assert peak == 2
@@ -0,0 +1,51 @@
+import asyncio
+
+from raid import RaidGuard
+
+CHAT_A, CHAT_B = -100, -200
+
+
+async def test_raid_is_tracked_per_chat():
+    guard = RaidGuard(threshold=3, window=10)
+    for user_id in range(3):
+        guard.register(CHAT_A, user_id)
+        guard.captcha_sent(CHAT_A, user_id)
+    guard.register(CHAT_B, 0)
+
+    assert guard.is_active(CHAT_A)
+    assert not guard.is_active(CHAT_B)
+    assert not guard.should_send_captcha(CHAT_A, 0)
+    assert guard.should_send_captcha(CHAT_B, 0)
+
+
+async def test_raid_ends_when_the_chat_goes_quiet():
+    guard = RaidGuard(threshold=3, window=0.2, captcha_window=0.2)
+    for user_id in range(3):
+        guard.register(CHAT_A, user_id)
+        guard.captcha_sent(CHAT_A, user_id)
+    assert guard.is_active(CHAT_A)
+
+    await asyncio.sleep(0.5)
+    assert not guard.is_active(CHAT_A)
+    assert CHAT_A not in guard._chats
+
+
+class SlowBot:
+    def __init__(self, guard: RaidGuard):
+        self.guard = guard
+        self.deleted: list[int] = []
+
+    async def delete_messages(self, chat_id, message_ids):
+        if not self.deleted:
+            # Новое сообщение приходит, пока идет первая пачка удалений
+            self.guard.delete_later(self, chat_id, 2)
+        await asyncio.sleep(0.01)
+        self.deleted.extend(message_ids)
+
+
+async def test_flush_drains_messages_queued_during_deletion():
+    guard = RaidGuard(flush_interval=0.01)
+    bot = SlowBot(guard)
+    guard.delete_later(bot, CHAT_A, 1)
+    await guard._flush_task
+    assert bot.deleted == [1, 2]
@@ -0,0 +1,103 @@
+import gzip
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import text
+
+import settings
+from database import ALEMBIC_INI, cruds
+from database.models import Ban, Strikes
+from retention import RetentionJob
+
+# Ревизия перед 5c0e8a3f19b2 (партиционирование)
+PARTITION_REVISION_PARENT = "7b7d03d24a91"
+
+
+def test_retention_is_off_by_default():
+    job = RetentionJob({Strikes: (0, 30), Ban: (0, 365)})
+    job.start()
+    assert job._task is None
+
+
+async def test_shards_archive_into_separate_files(db, tmp_path, monkeypatch):
+    await cruds.create_telegram_user(id=42, username="old")
+    await cruds.create_strike_record(42, "старый страйк")
+    await cruds.create_strike_record(42, "свежий страйк")
+    async with db.session() as session:
+        await session.execute(text(
+            "UPDATE strikes SET created_at = now() - interval '400 days' WHERE message = 'старый страйк'"
+        ))
+
+    job = RetentionJob({Strikes: (180, 30)}, archive_dir=str(tmp_path))
+    for shard in (0, 1):
+        monkeypatch.setattr(settings, "SHARD_INDEX", shard)
+        await job.run_once()
+
+    files = list(tmp_path.glob("strikes/*/*.jsonl.gz"))
+    assert len(files) == 1
+    assert files[0].name.endswith("-0.jsonl.gz")
+    with gzip.open(files[0], "rt", encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f]
+    assert [row["message"] for row in rows] == ["старый страйк"]
+    async with db.session() as session:
+        left = (await session.execute(text("SELECT message FROM strikes"))).scalars().all()
+    assert left == ["свежий страйк"]
+
+
+@pytest.fixture
+async def partitioned(db, monkeypatch):
+    """Тестовая база, прошедшая миграцию партиционирования с PARTITION_TABLES."""
+    config = Config(ALEMBIC_INI)
+    command.downgrade(config, PARTITION_REVISION_PARENT)
+    monkeypatch.setattr(settings, "PARTITION_TABLES", True)
+    command.upgrade(config, "head")
+    yield db
+    # Записи без группы остановили бы c9e1d5a7b2f4 на обратном пути
+    async with db.session() as session:
+        await session.execute(text("TRUNCATE strikes, bans"))
+    command.downgrade(config, PARTITION_REVISION_PARENT)
+    monkeypatch.setattr(settings, "PARTITION_TABLES", False)
+    command.upgrade(config, "head")
+
+
+async def test_expired_month_is_archived_and_dropped(partitioned, tmp_path):
+    await cruds.create_telegram_user(id=42, username="old")
+    async with partitioned.session() as session:
+        await session.execute(text("CREATE TABLE strikes_2020_01 PARTITION OF strikes "
+                                   "FOR VALUES FROM ('2020-01-01') TO ('2020-02-01')"))
+        await session.execute(text(
+            "INSERT INTO strikes (telegram_user_id, chat_id, message, created_at) "
+            "SELECT id, -100, 'старый ' || g, '2020-01-15' FROM telegram_users, generate_series(1, 3) g"
+        ))
+    await cruds.create_strike_record(42, "свежий страйк")
+    next_month = (datetime.now(tz=timezone.utc).replace(day=1) + timedelta(days=32)).replace(day=1)
+    async with partitioned.session() as session:
+        for table in ("strikes", "bans"):
+            await session.execute(text(f"DROP TABLE {table}_{next_month:%Y_%m}"))
+
+    job = RetentionJob({Strikes: (180, 30), Ban: (0, 365)}, batch_size=2, archive_dir=str(tmp_path))
+    await job.run_once()
+
+    assert job.stats()["partitions_dropped"] == 1
+    assert job.stats()["archived"] == 3
+    with gzip.open(next(tmp_path.glob("strikes/2020-01/*.jsonl.gz")), "rt", encoding="utf-8") as f:
+        assert sorted(json.loads(line)["message"] for line in f) == ["старый 1", "старый 2", "старый 3"]
+
+    # Партиции на будущее создаются и без срока хранения (bans)
+    for table in ("strikes", "bans"):
+        partitions = await cruds.get_partitions(table)
+        assert f"{table}_{next_month:%Y_%m}" in partitions
+    assert "strikes_2020_01" not in await cruds.get_partitions("strikes")
+    async with partitioned.session() as session:
+        left = (await session.execute(text("SELECT message FROM strikes"))).scalars().all()
+    assert left == ["свежий страйк"]
+
+
+async def test_partitioned_tables_start_the_job_without_retention():
+    job = RetentionJob({Strikes: (0, 30), Ban: (0, 365)}, partitioned=True)
+    job.start()
+    assert job._task is not None
+    await job.stop()
@@ -0,0 +1,67 @@
+import asyncio
+
+from sqlalchemy import select
+
+import scheduler
+from database import cruds
+from database.models import PendingDeletion
+from scheduler import DeletionScheduler
+
+CHAT_ID = -1_001_000_000_000
+
+
+async def _schedule(*message_ids: int) -> None:
+    for message_id in message_ids:
+        await cruds.schedule_deletion(
+            chat_id=CHAT_ID, user_id=1, user_message_id=message_id, bot_message_id=0, delay_seconds=-1
+        )
+
+
+async def _left(db) -> list[int]:
+    async with db.session() as session:
+        result = await session.execute(select(PendingDeletion.user_message_id))
+        return sorted(result.scalars())
+
+
+async def _until(condition, timeout: float = 5):
+    for _ in range(int(timeout / 0.01)):
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("не дождались")
+
+
+async def test_stop_keeps_unprocessed_jobs(db, monkeypatch):
+    async def delete(bot, job):
+        if job.user_message_id == 2:
+            await asyncio.Event().wait()
+
+    monkeypatch.setattr(scheduler, "delete_if_not_confirmed", delete)
+    await _schedule(1, 2)
+    deletions = DeletionScheduler(poll_interval=0.01, lease=60)
+    deletions.start(bot=None)
+    await _until(lambda: deletions.processed == 1)
+    await deletions.stop()
+
+    assert await _left(db) == [2]
+    # Взятая задача отложена на lease и не берется повторно сразу
+    assert await cruds.claim_due_deletions(limit=10, lease_seconds=60) == []
+
+
+async def test_failed_queue_count_does_not_stop_the_loop(db, monkeypatch):
+    async def broken(**kwargs):
+        raise ConnectionError("БД недоступна")
+
+    async def delete(bot, job):
+        pass
+
+    monkeypatch.setattr(cruds, "count_pending_deletions", broken)
+    monkeypatch.setattr(scheduler, "delete_if_not_confirmed", delete)
+    await _schedule(1)
+    deletions = DeletionScheduler(poll_interval=0.01)
+    deletions.start(bot=None)
+    try:
+        await _until(lambda: deletions.processed == 1)
+    finally:
+        await deletions.stop()
+    assert await _left(db) == []
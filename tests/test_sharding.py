@@ -0,0 +1,92 @@
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import update
+from telegram import Update
+from telegram.ext import ApplicationHandlerStop
+
+import _shard_app
+from database import cruds
+from database.models import PendingDeletion
+from sharding import ShardRouter, shard_for
+
+CHATS = (-1_001_000_000_000, -1_001_000_000_001)
+
+
+def _message(update_id: int, chat_id: int, user_id: int) -> Update:
+    return Update.de_json({
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "supergroup", "title": "shard"},
+            "from": {"id": user_id, "is_bot": False, "first_name": f"user{user_id}"},
+            "text": "привет",
+        },
+    }, None)
+
+
+async def _route(router: ShardRouter, update: Update) -> None:
+    with pytest.raises(ApplicationHandlerStop):
+        await router.route(update, None)
+
+
+async def _wait_calls(path, chat_id: int, count: int, timeout: float = 60) -> list[int]:
+    """pid процессов, приславших sendMessage в группу."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        pids = []
+        if path.exists():
+            for line in path.read_text().splitlines():
+                pid, endpoint, chat = line.split()
+                if endpoint == "sendMessage" and chat == str(chat_id):
+                    pids.append(int(pid))
+        if len(pids) >= count:
+            return pids
+        await asyncio.sleep(0.1)
+    raise AssertionError(f"нет ответа в группу {chat_id}")
+
+
+async def test_groups_are_pinned_to_workers_and_dead_workers_restart(db, tmp_path, monkeypatch):
+    calls = tmp_path / "calls.log"
+    monkeypatch.setenv("SHARD_CALLS_LOG", str(calls))
+    monkeypatch.setenv("AUDIT_LOG_PATH", str(tmp_path / "updates.jsonl"))
+    assert {shard_for(chat_id, 2) for chat_id in CHATS} == {0, 1}
+
+    router = ShardRouter(2, _shard_app.build_application, supervise_interval=0.1)
+    await router.start(None)
+    try:
+        for update_id, user_id in enumerate(range(100, 106), 1):
+            await _route(router, _message(update_id, CHATS[user_id % 2], user_id))
+        pids = {chat_id: set(await _wait_calls(calls, chat_id, 3)) for chat_id in CHATS}
+        assert all(len(chat_pids) == 1 for chat_pids in pids.values())
+        assert pids[CHATS[0]] != pids[CHATS[1]]
+
+        dead = router._workers[shard_for(CHATS[0], 2)]
+        dead.kill()
+        while not router.restarts:
+            await asyncio.sleep(0.1)
+        await _route(router, _message(50, CHATS[0], 200))
+        fresh = await _wait_calls(calls, CHATS[0], 4)
+        assert fresh[-1] not in pids[CHATS[0]]
+        assert router.stats() == {"workers_alive": 2, "restarts": 1}
+    finally:
+        await router.stop(None)
+
+
+async def test_deletions_are_claimed_by_the_shard_of_the_chat(db, monkeypatch):
+    for chat_id in CHATS:
+        await cruds.schedule_deletion(
+            chat_id=chat_id, user_id=1, user_message_id=1, bot_message_id=2, delay_seconds=0
+        )
+    async with db.session() as session:
+        await session.execute(
+            update(PendingDeletion).values(due_at=datetime.now(tz=timezone.utc) - timedelta(seconds=1))
+        )
+
+    assert await cruds.count_pending_deletions(shard=0, shards=2) == 1
+    for shard in (0, 1):
+        jobs = await cruds.claim_due_deletions(limit=10, lease_seconds=60, shard=shard, shards=2)
+        assert [shard_for(job.chat_id, 2) for job in jobs] == [shard]
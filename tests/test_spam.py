@@ -0,0 +1,75 @@
+import time
+
+import pytest
+
+import spam
+from conftest import make_update
+from main import media_fingerprint
+from spam import SpamFingerprints
+
+CHAT_ID = -1_001_000_000_000
+AD = "Заработок от 5000 рублей в день без вложений, пиши в личку"
+OTHER_AD = "Набираем людей на удаленку, оплата 5000 в неделю, опыт не нужен"
+PHOTO = {"photo": [{"file_id": "f", "file_unique_id": "meme", "width": 1, "height": 1}]}
+
+
+def send(guard: SpamFingerprints, *messages, chat_id: int = CHAT_ID, **kwargs) -> list[list]:
+    return [
+        guard.check(chat_id, user_id, message_id, text, **kwargs)
+        for message_id, (user_id, text) in enumerate(messages, start=1)
+    ]
+
+
+def test_near_duplicates_from_distinct_users_are_flagged():
+    guard = SpamFingerprints(threshold=3)
+    results = send(guard, (1, AD), (2, AD.upper() + "!!"), (3, AD.replace(",", "")), (4, AD + "!"))
+    # На третьем пользователе - все копии сразу, дальше - каждая новая
+    assert results == [[], [], [(1, 1), (2, 2), (3, 3)], [(4, 4)]]
+    assert guard.stats()["entries"] == 1
+
+
+def test_threshold_counts_users_not_messages():
+    guard = SpamFingerprints(threshold=3)
+    assert send(guard, (1, AD), (1, AD), (1, AD), (2, AD)) == [[], [], [], []]
+    # Разные группы считаются отдельно
+    assert send(guard, (3, AD), chat_id=CHAT_ID - 1) == [[]]
+
+
+def test_short_and_unrelated_texts_are_ignored():
+    guard = SpamFingerprints(threshold=2)
+    assert send(guard, (1, "привет"), (2, "привет")) == [[], []]
+    assert send(guard, (1, AD), (2, OTHER_AD)) == [[], []]
+
+
+@pytest.mark.parametrize("distance, found", [(3, True), (4, False)])
+def test_simhash_bands_find_up_to_max_distance(monkeypatch, distance, found):
+    base = 0x0123_4567_89AB_CDEF
+    # Биты разбросаны по разным полосам: совпадает хотя бы одна, только пока их не больше трех
+    changed = base ^ sum(1 << (16 * band) for band in range(distance))
+    monkeypatch.setattr(spam, "simhash", lambda text: base if "заработок" in text else changed)
+
+    guard = SpamFingerprints(threshold=2)
+    assert bool(send(guard, (1, AD), (2, OTHER_AD))[1]) is found
+
+
+def test_window_and_capacity_bound_memory():
+    guard = SpamFingerprints(threshold=2, window=0.05, max_entries=2)
+    send(guard, (1, AD))
+    time.sleep(0.06)
+    # Старая копия выпала из окна
+    assert send(guard, (2, AD)) == [[]]
+
+    send(guard, (3, OTHER_AD), (4, "Совсем другой длинный текст про котиков и собак"))
+    assert guard.stats()["entries"] == 2
+    assert guard.stats()["evicted"] == 2
+    # Индекс полос чистится вместе с отпечатками
+    assert len(guard._bands) <= 2 * 4
+
+
+def test_same_media_is_flagged_but_forwards_are_not(bot):
+    guard = SpamFingerprints(threshold=2)
+    assert send(guard, (1, None), (2, None), file_unique_id="meme")[1] == [(1, 1), (2, 2)]
+
+    forward = {"forward_origin": {"type": "hidden_user", "date": 0, "sender_user_name": "канал"}}
+    assert media_fingerprint(make_update(bot, "", 1, **PHOTO).message) == "meme"
+    assert media_fingerprint(make_update(bot, "", 1, **PHOTO, **forward).message) is None
@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+from fakeredis import FakeServer
+from fakeredis.aioredis import FakeRedis
+
+from flood import FloodGuard
+from state import MemoryBackend, RedisBackend, StateBackend
+
+
+def redis_replica(server: FakeServer) -> RedisBackend:
+    return RedisBackend(client=FakeRedis(server=server, decode_responses=True))
+
+
+@pytest.fixture(params=["memory", "redis"])
+async def backend(request):
+    backend = MemoryBackend() if request.param == "memory" else redis_replica(FakeServer())
+    yield backend
+    await backend.close()
+
+
+def test_backend_is_abstract():
+    with pytest.raises(TypeError):
+        StateBackend()
+
+
+async def test_values_expire(backend):
+    await backend.set("key", "value", ttl=0.1)
+    assert await backend.get("key") == "value"
+    await asyncio.sleep(0.2)
+    assert await backend.get("key") is None
+
+
+async def test_hit_counts_within_window(backend):
+    assert [await backend.hit("counter", window=0.2) for _ in range(3)] == [1, 2, 3]
+    await asyncio.sleep(0.3)
+    assert await backend.hit("counter", window=0.2) == 1
+
+
+async def test_lock_is_exclusive(backend):
+    inside = 0
+    overlaps = 0
+
+    async def critical():
+        nonlocal inside, overlaps
+        async with backend.lock("resource", timeout=5):
+            inside += 1
+            overlaps += inside > 1
+            await asyncio.sleep(0.01)
+            inside -= 1
+
+    await asyncio.gather(*(critical() for _ in range(10)))
+    assert overlaps == 0
+
+
+async def test_lock_times_out(backend):
+    async with backend.lock("resource"):
+        with pytest.raises(TimeoutError):
+            async with backend.lock("resource", timeout=0.1):
+                pass
+
+
+async def test_replicas_share_state():
+    server = FakeServer()
+    first, second = redis_replica(server), redis_replica(server)
+    await first.set("confirmed:1", "1", ttl=10)
+    assert await second.get("confirmed:1") == "1"
+
+    guards = FloodGuard(backend=first), FloodGuard(backend=second)
+    # Сообщения флудера приходят на разные реплики по очереди
+    flooded = [await guards[i % 2].hit(-100, 1, limit=3, window=10) for i in range(4)]
+    assert flooded == [False, False, False, True]
+
+    await guards[0].reset(-100, 1)
+    assert not await guards[1].hit(-100, 1, limit=3, window=10)
+
+
+async def test_expired_lock_is_not_released_by_its_old_owner():
+    server = FakeServer()
+    first, second = redis_replica(server), redis_replica(server)
+    async with first.lock("resource", ttl=0.1):
+        await asyncio.sleep(0.2)
+        # ttl истек, блокировку перехватила другая реплика
+        async with second.lock("resource", ttl=10, timeout=0.5):
+            pass
+        await second.client.set("bot:lock:resource", "чужой", px=10_000)
+    assert await second.client.get("bot:lock:resource") == "чужой"
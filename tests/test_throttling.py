@@ -0,0 +1,68 @@
+import asyncio
+import gc
+
+from throttling import ModeratorNotifier, TelegramRateLimiter
+
+CHAT_ID = -100
+
+
+class RecordingBot:
+    def __init__(self):
+        self.sent: list[str] = []
+
+    async def send_message(self, chat_id, text, message_thread_id=None):
+        self.sent.append(text)
+
+
+async def test_notifier_survives_gc_and_drains_on_stop(db):
+    notifier = ModeratorNotifier(delay=60)
+    bot = RecordingBot()
+    notifier.notify(bot, CHAT_ID, "первое")
+    notifier.notify(bot, CHAT_ID, "второе")
+    gc.collect()
+
+    await asyncio.wait_for(notifier.drain(), 5)
+    assert bot.sent == ["первое\n\nвторое"]
+    assert not notifier._tasks
+
+
+async def test_notifier_splits_long_texts(db):
+    notifier = ModeratorNotifier(delay=60, max_length=100)
+    bot = RecordingBot()
+    summary = "\n".join(f"метрика {i}: n={i}" for i in range(30))
+    notifier.notify(bot, CHAT_ID, summary)
+    notifier.notify(bot, CHAT_ID, "x" * 250)
+    await notifier.drain()
+
+    assert all(len(text) <= 100 for text in bot.sent)
+    # Сводка режется по строкам, без потерь
+    assert "\n".join(bot.sent[:-3]) == summary
+    assert "".join(bot.sent[-3:]) == "x" * 250
+
+
+async def test_notifier_logs_config_errors(monkeypatch):
+    import throttling
+
+    async def broken(chat_id):
+        raise ConnectionError("БД недоступна")
+
+    monkeypatch.setattr(throttling.chat_configs, "get", broken)
+    notifier = ModeratorNotifier(delay=0)
+    bot = RecordingBot()
+    notifier.notify(bot, CHAT_ID, "текст")
+    await notifier.drain()
+    assert bot.sent == []
+    assert not notifier._pending
+
+
+async def test_rate_limiter_prunes_idle_chat_buckets():
+    limiter = TelegramRateLimiter(overall_rate=1e9, chat_rate=1e6, chat_burst=1, prune_every=10)
+
+    async def call():
+        return True
+
+    for chat_id in range(20):
+        await limiter.process_request(call, (), {}, "sendMessage", {"chat_id": chat_id}, None)
+    await asyncio.sleep(0.01)
+    await limiter.process_request(call, (), {}, "sendMessage", {"chat_id": 0}, None)
+    assert len(limiter._chats) < 20
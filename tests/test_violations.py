@@ -0,0 +1,73 @@
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import text
+from telegram.error import BadRequest
+
+import metrics
+import settings
+from database import cruds
+from main import block_user
+
+CHAT_ID = -1_001_000_000_000
+USER_ID = 42
+
+
+@contextmanager
+def queries():
+    """Счетчик SQL-запросов, как у хендлеров с count_queries=True."""
+    counter = [0]
+    token = metrics._update_queries.set(counter)
+    try:
+        yield counter
+    finally:
+        metrics._update_queries.reset(token)
+
+
+def context(restrict_chat_member):
+    return SimpleNamespace(bot=SimpleNamespace(restrict_chat_member=restrict_chat_member))
+
+
+async def bans(db) -> int:
+    async with db.session() as session:
+        return (await session.execute(text("SELECT count(*) FROM bans"))).scalar_one()
+
+
+async def test_register_violation_needs_fewer_queries(db):
+    await cruds.create_telegram_user(id=USER_ID)
+
+    # Прежний путь: отдельный вызов (и сессия) на каждый шаг эскалации
+    with queries() as before:
+        await cruds.create_strike_record(USER_ID, "мат", chat_id=CHAT_ID)
+        cruds.user_cache.invalidate(USER_ID)
+        await cruds.count_strikes(USER_ID, chat_id=CHAT_ID)
+        await cruds.count_bans(USER_ID, chat_id=CHAT_ID)
+
+    with queries() as after:
+        violation = await cruds.register_violation(USER_ID, "мат", chat_id=CHAT_ID, strikes_limit=3)
+
+    assert violation == (2, None)
+    assert after[0] <= 3 < before[0]
+
+
+async def test_ban_is_recorded_only_after_restriction(db):
+    await cruds.create_telegram_user(id=USER_ID)
+    violation = await cruds.register_violation(USER_ID, "мат", chat_id=CHAT_ID, strikes_limit=1)
+    days = settings.BAN_LIMITS[0]
+    assert violation == (1, days)
+    assert await bans(db) == 0
+
+    async def refuse(**kwargs):
+        raise BadRequest("Not enough rights to restrict/unrestrict chat member")
+
+    with pytest.raises(BadRequest):
+        await block_user(CHAT_ID, USER_ID, days, context(refuse), "мат")
+    assert await bans(db) == 0
+
+    async def restrict(**kwargs):
+        return True
+
+    await block_user(CHAT_ID, USER_ID, days, context(restrict), "мат")
+    assert await bans(db) == 1
+    assert await cruds.count_bans(USER_ID, chat_id=CHAT_ID) == 1